@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import ConsentRecord, DataRequest
+from .models import (
+    ArchivedConsentRecord, ArchivedDataRequest, ConsentEvent, ConsentRecord, DataRequest, GdprSettings, ProfileRun,
+)
 
 @admin.register(ConsentRecord)
 class ConsentRecordAdmin(admin.ModelAdmin):
@@ -8,9 +10,61 @@ class ConsentRecordAdmin(admin.ModelAdmin):
     search_fields = ['subject_name', 'subject_email', 'purpose']
     readonly_fields = ['created_at', 'updated_at']
 
+    def save_model(self, request, obj, form, change):
+        obj._consent_source = 'admin'
+        super().save_model(request, obj, form, change)
+
+@admin.register(ConsentEvent)
+class ConsentEventAdmin(admin.ModelAdmin):
+    list_display = ['subject_email', 'purpose', 'action', 'occurred_at', 'source']
+    list_filter = ['action', 'source']
+    search_fields = ['subject_email', 'purpose']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(DataRequest)
 class DataRequestAdmin(admin.ModelAdmin):
-    list_display = ['subject_name', 'subject_email', 'request_type', 'status', 'completed_at', 'created_at']
+    list_display = ['subject_name', 'subject_email', 'request_type', 'status', 'due_at', 'completed_at', 'created_at']
     search_fields = ['subject_name', 'subject_email', 'request_type', 'status']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'erasure_report', 'archive', 'archive_report', 'due_at', 'extended_at', 'claimed_by', 'lease_expires_at', 'attempts', 'last_error']
+
+@admin.register(ArchivedConsentRecord)
+class ArchivedConsentRecordAdmin(admin.ModelAdmin):
+    list_display = ['subject_name', 'subject_email', 'purpose', 'consented', 'withdrawal_date', 'is_deleted']
+    search_fields = ['subject_email']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedDataRequest)
+class ArchivedDataRequestAdmin(admin.ModelAdmin):
+    list_display = ['subject_name', 'subject_email', 'request_type', 'status', 'completed_at', 'is_deleted']
+    search_fields = ['subject_email']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(GdprSettings)
+class GdprSettingsAdmin(admin.ModelAdmin):
+    list_display = ['hub_id', 'deleted_retention_days', 'archive_after_days', 'updated_at']
+
+@admin.register(ProfileRun)
+class ProfileRunAdmin(admin.ModelAdmin):
+    list_display = ['endpoint', 'path', 'seconds', 'sql_seconds', 'queries', 'created_at']
+    list_filter = ['endpoint']
+
+    def has_add_permission(self, request):
+        return False
 
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,14 +1,30 @@
 """
 AI context for the GDPR module.
 Loaded into the assistant system prompt when this module's tools are active.
+
+``CONTEXT`` is computed each time it is read (a module ``__getattr__``):
+``STATIC_CONTEXT``, the same for every hub, plus a short snapshot of this
+hub (``HubConfig``): purposes and statuses in use, row counts, overdue
+requests, so a session does not spend tool calls discovering them.
+:func:`get_context` does the same for the hub of a request's session. The
+snapshot is read from the statistics counters plus one indexed count,
+cached per hub for ``GDPR_HUB_SNAPSHOT_TIMEOUT`` seconds and dropped on
+writes (``stats.apply_deltas``). When it cannot be read the static text is
+returned.
 """
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Purposes listed in the snapshot; the rest are summarized as "N more".
+SNAPSHOT_MAX_PURPOSES = 20
 
-CONTEXT = """
+STATIC_CONTEXT = """
 ## Module Knowledge: GDPR
 
 ### Models
 
-**ConsentRecord** — tracks whether a data subject has given/withdrawn consent.
+**ConsentRecord** — current consent state; one row per subject_email + purpose.
 - `subject_name` (str): name of the person
 - `subject_email` (email): contact email
 - `purpose` (str, max 100): what the consent is for (e.g. "marketing", "analytics", "third_party_sharing")
@@ -16,20 +32,30 @@ CONTEXT = """
 - `consent_date` (datetime, nullable): when consent was given
 - `withdrawal_date` (datetime, nullable): when consent was withdrawn
 
+**ConsentEvent** — append-only history of grants and withdrawals (read-only).
+- `subject_email`, `purpose`
+- `action` (choice): `grant` or `withdraw`
+- `occurred_at` (datetime), `source` (str, e.g. "manual", "api", "import")
+
 **DataRequest** — tracks GDPR data subject requests (DSARs).
 - `subject_name` (str): name of the requester
 - `subject_email` (email): contact email
 - `request_type` (choice): one of `access`, `erasure`, `portability`, `rectification`
-- `status` (str, default "pending"): workflow state — typically: pending → in_progress → completed
+- `status` (str, default "pending"): workflow state — typically: pending → in_progress → completed (or failed). Erasure, access and portability requests are picked up from pending by the gdpr_worker queue
 - `completed_at` (datetime, nullable): when the request was fulfilled
+- `due_at` (datetime, read-only): statutory deadline, 30 days after receipt; `extended_at` is set when the one allowed extension (up to 60 more days) was recorded
 - `notes` (text): internal handling notes
+- `erasure_report` (JSON, read-only): per-module result of the last erasure run
+- `archive` (file, read-only): zip of the subject's data (NDJSON per module) for access/portability requests, built with "Build archive" on the request
 
 ### Key flows
 
-1. **Record consent**: create a ConsentRecord with purpose, subject info, consented=True, consent_date=now.
-2. **Withdraw consent**: update ConsentRecord — set consented=False, withdrawal_date=now.
-3. **Handle a DSAR**: create DataRequest with request_type and subject info, status="pending". Update status as it progresses. Set completed_at when done.
-4. **Check active consents**: filter ConsentRecord by subject_email + purpose + consented=True.
+1. **Record consent**: create or update the ConsentRecord for the subject and purpose with consented=True, consent_date=now. A ConsentEvent is appended automatically.
+2. **Withdraw consent**: update ConsentRecord — set consented=False, withdrawal_date=now. A ConsentEvent is appended automatically.
+3. **Handle a DSAR**: create DataRequest with request_type and subject info, status="pending". Update status as it progresses. Set completed_at when done. Erasure requests are carried out by the "Erase data" action on the request (every module's erasure handlers), which completes the request itself.
+4. **Check active consents**: filter ConsentRecord by subject_email + purpose + consented=True. For counts and shares ("how many erasure requests are pending?", "what share consented to marketing?") call `gdpr_statistics` instead of listing rows.
+5. **Consent history**: filter ConsentEvent by subject_email (+ purpose), ordered by occurred_at.
+6. **Archived rows**: withdrawn or deleted consent records and completed or deleted data requests older than the hub's archive period are moved to archive tables and are not returned by the list tools; the lists show them with "Include archived".
 
 ### Request type choices
 - `access` — Data Access (subject wants to know what data is held)
@@ -37,3 +63,86 @@ CONTEXT = """
 - `portability` — Data Portability (export data in machine-readable format)
 - `rectification` — Rectification (correct inaccurate data)
 """
+
+
+def hub_snapshot(hub_id):
+    """
+    ``{'consent_records', 'consented', 'withdrawn', 'purposes',
+    'data_requests', 'statuses', 'overdue'}`` for *hub_id*, cached.
+    """
+    from django.core.cache import cache
+    from django.utils import timezone
+
+    from .cache import hub_snapshot_key, hub_snapshot_timeout
+    from .deadlines import open_requests
+    from .models import OPEN_STATUSES
+    from .stats import hub_stats
+
+    key = hub_snapshot_key(hub_id)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+    stats = hub_stats(hub_id)
+    statuses = stats.get('request_status', {})
+    overdue = 0
+    if any(statuses.get(status) for status in OPEN_STATUSES):
+        overdue = open_requests(hub_id).filter(due_at__lt=timezone.now()).count()
+    snapshot = {
+        'consent_records': stats.get('consent_records', {}).get('', 0),
+        'consented': stats.get('consent_status', {}).get('consented', 0),
+        'withdrawn': stats.get('consent_status', {}).get('withdrawn', 0),
+        'purposes': sorted(stats.get('consent_purpose', {})),
+        'data_requests': stats.get('data_requests', {}).get('', 0),
+        'statuses': dict(sorted(statuses.items())),
+        'overdue': overdue,
+    }
+    cache.set(key, snapshot, hub_snapshot_timeout())
+    return snapshot
+
+
+def render_snapshot(snapshot):
+    purposes = snapshot['purposes']
+    listed = ', '.join(f'`{p}`' for p in purposes[:SNAPSHOT_MAX_PURPOSES]) or 'none'
+    if len(purposes) > SNAPSHOT_MAX_PURPOSES:
+        listed += f' and {len(purposes) - SNAPSHOT_MAX_PURPOSES} more'
+    statuses = ', '.join(f'`{s}` ({n})' for s, n in snapshot['statuses'].items()) or 'none'
+    return (
+        '\n### Current hub (live rows, may lag by a minute)\n'
+        f"- Consent records: {snapshot['consent_records']} "
+        f"({snapshot['consented']} consented, {snapshot['withdrawn']} withdrawn)\n"
+        f'- Purposes in use: {listed}\n'
+        f"- Data requests: {snapshot['data_requests']}; statuses in use: {statuses}\n"
+        f"- Overdue open requests: {snapshot['overdue']}\n"
+    )
+
+
+def hub_context(hub_id):
+    """``STATIC_CONTEXT`` plus the snapshot of *hub_id*, when there is one and it can be read."""
+    if not hub_id:
+        return STATIC_CONTEXT
+    try:
+        return STATIC_CONTEXT + render_snapshot(hub_snapshot(hub_id))
+    except Exception:
+        logger.exception('Reading the assistant snapshot of hub %s failed', hub_id)
+        return STATIC_CONTEXT
+
+
+def get_context(request=None):
+    """The module context for the hub of *request*'s session, or of this hub without one."""
+    hub_id = request.session.get('hub_id') if request is not None else None
+    return hub_context(hub_id or _configured_hub_id())
+
+
+def _configured_hub_id():
+    try:
+        from apps.configuration.models import HubConfig
+        return HubConfig.get_config().hub_id
+    except Exception:
+        logger.exception('Reading the configured hub failed')
+        return None
+
+
+def __getattr__(name):
+    if name == 'CONTEXT':
+        return get_context()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
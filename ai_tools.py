@@ -1,52 +1,244 @@
 """AI tools for the GDPR module."""
+import functools
+
 from assistant.tools import AssistantTool, register_tool
 
+TOOL_PAGE_SIZE = 20
+
+TOOL_MAX_PAGE_SIZE = 100
+
+# Filtered totals without a matching hub counter are counted up to this many rows.
+TOOL_COUNT_CAP = 10_000
+
+PAGE_PROPERTIES = {
+    "limit": {"type": "integer", "description": f"Rows per page (default {TOOL_PAGE_SIZE}, at most {TOOL_MAX_PAGE_SIZE})"},
+    "cursor": {"type": "string", "description": "next_cursor of the previous page"},
+}
+
+
+def instrument(endpoint):
+    """
+    ``metrics.instrument`` for a tool's ``execute``, imported on the first
+    call like the other gdpr imports here, so registering the tools loads
+    nothing of the app.
+    """
+    def decorator(execute):
+        @functools.wraps(execute)
+        def wrapper(*args, **kwargs):
+            from gdpr.metrics import instrument as instrument_call
+            return instrument_call(endpoint)(execute)(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _page_size(args):
+    try:
+        return min(max(int(args.get('limit') or TOOL_PAGE_SIZE), 1), TOOL_MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return TOOL_PAGE_SIZE
+
+
+def _json_row(row):
+    """*row* with its id and datetimes as strings."""
+    return {
+        name: str(value) if name == 'id' else value.isoformat() if hasattr(value, 'isoformat') else value
+        for name, value in row.items()
+    }
+
+
+def _counter(filters, everything):
+    """The hub counter answering the total: *everything* unfiltered, the one filter's counter, or None."""
+    if not filters:
+        return everything
+    return filters[0] if len(filters) == 1 else None
+
+
+def _total(qs, hub_id, counter):
+    """
+    ``{"total": n}`` for *qs*: read from the hub counter *counter* (a
+    ``(metric, key)`` pair, see ``stats.py``) when the filters match one,
+    else counted up to ``TOOL_COUNT_CAP`` rows (``total_capped`` set beyond).
+    """
+    from gdpr.stats import hub_count
+    if counter is not None:
+        return {"total": hub_count(hub_id, *counter)}
+    total = qs[:TOOL_COUNT_CAP + 1].count()
+    if total > TOOL_COUNT_CAP:
+        return {"total": TOOL_COUNT_CAP, "total_capped": True}
+    return {"total": total}
+
+
+def _list_page(qs, args, key, fields, hub_id, counter):
+    """One page of *qs* as dicts of *fields*, newest first, with a cursor and total."""
+    from gdpr.pagination import InvalidCursor, keyset_page
+    try:
+        rows, next_cursor = keyset_page(
+            qs.values(*fields), 'created_at', descending=True, cursor=args.get('cursor'), size=_page_size(args),
+        )
+    except InvalidCursor:
+        return {"error": "Invalid cursor"}
+    return {key: [_json_row(r) for r in rows], "next_cursor": next_cursor, **_total(qs, hub_id, counter)}
+
 
 @register_tool
 class ListConsentRecords(AssistantTool):
     name = "list_consent_records"
-    description = "List GDPR consent records."
+    description = "List the hub's GDPR consent records, newest first, one page at a time."
     module_id = "gdpr"
     required_permission = "gdpr.view_consentrecord"
     parameters = {
         "type": "object",
-        "properties": {"purpose": {"type": "string"}, "consented": {"type": "boolean"}, "limit": {"type": "integer"}},
+        "properties": {
+            "purpose": {"type": "string", "description": "Exact purpose, e.g. marketing"},
+            "consented": {"type": "boolean"},
+            **PAGE_PROPERTIES,
+        },
         "required": [],
         "additionalProperties": False,
     }
 
+    @instrument('tool:list_consent_records')
     def execute(self, args, request):
         from gdpr.models import ConsentRecord
-        qs = ConsentRecord.objects.all()
+        hub_id = request.session.get('hub_id')
+        if not hub_id:
+            return {"error": "No hub selected"}
+        qs = ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+        counters = []
         if args.get('purpose'):
-            qs = qs.filter(purpose__icontains=args['purpose'])
+            qs = qs.filter(purpose=args['purpose'])
+            counters.append(('consent_purpose', args['purpose']))
         if 'consented' in args:
             qs = qs.filter(consented=args['consented'])
-        limit = args.get('limit', 20)
-        return {"records": [{"id": str(r.id), "subject_name": r.subject_name, "subject_email": r.subject_email, "purpose": r.purpose, "consented": r.consented, "consent_date": r.consent_date.isoformat() if r.consent_date else None} for r in qs[:limit]]}
+            counters.append(('consent_status', 'consented' if args['consented'] else 'withdrawn'))
+        counter = _counter(counters, ('consent_records', ''))
+        fields = ['id', 'subject_name', 'subject_email', 'purpose', 'consented', 'consent_date', 'created_at']
+        return _list_page(qs, args, 'records', fields, hub_id, counter)
 
 
 @register_tool
 class ListDataRequests(AssistantTool):
     name = "list_data_requests"
-    description = "List GDPR data requests (access, erasure, portability, rectification)."
+    description = "List the hub's GDPR data requests (access, erasure, portability, rectification), newest first, one page at a time."
     module_id = "gdpr"
     required_permission = "gdpr.view_datarequest"
     parameters = {
         "type": "object",
-        "properties": {"request_type": {"type": "string", "description": "access, erasure, portability, rectification"}, "status": {"type": "string"}},
+        "properties": {
+            "request_type": {"type": "string", "description": "access, erasure, portability, rectification"},
+            "status": {"type": "string"},
+            **PAGE_PROPERTIES,
+        },
         "required": [],
         "additionalProperties": False,
     }
 
+    @instrument('tool:list_data_requests')
     def execute(self, args, request):
         from gdpr.models import DataRequest
-        qs = DataRequest.objects.all()
+        hub_id = request.session.get('hub_id')
+        if not hub_id:
+            return {"error": "No hub selected"}
+        qs = DataRequest.objects.filter(hub_id=hub_id, is_deleted=False)
+        counters = []
         if args.get('request_type'):
             qs = qs.filter(request_type=args['request_type'])
+            counters.append(('request_type', args['request_type']))
         if args.get('status'):
             qs = qs.filter(status=args['status'])
-        return {"requests": [{"id": str(r.id), "subject_name": r.subject_name, "request_type": r.request_type, "status": r.status, "created_at": r.created_at.isoformat()} for r in qs.order_by('-created_at')]}
+            counters.append(('request_status', args['status']))
+        counter = _counter(counters, ('data_requests', ''))
+        fields = ['id', 'subject_name', 'request_type', 'status', 'due_at', 'created_at']
+        return _list_page(qs, args, 'requests', fields, hub_id, counter)
+
+
+# Groups returned by gdpr_statistics; the total always covers all of them.
+TOOL_MAX_GROUPS = 200
+
+
+def _parse_moment(value):
+    """A datetime from an ISO date or datetime string; None when empty. Raises ValueError."""
+    from datetime import datetime, time
+    from django.utils import timezone
+    from django.utils.dateparse import parse_date, parse_datetime
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@register_tool
+class GdprStatistics(AssistantTool):
+    name = "gdpr_statistics"
+    description = (
+        "Counts and rates of the hub's consent records or data requests, grouped by column and/or time period, "
+        "computed in the database. Use it instead of listing rows to answer how-many and what-share questions."
+    )
+    module_id = "gdpr"
+    required_permission = "gdpr.view_consentrecord"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "source": {"type": "string", "enum": ["consent_records", "data_requests"]},
+            "group_by": {
+                "type": "array",
+                "items": {"type": "string", "enum": ["purpose", "consented", "request_type", "status"]},
+                "description": "purpose/consented for consent_records, request_type/status for data_requests",
+            },
+            "bucket": {"type": "string", "enum": ["day", "week", "month", "year"], "description": "Also group by creation period"},
+            "since": {"type": "string", "description": "ISO date; only rows created on or after it"},
+            "until": {"type": "string", "description": "ISO date; only rows created before it"},
+        },
+        "required": ["source"],
+        "additionalProperties": False,
+    }
+
+    # required_permission covers consent_records; each source needs its own.
+    source_permissions = {
+        "consent_records": "gdpr.view_consentrecord",
+        "data_requests": "gdpr.view_datarequest",
+    }
+
+    @instrument('tool:gdpr_statistics')
+    def execute(self, args, request):
+        from gdpr.stats import grouped_counts
+        hub_id = request.session.get('hub_id')
+        if not hub_id:
+            return {"error": "No hub selected"}
+        permission = self.source_permissions.get(args.get('source'))
+        user = getattr(request, 'user', None)
+        if permission and not (user is not None and user.has_perm(permission)):
+            return {"error": f"Permission denied: {permission}"}
+        group_by = args.get('group_by') or ()
+        try:
+            rows = grouped_counts(
+                hub_id, args['source'], group_by, args.get('bucket'),
+                _parse_moment(args.get('since')), _parse_moment(args.get('until')),
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+        total = sum(row['count'] for row in rows)
+        if not args.get('bucket'):
+            rows.sort(key=lambda row: -row['count'])
+        groups = []
+        for row in rows[:TOOL_MAX_GROUPS]:
+            group = _json_row(row)
+            group['share'] = round(row['count'] / total, 4) if total else 0
+            if args['source'] == 'consent_records' and 'consented' not in group_by:
+                # Here "consented" is the number of consenting rows in the group.
+                group['consent_rate'] = round(row['consented'] / row['count'], 4) if row['count'] else 0
+            groups.append(group)
+        result = {"source": args['source'], "total": total, "groups": groups}
+        if len(rows) > TOOL_MAX_GROUPS:
+            result["truncated"] = True
+        return result
 
 
 @register_tool
@@ -67,9 +259,13 @@ class CreateDataRequest(AssistantTool):
         "additionalProperties": False,
     }
 
+    @instrument('tool:create_data_request')
     def execute(self, args, request):
         from gdpr.models import DataRequest
-        r = DataRequest.objects.create(subject_name=args['subject_name'], subject_email=args['subject_email'], request_type=args['request_type'], notes=args.get('notes', ''))
+        hub_id = request.session.get('hub_id')
+        if not hub_id:
+            return {"error": "No hub selected"}
+        r = DataRequest.objects.create(hub_id=hub_id, subject_name=args['subject_name'], subject_email=args['subject_email'], request_type=args['request_type'], notes=args.get('notes', ''))
         return {"id": str(r.id), "created": True}
 
 
@@ -91,17 +287,21 @@ class UpdateDataRequest(AssistantTool):
         "additionalProperties": False,
     }
 
+    @instrument('tool:update_data_request')
     def execute(self, args, request):
+        from django.core.exceptions import ValidationError
         from django.utils import timezone
         from gdpr.models import DataRequest
+        from gdpr.workqueue import update_if_current
         try:
-            r = DataRequest.objects.get(id=args['request_id'])
-        except DataRequest.DoesNotExist:
+            r = DataRequest.objects.get(id=args['request_id'], hub_id=request.session.get('hub_id'), is_deleted=False)
+        except (DataRequest.DoesNotExist, ValidationError):
             return {"error": "Data request not found"}
-        r.status = args['status']
+        changes = {'status': args['status']}
         if args.get('notes') is not None:
-            r.notes = args['notes']
+            changes['notes'] = args['notes']
         if args['status'] == 'completed' and not r.completed_at:
-            r.completed_at = timezone.now()
-        r.save()
+            changes['completed_at'] = timezone.now()
+        if not update_if_current(r, **changes):
+            return {"error": "The data request was changed concurrently; read it again and retry"}
         return {"id": str(r.id), "status": r.status, "updated": True}
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 from django.utils.translation import gettext_lazy as _
 
 
@@ -9,4 +10,8 @@ class GdprConfig(AppConfig):
     verbose_name = _('GDPR & Privacy')
 
     def ready(self):
-        pass
+        from . import signals  # noqa: F401
+        from .erasure import autodiscover_handlers
+        from .search import ensure_search_indexes
+        autodiscover_handlers()
+        post_migrate.connect(ensure_search_indexes, sender=self)
@@ -0,0 +1,128 @@
+"""
+Moving old rows out of the hot tables.
+
+Withdrawn and deleted consent records, and completed and deleted data
+requests, untouched for longer than the hub's ``archive_after_days`` are
+rarely read again. :func:`archive_old_rows` moves them to the archive tables
+(``ArchivedConsentRecord``, ``ArchivedDataRequest``: same columns, same ids)
+in primary key batches, one transaction per batch::
+
+    INSERT INTO <archive> (<columns>) SELECT <columns> FROM <table> WHERE id IN (...)
+    DELETE FROM <table> WHERE id IN (...)
+
+so the lists, dashboard, search and AI tools keep reading small tables. The
+statistics only count the hot tables and are moved down in the same
+transaction. Archived rows are read when a list or export asks for them
+(``?archived=1``, :func:`with_archived`), by erasure and subject archives,
+and purged like live rows once deleted (``purge.py``).
+"""
+import time
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Value
+from django.utils import timezone
+
+from .bulk import iter_id_chunks
+from .cache import consent_cache
+from .models import ArchivedConsentRecord, ArchivedDataRequest, ConsentRecord, DataRequest, GdprSettings
+from .stats import apply_queryset
+
+ARCHIVE_BATCH_SIZE = 1000
+
+ARCHIVE_TABLES = {
+    ConsentRecord: ArchivedConsentRecord,
+    DataRequest: ArchivedDataRequest,
+}
+
+
+def archive_cutoff(hub_id, now=None):
+    """Rows of *hub_id* last changed before this moment are due for archiving."""
+    return (now or timezone.now()) - timedelta(days=GdprSettings.for_hub(hub_id).archive_after_days)
+
+
+def archivable(model, hub_id, cutoff):
+    """
+    The querysets of rows of *hub_id* to archive: closed rows and deleted
+    rows, kept apart so each is walked on its own partial index.
+    """
+    rows = model.all_objects.filter(hub_id=hub_id)
+    if model is ConsentRecord:
+        closed = rows.filter(is_deleted=False, consented=False, updated_at__lt=cutoff)
+    else:
+        closed = rows.filter(is_deleted=False, status='completed', updated_at__lt=cutoff)
+    return [closed, rows.filter(is_deleted=True, deleted_at__lt=cutoff)]
+
+
+def _move_chunk(model, qs, chunk):
+    """Copy one chunk of *qs* into the archive table and delete it, in one transaction."""
+    archive = ARCHIVE_TABLES[model]
+    connection = connections[qs.db]
+    quote = connection.ops.quote_name
+    fields = model._meta.concrete_fields
+    columns = ', '.join(quote(f.column) for f in fields)
+    with transaction.atomic(using=qs.db):
+        # Re-checked under lock: a row changed since the chunk was read stays.
+        ids = list(qs.filter(pk__in=chunk).select_for_update().values_list('pk', flat=True))
+        if not ids:
+            return 0
+        rows = model.all_objects.using(qs.db).filter(pk__in=ids)
+        keys = list(rows.values_list('hub_id', 'subject_email', 'purpose')) if model is ConsentRecord else []
+        apply_queryset(rows, sign=-1)
+        select_sql, params = rows.values_list(*[f.attname for f in fields]).order_by().query.get_compiler(qs.db).as_sql()
+        pk = model._meta.pk
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {quote(archive._meta.db_table)} ({columns}) {select_sql}', params)
+            cursor.execute(
+                f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(pk.column)} IN ({", ".join(["%s"] * len(ids))})',
+                [pk.get_db_prep_value(value, connection) for value in ids],
+            )
+    if keys:
+        consent_cache.invalidate(keys)
+    return len(ids)
+
+
+def archive_hub(hub_id, batch_size=ARCHIVE_BATCH_SIZE, sleep=0, dry_run=False, now=None):
+    """
+    Move the old rows of *hub_id* to the archive tables, sleeping *sleep*
+    seconds after each batch. Returns ``{model_name: rows}`` (with
+    ``dry_run``, the rows that would be moved).
+    """
+    cutoff = archive_cutoff(hub_id, now)
+    result = {}
+    for model in ARCHIVE_TABLES:
+        moved = 0
+        for qs in archivable(model, hub_id, cutoff):
+            if dry_run:
+                moved += qs.count()
+                continue
+            for chunk in iter_id_chunks(qs, chunk_size=batch_size):
+                moved += _move_chunk(model, qs, chunk)
+                if sleep:
+                    time.sleep(sleep)
+        result[model._meta.model_name] = moved
+    return result
+
+
+def archive_old_rows(hub_id=None, batch_size=ARCHIVE_BATCH_SIZE, sleep=0, dry_run=False, now=None):
+    """:func:`archive_hub` for *hub_id*, or every hub. Returns ``{hub_id: result}``."""
+    if hub_id:
+        hubs = [hub_id]
+    else:
+        hubs = set()
+        for model in ARCHIVE_TABLES:
+            hubs.update(model.all_objects.filter(hub_id__isnull=False).values_list('hub_id', flat=True).distinct())
+        hubs = sorted(hubs, key=str)
+    return {hub: archive_hub(hub, batch_size, sleep, dry_run, now) for hub in hubs}
+
+
+def with_archived(qs, archived_qs):
+    """
+    *qs* (live rows) and *archived_qs* (the same filters on the archive
+    table) as one ``UNION ALL`` queryset of the live model, each row
+    annotated with ``is_archived``. Only ordering, slicing, counting and
+    ``values()`` may follow.
+    """
+    return qs.annotate(is_archived=Value(False)).order_by().union(
+        archived_qs.annotate(is_archived=Value(True)).order_by(), all=True,
+    )
@@ -0,0 +1,117 @@
+"""
+Subject data archives for access and portability requests.
+
+:func:`build_subject_archive` collects everything the registered subject data
+handlers (see ``erasure.py``) find for the request's subject and writes it to
+a zip archive, one NDJSON member per handler plus ``manifest.json``. Rows are
+read with a server-side cursor in chunks and written straight into the
+compressed member, and the archive itself is spooled to a temporary file, so
+memory stays flat however many rows the subject has.
+
+The archive is attached to ``DataRequest.archive``; progress while building
+is kept in ``DataRequest.archive_report``. Builds run in ``gdpr_worker``
+(:func:`start_subject_archive` queues one), so only the worker holding the
+request's lease writes its archive.
+"""
+import json
+import tempfile
+import time
+import zipfile
+
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .erasure import get_handlers
+from .models import DataRequest, normalize_email
+
+ARCHIVE_REQUEST_TYPES = ('access', 'portability')
+
+# Rows fetched per round trip from the server-side cursor.
+ARCHIVE_CHUNK_SIZE = 2000
+
+# Minimum seconds between two progress writes to archive_report.
+PROGRESS_INTERVAL = 2.0
+
+
+def _save_report(data_request, report):
+    data_request.archive_report = report
+    DataRequest.all_objects.filter(pk=data_request.pk).update(archive_report=report, updated_at=timezone.now())
+
+
+def build_subject_archive(data_request, handlers=None, progress=None, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Build the data archive of *data_request*'s subject and attach it to the
+    request. *progress* is called with the running report every
+    ``PROGRESS_INTERVAL`` seconds and when done. Returns the report.
+    """
+    handlers = [h for h in get_handlers() if h.exported] if handlers is None else list(handlers)
+    subject_email = normalize_email(data_request.subject_email)
+    started = time.perf_counter()
+    report = {'state': 'building', 'rows': 0, 'handlers': {}, 'started_at': timezone.now().isoformat()}
+    last_progress = started
+
+    def tick(force=False):
+        nonlocal last_progress
+        now = time.perf_counter()
+        if force or now - last_progress >= PROGRESS_INTERVAL:
+            last_progress = now
+            report['seconds'] = round(now - started, 2)
+            _save_report(data_request, report)
+            if progress:
+                progress(report)
+
+    tick(force=True)
+    try:
+        _write_archive(data_request, handlers, subject_email, report, tick, chunk_size)
+    except Exception as e:
+        _save_report(data_request, dict(report, state='failed', error=f'{type(e).__name__}: {e}'))
+        raise
+    report['state'] = 'ready'
+    report['bytes'] = data_request.archive.size
+    tick(force=True)
+    return report
+
+
+def _write_archive(data_request, handlers, subject_email, report, tick, chunk_size):
+    with tempfile.TemporaryFile() as spool:
+        with zipfile.ZipFile(spool, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for handler in handlers:
+                key = f'{handler.module_id}.{handler.name}'
+                report['handlers'][key] = 0
+                qs = handler.export_rows(handler.queryset(data_request.hub_id, subject_email))
+                with archive.open(f'{handler.module_id}/{handler.name}.ndjson', 'w', force_zip64=True) as member:
+                    for row in qs.iterator(chunk_size=chunk_size):
+                        member.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n')
+                        report['handlers'][key] += 1
+                        report['rows'] += 1
+                        if report['rows'] % chunk_size == 0:
+                            tick()
+            archive.writestr('manifest.json', json.dumps({
+                'request_id': str(data_request.pk),
+                'request_type': data_request.request_type,
+                'subject_email': subject_email,
+                'generated_at': timezone.now().isoformat(),
+                'rows': report['handlers'],
+            }, indent=2))
+        spool.seek(0)
+        if data_request.archive:
+            data_request.archive.delete(save=False)
+        data_request.archive.save(f'{data_request.pk}.zip', File(spool), save=False)
+    data_request.save(update_fields=['archive', 'updated_at'])
+
+
+def start_subject_archive(data_request):
+    """
+    Queue a (re)build of *data_request*'s archive for ``gdpr_worker`` (see
+    ``workqueue.py``), which renews its lease while building and rebuilds it
+    after a crash. Returns False, queueing nothing, while a worker holds the
+    request or when someone else changed it first (reload it then).
+    """
+    from .workqueue import lease_held, update_if_current
+    if lease_held(data_request):
+        return False
+    return update_if_current(
+        data_request, status='pending', archive_report={'state': 'queued', 'rows': 0, 'handlers': {}},
+        claimed_by='', lease_expires_at=None, attempts=0, last_error='',
+    )
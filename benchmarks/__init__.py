@@ -0,0 +1,20 @@
+"""
+Benchmarks for the GDPR module, run with ``manage.py gdpr_benchmark <suite>``.
+
+Each suite module exposes ``DEFAULT_SIZES`` and a ``run(sizes)`` generator
+yielding one result dict per (case, size). ``--json`` writes the results as
+a report (``report.py``) that ``--compare`` checks a later run against.
+"""
+
+SUITES = {
+    'ai_tools': 'gdpr.benchmarks.ai_tools',
+    'archives': 'gdpr.benchmarks.archives',
+    'bulk': 'gdpr.benchmarks.bulk',
+    'consent_check': 'gdpr.benchmarks.consent_check',
+    'deadlines': 'gdpr.benchmarks.deadlines',
+    'exports': 'gdpr.benchmarks.exports',
+    'imports': 'gdpr.benchmarks.imports',
+    'ingest': 'gdpr.benchmarks.ingest',
+    'lists': 'gdpr.benchmarks.lists',
+    'search': 'gdpr.benchmarks.search',
+}
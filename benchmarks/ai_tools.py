@@ -0,0 +1,43 @@
+"""
+Assistant tools on a realistic hub (``seed_hub``): list pages with and
+without filters, grouped statistics, and the hub snapshot of the module
+context, cold and cached. Every case should stay a handful of queries and
+a bounded response at every size.
+"""
+from django.test import RequestFactory
+
+from gdpr.ai_context import get_context
+from gdpr.ai_tools import GdprStatistics, ListConsentRecords, ListDataRequests
+from gdpr.cache import invalidate_hub_snapshot
+
+from .harness import measure, result, scratch_hub, seed_hub
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# (case, tool, args)
+CALLS = [
+    ('tool_list_consents', ListConsentRecords, {}),
+    ('tool_list_consents_filtered', ListConsentRecords, {'purpose': 'marketing', 'consented': False}),
+    ('tool_list_requests_by_status', ListDataRequests, {'status': 'pending'}),
+    ('tool_statistics_by_purpose', GdprStatistics, {'source': 'consent_records', 'group_by': ['purpose']}),
+    ('tool_statistics_monthly', GdprStatistics, {'source': 'data_requests', 'group_by': ['request_type'], 'bucket': 'month'}),
+]
+
+
+def _cold_context(request, hub_id):
+    invalidate_hub_snapshot(hub_id)
+    return get_context(request)
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            seed_hub(hub_id, consent_records=size, data_requests=size // 10)
+            request = RequestFactory().get('/')
+            request.session = {'hub_id': str(hub_id)}
+            for case, tool, args in CALLS:
+                response, seconds, peak, queries = measure(tool().execute, args, request)
+                yield result(case, size, seconds, peak, queries, response_bytes=len(str(response)))
+            for case, fn in (('context_snapshot_cold', _cold_context), ('context_snapshot_cached', lambda request, hub_id: get_context(request))):
+                _context, seconds, peak, queries = measure(fn, request, hub_id)
+                yield result(case, size, seconds, peak, queries)
@@ -0,0 +1,46 @@
+"""
+Subject data archive: one subject with a large consent history, written as
+NDJSON into a zip. Peak memory should not grow with the number of rows.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from gdpr.archives import build_subject_archive
+from gdpr.models import ConsentEvent, DataRequest
+
+from .harness import SEED_BATCH_SIZE, PURPOSES, measure, result, scratch_hub
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+SUBJECT_EMAIL = 'subject@example.com'
+
+
+def seed_subject_events(hub_id, count, batch_size=SEED_BATCH_SIZE):
+    now = timezone.now()
+    for start in range(0, count, batch_size):
+        ConsentEvent.objects.bulk_create(
+            ConsentEvent(
+                hub_id=hub_id,
+                subject_email=SUBJECT_EMAIL,
+                purpose=PURPOSES[i % len(PURPOSES)],
+                action='grant' if i % 2 else 'withdraw',
+                occurred_at=now - timedelta(seconds=i),
+                source='benchmark',
+            )
+            for i in range(start, min(start + batch_size, count))
+        )
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            seed_subject_events(hub_id, size)
+            data_request = DataRequest.objects.create(
+                hub_id=hub_id, subject_name='Subject', subject_email=SUBJECT_EMAIL, request_type='access',
+            )
+            try:
+                report, seconds, peak, queries = measure(build_subject_archive, data_request)
+                yield result('archive_ndjson_zip', size, seconds, peak, queries, rows=report['rows'], bytes=report['bytes'])
+            finally:
+                data_request.archive.delete(save=False)
@@ -0,0 +1,30 @@
+"""
+Bulk actions over a whole realistic hub (``seed_hub``), as "select all"
+sends them: withdraw and restore consents (with their ledger events), move
+data requests to another status and delete everything. Time and peak memory
+should grow linearly with the rows touched, queries with the chunks.
+"""
+from gdpr.bulk import bulk_consent_action, bulk_data_request_action
+from gdpr.models import ConsentRecord, DataRequest
+
+from .harness import measure, result, scratch_hub, seed_hub
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            seed_hub(hub_id, consent_records=size, data_requests=size)
+            consents = ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+            requests = DataRequest.objects.filter(hub_id=hub_id, is_deleted=False)
+            cases = [
+                ('bulk_withdraw', lambda: bulk_consent_action(consents, 'withdraw')),
+                ('bulk_restore', lambda: bulk_consent_action(consents, 'restore')),
+                ('bulk_set_status', lambda: bulk_data_request_action(requests, 'set_status', status='in_progress')),
+                ('bulk_delete_consents', lambda: bulk_consent_action(consents, 'delete')),
+                ('bulk_delete_requests', lambda: bulk_data_request_action(requests, 'delete')),
+            ]
+            for case, fn in cases:
+                rows, seconds, peak, queries = measure(fn)
+                yield result(case, size, seconds, peak, queries, rows=rows)
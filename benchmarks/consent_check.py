@@ -0,0 +1,36 @@
+"""
+Batch consent check: ``filter_consenting_emails`` vs one query per email.
+"""
+import time
+
+from gdpr.services import filter_consenting_emails, has_consent
+
+from .harness import measure, result, scratch_hub, seed_consent_records
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# The per-email baseline is timed on a sample and extrapolated: a million
+# single-row queries would dominate the run without telling us anything new.
+BASELINE_SAMPLE = 10_000
+
+
+def _mailing_list(size):
+    # Half the addresses are known subjects, half are unknown.
+    for i in range(size):
+        yield f'subject{i}@example.com' if i % 2 == 0 else f'Unknown{i}@Example.com '
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            seed_consent_records(hub_id, size)
+
+            matched, seconds, peak, queries = measure(lambda: sum(1 for _ in filter_consenting_emails(hub_id, _mailing_list(size), 'marketing')))
+            yield result('consent_check_batched', size, seconds, peak, queries, matched=matched, emails_per_second=round(size / seconds))
+
+            sample = min(size, BASELINE_SAMPLE)
+            started = time.perf_counter()
+            for email in _mailing_list(sample):
+                has_consent(hub_id, email, 'marketing')
+            seconds = (time.perf_counter() - started) * size / sample
+            yield result('consent_check_per_email', size, seconds, extrapolated_from=sample)
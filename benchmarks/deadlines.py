@@ -0,0 +1,28 @@
+"""
+Overdue/at-risk query on a hub whose history is almost entirely closed
+requests: the (hub_id, status, due_at) index should keep the cost tied to
+the open requests, not the hub size.
+"""
+from django.utils import timezone
+
+from gdpr.deadlines import deadline_summary, open_requests
+
+from .harness import measure, result, scratch_hub, seed_data_requests
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+# One open request in a hundred.
+STATUSES = ['pending'] + ['completed'] * 99
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            seed_data_requests(hub_id, size, statuses=STATUSES)
+            plan = open_requests(hub_id).filter(due_at__lt=timezone.now()).explain()
+            summary, seconds, peak, queries = measure(deadline_summary, hub_id)
+            yield result(
+                'deadline_summary', size, seconds, peak, queries,
+                overdue=summary['overdue'], at_risk=summary['at_risk'],
+                uses_index='gdpr_dr_hub_status_due_idx' in plan,
+            )
@@ -0,0 +1,35 @@
+"""
+XLSX export: core ``export_to_excel`` vs the chunked write-only exporter.
+"""
+from apps.core.services import export_to_excel
+
+from gdpr.exports import build_xlsx
+from gdpr.models import ConsentRecord
+
+from .harness import measure, result, scratch_hub, seed_consent_records
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+FIELDS = ['consented', 'subject_name', 'subject_email', 'purpose', 'consent_date', 'withdrawal_date']
+HEADERS = ['Consented', 'Subject Name', 'Subject Email', 'Purpose', 'Consent Date', 'Withdrawal Date']
+
+
+def _core(qs):
+    response = export_to_excel(qs, fields=FIELDS, headers=HEADERS, filename='bench.xlsx')
+    return len(response.content)
+
+
+def _write_only(qs):
+    with build_xlsx(qs, FIELDS, HEADERS, title='bench') as output:
+        output.seek(0, 2)
+        return output.tell()
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            seed_consent_records(hub_id, size)
+            qs = ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False).order_by('consented', 'id')
+            for case, fn in (('xlsx_core', _core), ('xlsx_write_only', _write_only)):
+                nbytes, seconds, peak, queries = measure(fn, qs)
+                yield result(case, size, seconds, peak, queries, bytes=nbytes)
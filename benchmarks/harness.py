@@ -0,0 +1,244 @@
+"""
+Shared helpers for the GDPR benchmarks: timing, peak memory, query counts
+and seeding.
+"""
+import random
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.db import connection
+from django.utils import timezone
+
+from gdpr.models import (
+    ArchivedConsentRecord, ArchivedDataRequest, ConsentEvent, ConsentRecord, DataRequest, HubStat,
+)
+from gdpr.cache import invalidate_hub_snapshot, invalidate_queryset
+from gdpr.stats import reconcile
+
+SEED_BATCH_SIZE = 10_000
+
+# ``created_by`` of every row the seeders write, so a seeded hub can be told
+# apart from one holding real data (see :func:`seeded_only`).
+SEEDER_ID = uuid.UUID('00000000-0000-4000-8000-000000005eed')
+
+# Models holding GDPR rows of a hub, dropped by :func:`drop_hub`.
+HUB_MODELS = (ConsentEvent, ConsentRecord, DataRequest, ArchivedConsentRecord, ArchivedDataRequest)
+
+PURPOSES = ['marketing', 'analytics', 'third_party_sharing', 'newsletter', 'profiling']
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` that counts queries without keeping their SQL."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(fn, *args, **kwargs):
+    """
+    Run *fn* once; return ``(result, seconds, peak_bytes, queries)``: peak of
+    the Python heap (via tracemalloc) and queries on the default connection.
+    """
+    counter = QueryCounter()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(counter):
+            result = fn(*args, **kwargs)
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak, counter.count
+
+
+def result(case, size, seconds, peak=None, queries=None, **extra):
+    row = {'case': case, 'size': size, 'seconds': round(seconds, 4)}
+    if peak is not None:
+        row['peak_mb'] = round(peak / 1024 / 1024, 2)
+    if queries is not None:
+        row['queries'] = queries
+    row.update(extra)
+    return row
+
+
+def _searchable(records):
+    for record in records:
+        record.refresh_search_text()
+        yield record
+
+
+def seed_consent_records(hub_id, count, batch_size=SEED_BATCH_SIZE):
+    now = timezone.now()
+    for start in range(0, count, batch_size):
+        ConsentRecord.objects.bulk_create(_searchable(
+            ConsentRecord(
+                hub_id=hub_id,
+                created_by=SEEDER_ID,
+                subject_name=f'Subject {i}',
+                subject_email=f'subject{i}@example.com',
+                purpose=PURPOSES[i % len(PURPOSES)],
+                consented=i % 3 != 0,
+                consent_date=now,
+                withdrawal_date=None if i % 3 else now,
+            )
+            for i in range(start, min(start + batch_size, count))
+        ))
+
+
+DATA_REQUEST_STATUSES = ['pending', 'in_progress', 'completed', 'completed', 'completed']
+
+
+def seed_data_requests(hub_id, count, batch_size=SEED_BATCH_SIZE, statuses=DATA_REQUEST_STATUSES):
+    types = ['access', 'erasure', 'portability', 'rectification']
+    now = timezone.now()
+    for start in range(0, count, batch_size):
+        DataRequest.objects.bulk_create(_searchable(
+            DataRequest(
+                hub_id=hub_id,
+                created_by=SEEDER_ID,
+                subject_name=f'Subject {i}',
+                subject_email=f'subject{i}@example.com',
+                request_type=types[i % len(types)],
+                status=statuses[i % len(statuses)],
+                # Deadlines spread over the last year and the next month.
+                due_at=now + timedelta(days=30 - i % 395),
+            )
+            for i in range(start, min(start + batch_size, count))
+        ))
+
+
+# Realistic hub: (purpose, share of consent records, consent rate).
+PURPOSE_PROFILE = [
+    ('marketing', 35, 0.55),
+    ('analytics', 25, 0.75),
+    ('newsletter', 20, 0.8),
+    ('third_party_sharing', 12, 0.35),
+    ('profiling', 8, 0.3),
+]
+
+# (request_type, share of data requests).
+REQUEST_TYPE_PROFILE = [('access', 50), ('erasure', 30), ('portability', 10), ('rectification', 10)]
+
+# Purposes per subject, weighted towards one or two.
+PURPOSES_PER_SUBJECT = [1, 1, 1, 2, 2, 3, 4, 5]
+
+FIRST_NAMES = ['Ana', 'Luis', 'Marta', 'Jorge', 'Lucia', 'Pablo', 'Elena', 'David', 'Sara', 'Hugo', 'Irene', 'Mario']
+LAST_NAMES = ['Garcia', 'Martinez', 'Lopez', 'Sanchez', 'Perez', 'Gomez', 'Martin', 'Jimenez', 'Ruiz', 'Diaz']
+
+
+def _weighted_sample(rng, weighted, k):
+    """*k* distinct items of ``[(item, weight), ...]``, more likely the heavier ones."""
+    keyed = sorted(weighted, key=lambda entry: rng.random() ** (1 / entry[1]), reverse=True)
+    return [item for item, _weight in keyed[:k]]
+
+
+def _backdate(model, created, now):
+    """Move the rows of *created* (``{days_ago: [pk, ...]}``) back in time, one UPDATE per day."""
+    for days_ago, pks in created.items():
+        moment = now - timedelta(days=days_ago)
+        model.all_objects.filter(pk__in=pks).update(created_at=moment, updated_at=moment)
+
+
+def _realistic_consents(hub_id, rng, count, days, now):
+    weights = [(purpose, share) for purpose, share, _rate in PURPOSE_PROFILE]
+    rates = {purpose: rate for purpose, _share, rate in PURPOSE_PROFILE}
+    i = subject = 0
+    while i < count:
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        email = f'{name.replace(" ", ".").lower()}.{subject}@example.com'
+        for purpose in _weighted_sample(rng, weights, rng.choice(PURPOSES_PER_SUBJECT)):
+            if i == count:
+                break
+            # Oldest first, spread evenly over *days*.
+            days_ago = days - 1 - i * days // count
+            consented = rng.random() < rates[purpose]
+            given = now - timedelta(days=days_ago)
+            yield days_ago, ConsentRecord(
+                hub_id=hub_id, created_by=SEEDER_ID, subject_name=name, subject_email=email, purpose=purpose, consented=consented,
+                consent_date=given,
+                withdrawal_date=None if consented else given + timedelta(days=rng.randrange(days_ago + 1)),
+            )
+            i += 1
+        subject += 1
+
+
+def _realistic_requests(hub_id, rng, count, days, now):
+    types = [request_type for request_type, _share in REQUEST_TYPE_PROFILE]
+    shares = [share for _type, share in REQUEST_TYPE_PROFILE]
+    for i in range(count):
+        days_ago = days - 1 - i * days // count
+        received = now - timedelta(days=days_ago)
+        # Recent requests are still open; older ones are closed, bar a few overdue stragglers.
+        if days_ago < 30:
+            status = rng.choice(['pending', 'pending', 'in_progress', 'completed'])
+        else:
+            status = 'pending' if rng.random() < 0.01 else rng.choices(['completed', 'failed'], [98, 2])[0]
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        yield days_ago, DataRequest(
+            hub_id=hub_id, created_by=SEEDER_ID, subject_name=name, subject_email=f'{name.replace(" ", ".").lower()}.{i}@example.com',
+            request_type=rng.choices(types, shares)[0], status=status,
+            due_at=received + timedelta(days=30),
+            completed_at=received + timedelta(days=rng.randrange(1, 30)) if status == 'completed' else None,
+        )
+
+
+def seed_hub(hub_id, consent_records=0, data_requests=0, days=730, seed=0, batch_size=SEED_BATCH_SIZE):
+    """
+    Bulk-load *consent_records* and *data_requests* with realistic
+    distributions (``PURPOSE_PROFILE``, ``REQUEST_TYPE_PROFILE``, creation
+    dates spread over *days*) into *hub_id*, then rebuild its statistics.
+    The same *seed* always produces the same data.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    for model, rows in (
+        (ConsentRecord, _realistic_consents(hub_id, rng, consent_records, days, now)),
+        (DataRequest, _realistic_requests(hub_id, rng, data_requests, days, now)),
+    ):
+        while batch := list(islice(rows, batch_size)):
+            created = defaultdict(list)
+            for days_ago, obj in batch:
+                obj.refresh_search_text()
+                created[days_ago].append(obj.pk)
+            model.objects.bulk_create([obj for _days_ago, obj in batch])
+            _backdate(model, created, now)
+    reconcile(hub_id)
+
+
+def seeded_only(hub_id):
+    """Whether every GDPR row of *hub_id* was written by the seeders (or it has none)."""
+    return not any(model.all_objects.filter(hub_id=hub_id).exclude(created_by=SEEDER_ID).exists() for model in HUB_MODELS)
+
+
+def drop_hub(hub_id):
+    """
+    Remove every GDPR row of *hub_id* without loading them, ledger and
+    statistics included, then drop its consent cache entries and assistant
+    snapshot. Meant for benchmark hubs: check :func:`seeded_only` first.
+    """
+    invalidate_queryset(ConsentRecord.all_objects.filter(hub_id=hub_id))
+    with connection.cursor() as cursor:
+        for model in HUB_MODELS + (HubStat,):
+            value = model._meta.get_field('hub_id').get_db_prep_value(hub_id, connection)
+            cursor.execute(f'DELETE FROM {model._meta.db_table} WHERE hub_id = %s', [value])
+    invalidate_hub_snapshot(hub_id)
+
+
+@contextmanager
+def scratch_hub():
+    """Yield a fresh hub id whose rows are dropped on exit."""
+    hub_id = uuid.uuid4()
+    try:
+        yield hub_id
+    finally:
+        drop_hub(hub_id)
@@ -0,0 +1,31 @@
+"""
+CSV import throughput: rows/second for ``import_consent_csv``.
+"""
+import csv
+import tempfile
+
+from gdpr.imports import import_consent_csv
+
+from .harness import PURPOSES, measure, result, scratch_hub
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+
+def _write_csv(fileobj, size):
+    writer = csv.writer(fileobj)
+    writer.writerow(['subject_name', 'subject_email', 'purpose', 'consented', 'consent_date', 'withdrawal_date'])
+    for i in range(size):
+        consented = i % 3 != 0
+        writer.writerow([
+            f'Subject {i}', f'subject{i}@example.com', PURPOSES[i % len(PURPOSES)], consented,
+            '2024-01-01T10:00:00+00:00', '' if consented else '2024-06-01T10:00:00+00:00',
+        ])
+    fileobj.seek(0)
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id, tempfile.TemporaryFile('w+', newline='') as fileobj:
+            _write_csv(fileobj, size)
+            totals, seconds, peak, queries = measure(import_consent_csv, fileobj, hub_id)
+            yield result('import_csv', size, seconds, peak, queries, imported=totals['imported'], rows_per_second=round(size / seconds))
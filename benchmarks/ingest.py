@@ -0,0 +1,51 @@
+"""
+Consent ingestion load test: sustained events/second through the buffer.
+
+Events arrive in request-sized batches, as a banner endpoint would receive
+them; one in four events repeats an earlier subject so coalescing and
+upserts on existing rows are exercised. Every event is also appended to the
+ledger, so this measures both writes.
+"""
+import random
+import time
+
+from django.utils import timezone
+
+from gdpr.ingest import ConsentIngestBuffer
+
+from .harness import PURPOSES, result, scratch_hub
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+REQUEST_BATCH = 20
+
+
+def _events(size, seed=0):
+    rng = random.Random(seed)
+    now = timezone.now()
+    for i in range(size):
+        subject = rng.randrange(i) if i and i % 4 == 0 else i
+        yield {
+            'subject_email': f'visitor{subject}@example.com',
+            'purpose': PURPOSES[subject % len(PURPOSES)],
+            'consented': rng.random() < 0.7,
+            'subject_name': '',
+            'timestamp': now,
+        }
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            buffer = ConsentIngestBuffer(flush_interval=0)
+            batch = []
+            started = time.perf_counter()
+            for event in _events(size):
+                batch.append(event)
+                if len(batch) == REQUEST_BATCH:
+                    buffer.add(hub_id, batch)
+                    batch = []
+            buffer.add(hub_id, batch)
+            buffer.flush()
+            seconds = time.perf_counter() - started
+            yield result('ingest_buffered', size, seconds, events_per_second=round(size / seconds), flush_size=buffer.flush_size)
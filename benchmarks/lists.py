@@ -0,0 +1,65 @@
+"""
+List views and dashboard on a realistic hub (``seed_hub``): the queries
+``consent_records_list``, ``data_requests_list``, their infinite scroll and
+the dashboard run, without template rendering.
+
+The first page should cost the same at every size; a deep page shows what
+OFFSET costs, the scroll chunk what the keyset cursor saves.
+"""
+from django.core.paginator import Paginator
+
+from gdpr.deadlines import deadline_summary
+from gdpr.models import ConsentRecord, DataRequest
+from gdpr.pagination import keyset_order, keyset_page
+from gdpr.search import search
+from gdpr.stats import hub_count, hub_stats
+
+from .harness import measure, result, scratch_hub, seed_hub
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+PER_PAGE = 12
+
+SCROLL_CHUNK_SIZE = 50
+
+# (metric, model, default sort field, search query)
+LISTS = [
+    ('consent_records', ConsentRecord, 'consented', 'market'),
+    ('data_requests', DataRequest, 'request_type', 'erasure'),
+]
+
+
+def _page(qs, field_name, number, metric, hub_id):
+    paginator = Paginator(qs.order_by(*keyset_order(field_name)), PER_PAGE)
+    page = paginator.get_page(number)
+    return len(page.object_list), hub_count(hub_id, metric)
+
+
+def _second_chunk(qs, field_name):
+    _rows, cursor = keyset_page(qs, field_name, size=SCROLL_CHUNK_SIZE)
+    rows, _cursor = keyset_page(qs, field_name, cursor=cursor, size=SCROLL_CHUNK_SIZE)
+    return len(rows)
+
+
+def _dashboard(hub_id):
+    return hub_stats(hub_id), deadline_summary(hub_id)
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            seed_hub(hub_id, consent_records=size, data_requests=size // 10)
+            for metric, model, field_name, query in LISTS:
+                qs = model.objects.filter(hub_id=hub_id, is_deleted=False)
+                last_page = max(hub_count(hub_id, metric) // PER_PAGE, 1)
+                cases = [
+                    (f'{metric}_list', lambda: _page(qs, field_name, 1, metric, hub_id)),
+                    (f'{metric}_list_last_page', lambda: _page(qs, field_name, last_page, metric, hub_id)),
+                    (f'{metric}_list_search', lambda: _page(search(qs, query), field_name, 1, metric, hub_id)),
+                    (f'{metric}_scroll', lambda: _second_chunk(qs, field_name)),
+                ]
+                for case, fn in cases:
+                    _value, seconds, peak, queries = measure(fn)
+                    yield result(case, size, seconds, peak, queries)
+            _value, seconds, peak, queries = measure(_dashboard, hub_id)
+            yield result('dashboard', size, seconds, peak, queries)
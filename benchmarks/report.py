@@ -0,0 +1,98 @@
+"""
+Machine-readable benchmark reports, for comparing runs across commits.
+
+A report is JSON: the environment it was measured in (commit, Python,
+Django, database) and one row per (suite, case, size) with ``seconds`` and,
+where measured, ``peak_mb`` and ``queries``. :func:`compare` lists the rows
+of a new report that got slower, heavier or chattier than a baseline.
+"""
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.db import connection
+from django.utils import timezone
+
+REPORT_VERSION = 1
+
+# Relative growth tolerated before seconds or peak memory count as a regression.
+DEFAULT_TOLERANCE = 0.25
+
+# Below these, differences are noise.
+MIN_SECONDS = 0.005
+MIN_PEAK_MB = 1.0
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    return {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'platform': platform.platform(),
+    }
+
+
+def build_report(rows):
+    """A report for *rows*: result dicts, each with its ``suite``."""
+    return {
+        'version': REPORT_VERSION,
+        'created_at': timezone.now().isoformat(),
+        'environment': environment(),
+        'results': list(rows),
+    }
+
+
+def write_report(report, path):
+    Path(path).write_text(json.dumps(report, indent=2, default=str) + '\n')
+
+
+def read_report(path):
+    report = json.loads(Path(path).read_text())
+    if report.get('version') != REPORT_VERSION:
+        raise ValueError(f'Unsupported benchmark report version: {report.get("version")}')
+    return report
+
+
+def row_key(row):
+    """Identity of a result row: suite, case, size and its string parameters (e.g. the search query)."""
+    params = tuple(sorted((k, v) for k, v in row.items() if isinstance(v, str) and k not in ('suite', 'case')))
+    return (row['suite'], row['case'], row['size'], params)
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Regressions of report *current* against report *baseline*: a list of
+    ``{'key', 'metric', 'baseline', 'current'}`` for every row measured in
+    both whose seconds or peak memory grew by more than *tolerance*, or that
+    ran more queries.
+    """
+    before = {row_key(row): row for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        old = before.get(row_key(row))
+        if old is None:
+            continue
+        checks = [
+            ('seconds', MIN_SECONDS, tolerance),
+            ('peak_mb', MIN_PEAK_MB, tolerance),
+            ('queries', 0, 0),
+        ]
+        for metric, floor, allowed in checks:
+            if metric not in row or metric not in old:
+                continue
+            if row[metric] - old[metric] > floor and row[metric] > old[metric] * (1 + allowed):
+                regressions.append({'key': row_key(row), 'metric': metric, 'baseline': old[metric], 'current': row[metric]})
+    return regressions
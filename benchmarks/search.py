@@ -0,0 +1,55 @@
+"""
+List search: the former multi-column ``icontains`` filter vs ``search.search``.
+
+Each query is timed as the list view runs it (a count plus the first page)
+and through ``suggest`` for search-as-you-type. Queries cover a common
+substring, a selective one and one with no match.
+"""
+import time
+
+from django.db import connection
+from django.db.models import Q
+
+from gdpr.models import ConsentRecord
+from gdpr.search import search, suggest
+
+from .harness import QueryCounter, result, scratch_hub, seed_consent_records
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+QUERIES = ['market', 'subject1234@', 'nobody-here']
+
+PAGE_SIZE = 25
+
+REPEAT = 5
+
+
+def _icontains(qs, query):
+    return qs.filter(Q(subject_name__icontains=query) | Q(subject_email__icontains=query) | Q(purpose__icontains=query))
+
+
+def _list_page(qs):
+    return qs.count(), len(qs.order_by('consented', 'id')[:PAGE_SIZE])
+
+
+def _timed(fn):
+    counter = QueryCounter()
+    started = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        for _ in range(REPEAT):
+            value = fn()
+    return value, (time.perf_counter() - started) / REPEAT, counter.count // REPEAT
+
+
+def run(sizes=DEFAULT_SIZES):
+    for size in sizes:
+        with scratch_hub() as hub_id:
+            seed_consent_records(hub_id, size)
+            qs = ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+            for query in QUERIES:
+                (matches, _page), seconds, queries = _timed(lambda: _list_page(_icontains(qs, query)))
+                yield result('search_icontains', size, seconds, queries=queries, query=query, matches=matches)
+                (matches, _page), seconds, queries = _timed(lambda: _list_page(search(qs, query)))
+                yield result('search_indexed', size, seconds, queries=queries, query=query, matches=matches)
+                suggestions, seconds, queries = _timed(lambda: suggest(qs, query))
+                yield result('search_suggest', size, seconds, queries=queries, query=query, returned=len(suggestions))
@@ -0,0 +1,150 @@
+"""
+Chunked bulk actions on consent records and data requests.
+
+A selection is either an explicit list of ids or a queryset ("everything
+matching the current search"). Either way it is walked in chunks of
+``BULK_CHUNK_SIZE`` primary keys and every chunk is one short transaction:
+the chunk's rows still matching the action are locked (``SELECT ... FOR
+UPDATE``), then an ``UPDATE ... WHERE id IN (<locked>)`` plus the bookkeeping that
+``QuerySet.update()`` skips (dashboard statistics, consent ledger, consent
+cache, search column). Actions return the number of rows changed.
+"""
+from django.db import connection, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import consent_cache
+from .ledger import append_consent_events
+from .models import ConsentRecord, DataRequest
+from .stats import apply_queryset
+
+BULK_CHUNK_SIZE = 1000
+
+CONSENT_ACTIONS = ('delete', 'withdraw', 'restore')
+
+DATA_REQUEST_ACTIONS = ('delete', 'set_status')
+
+
+def _chunk_size(requested):
+    limit = connection.features.max_query_params
+    return min(requested, limit - 10) if limit else requested
+
+
+def iter_id_chunks(qs, ids=None, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Yield lists of primary keys from *qs*: those in *ids* when given, else
+    every row of *qs*, walked in primary key order (so rows that stop
+    matching after an update are not skipped or revisited).
+    """
+    size = _chunk_size(chunk_size)
+    if ids is not None:
+        for start in range(0, len(ids), size):
+            chunk = list(qs.filter(pk__in=ids[start:start + size]).values_list('pk', flat=True))
+            if chunk:
+                yield chunk
+        return
+    pks = qs.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        chunk = list((pks if last is None else pks.filter(pk__gt=last))[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def _lock_chunk(model, chunk, predicate, *fields):
+    """
+    Lock the rows of *chunk* that still match *predicate* and return their
+    ``pk`` and *fields*. Must run inside the chunk's transaction: rows changed
+    since the chunk was read are left out.
+    """
+    return list(model.objects.filter(predicate, pk__in=chunk).select_for_update().values_list('pk', *fields))
+
+
+def _update_chunk(model, chunk, **changes):
+    """``UPDATE`` one chunk, keeping the dashboard statistics in step."""
+    rows = model.objects.filter(pk__in=chunk)
+    apply_queryset(rows, sign=-1)
+    count = rows.update(**changes)
+    apply_queryset(model.all_objects.filter(pk__in=chunk), sign=1)
+    return count
+
+
+def bulk_consent_action(qs, action, ids=None, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Apply *action* (``delete``, ``withdraw`` or ``restore``) to the consent
+    records of *qs*, optionally narrowed to *ids*. Withdraw and restore only
+    touch rows whose consent changes and append a ledger event for each.
+    """
+    if action not in CONSENT_ACTIONS:
+        raise ValueError(f'Unknown action: {action}')
+    now = timezone.now()
+    if action == 'withdraw':
+        predicate = Q(consented=True)
+        changes = {'consented': False, 'withdrawal_date': now, 'updated_at': now}
+    elif action == 'restore':
+        predicate = Q(consented=False)
+        changes = {'consented': True, 'withdrawal_date': None, 'consent_date': Coalesce('consent_date', Value(now)), 'updated_at': now}
+    else:
+        predicate = Q()
+        changes = {'is_deleted': True, 'deleted_at': now, 'updated_at': now}
+
+    total = 0
+    for chunk in iter_id_chunks(qs.filter(predicate), ids, chunk_size):
+        with transaction.atomic():
+            rows = _lock_chunk(ConsentRecord, chunk, predicate, 'hub_id', 'subject_email', 'purpose')
+            if not rows:
+                continue
+            keys = [key for _pk, *key in rows]
+            total += _update_chunk(ConsentRecord, [pk for pk, *_key in rows], **changes)
+            if action != 'delete':
+                by_hub = {}
+                for hub_id, email, purpose in keys:
+                    by_hub.setdefault(hub_id, []).append({
+                        'subject_email': email, 'purpose': purpose,
+                        'consented': action == 'restore', 'timestamp': now,
+                    })
+                for hub_id, events in by_hub.items():
+                    append_consent_events(hub_id, events, source='bulk')
+        consent_cache.invalidate(keys)
+    return total
+
+
+def bulk_data_request_action(qs, action, ids=None, status=None, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Apply *action* (``delete`` or ``set_status``) to the data requests of
+    *qs*, optionally narrowed to *ids*. Moving to ``completed`` stamps
+    ``completed_at`` where it is not set yet.
+    """
+    if action not in DATA_REQUEST_ACTIONS:
+        raise ValueError(f'Unknown action: {action}')
+    now = timezone.now()
+    if action == 'set_status':
+        status = (status or '').strip()
+        if not status or len(status) > DataRequest._meta.get_field('status').max_length:
+            raise ValueError('Invalid status.')
+        predicate = ~Q(status=status)
+        # A bulk status change must fail workers' compare-and-set (see workqueue.py).
+        changes = {'status': status, 'updated_at': now, 'version': F('version') + 1}
+        if status == 'completed':
+            changes['completed_at'] = Coalesce('completed_at', Value(now))
+    else:
+        predicate = Q()
+        changes = {'is_deleted': True, 'deleted_at': now, 'updated_at': now}
+
+    total = 0
+    for chunk in iter_id_chunks(qs.filter(predicate), ids, chunk_size):
+        with transaction.atomic():
+            chunk = [pk for pk, in _lock_chunk(DataRequest, chunk, predicate)]
+            if not chunk:
+                continue
+            total += _update_chunk(DataRequest, chunk, **changes)
+            if action == 'set_status':
+                # status is part of search_text.
+                rows = list(DataRequest.all_objects.filter(pk__in=chunk).only('pk', *DataRequest.SEARCH_FIELDS))
+                for row in rows:
+                    row.refresh_search_text()
+                DataRequest.all_objects.bulk_update(rows, ['search_text'])
+    return total
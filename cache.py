@@ -0,0 +1,135 @@
+"""
+Consent-state cache.
+
+``has_consent`` is called on every checkout and every email send, so its
+answer is cached per (hub, normalized email, purpose) in two tiers:
+
+* an in-process LRU, bounded by ``GDPR_CONSENT_CACHE_LOCAL_SIZE`` entries and
+  kept for at most ``GDPR_CONSENT_CACHE_LOCAL_TTL`` seconds, and
+* Django's cache framework, for ``GDPR_CONSENT_CACHE_TIMEOUT`` seconds.
+
+Writes invalidate both tiers of the current process and the shared tier for
+everyone (see ``signals.py`` and ``invalidate_queryset``), once when the
+write is made and again when its transaction commits. Other processes' LRU
+entries expire by TTL, which bounds their staleness.
+
+The per-hub assistant snapshot (``ai_context.hub_snapshot``) is kept in the
+shared tier only, for ``GDPR_HUB_SNAPSHOT_TIMEOUT`` seconds, and dropped by
+:func:`invalidate_hub_snapshot` whenever the hub's statistics move.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import normalize_email
+
+
+class ConsentCache:
+
+    def __init__(self, local_size=None, local_ttl=None, timeout=None):
+        self.local_size = local_size if local_size is not None else getattr(settings, 'GDPR_CONSENT_CACHE_LOCAL_SIZE', 10_000)
+        self.local_ttl = local_ttl if local_ttl is not None else getattr(settings, 'GDPR_CONSENT_CACHE_LOCAL_TTL', 5)
+        self.timeout = timeout if timeout is not None else getattr(settings, 'GDPR_CONSENT_CACHE_TIMEOUT', 300)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @staticmethod
+    def key(hub_id, email, purpose):
+        digest = hashlib.sha1(f'{normalize_email(email)}\0{purpose}'.encode()).hexdigest()
+        return f'gdpr:consent:{hub_id}:{digest}'
+
+    def get(self, hub_id, email, purpose, loader):
+        """Cached ``loader()`` result for the (hub, email, purpose) triple."""
+        key = self.key(hub_id, email, purpose)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry[1] > now:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                return entry[0]
+
+        value = cache.get(key)
+        if value is not None:
+            value = bool(value)
+            self.shared_hits += 1
+        else:
+            value = bool(loader())
+            cache.set(key, int(value), self.timeout)
+            self.misses += 1
+
+        with self._lock:
+            self._local[key] = (value, now + self.local_ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, keys):
+        """
+        Drop the given (hub_id, email, purpose) triples from both tiers. Inside
+        a transaction they are dropped again once it commits: until then a
+        concurrent reader still sees, and may cache, the old committed state.
+        """
+        cache_keys = {self.key(*k) for k in keys}
+        if not cache_keys:
+            return
+        self._drop(cache_keys)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._drop(cache_keys))
+
+    def _drop(self, cache_keys):
+        with self._lock:
+            for key in cache_keys:
+                self._local.pop(key, None)
+            self.invalidations += len(cache_keys)
+        cache.delete_many(list(cache_keys))
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def reset_stats(self):
+        self.local_hits = self.shared_hits = self.misses = 0
+        self.evictions = self.invalidations = 0
+
+    def stats(self):
+        """Hit/miss counters of this process, for sizing the cache."""
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': round((lookups - self.misses) / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'local_entries': len(self._local),
+            'local_size': self.local_size,
+        }
+
+
+consent_cache = ConsentCache()
+
+
+def invalidate_queryset(qs):
+    """Invalidate every consent state touched by *qs*; call before a ``qs.update()``."""
+    consent_cache.invalidate(qs.values_list('hub_id', 'subject_email', 'purpose').iterator())
+
+
+def hub_snapshot_key(hub_id):
+    return f'gdpr:snapshot:{hub_id}'
+
+
+def hub_snapshot_timeout():
+    return getattr(settings, 'GDPR_HUB_SNAPSHOT_TIMEOUT', 60)
+
+
+def invalidate_hub_snapshot(hub_id):
+    cache.delete(hub_snapshot_key(hub_id))
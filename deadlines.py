@@ -0,0 +1,64 @@
+"""
+Statutory deadlines of data requests.
+
+``DataRequest.due_at`` is set when a request is created (``RESPONSE_DAYS``
+after receipt) and moved once by :func:`record_extension`. Overdue and
+at-risk queries filter on the open statuses and ``due_at`` and are answered
+from the ``(hub_id, status, due_at)`` index, so closed requests (the bulk of
+a hub's history) are never read.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import EXTENSION_DAYS, OPEN_STATUSES, RESPONSE_DAYS, DataRequest
+from .workqueue import update_if_current
+
+# Open requests due within this many days are "at risk".
+AT_RISK_DAYS = 7
+
+DEADLINE_LIST_LIMIT = 10
+
+
+class ExtensionError(ValueError):
+    """Raised when a request cannot be extended (closed, or extended already)."""
+
+
+def open_requests(hub_id):
+    return DataRequest.objects.filter(hub_id=hub_id, status__in=OPEN_STATUSES)
+
+
+def deadline_summary(hub_id, limit=DEADLINE_LIST_LIMIT, now=None):
+    """
+    Overdue and at-risk open requests of *hub_id*: ``{'overdue', 'at_risk',
+    'requests'}``, the latter being the *limit* most urgent ones.
+    """
+    now = now or timezone.now()
+    urgent = open_requests(hub_id).filter(due_at__lt=now + timedelta(days=AT_RISK_DAYS))
+    return {
+        'overdue': urgent.filter(due_at__lt=now).count(),
+        'at_risk': urgent.filter(due_at__gte=now).count(),
+        'requests': list(urgent.order_by('due_at', 'id').only(
+            'id', 'subject_name', 'request_type', 'status', 'due_at', 'extended_at',
+        )[:limit]),
+    }
+
+
+def record_extension(data_request, days=EXTENSION_DAYS, reason=''):
+    """
+    Extend the deadline of an open request by *days* (at most once, as the
+    regulation allows), noting *reason*. Raises :class:`ExtensionError`.
+    Returns whether it was written (False: changed concurrently).
+    """
+    if not data_request.is_open:
+        raise ExtensionError('Only open requests can be extended.')
+    if data_request.extended_at is not None:
+        raise ExtensionError('The deadline has already been extended.')
+    if not 0 < days <= EXTENSION_DAYS:
+        raise ExtensionError(f'An extension is 1 to {EXTENSION_DAYS} days.')
+    now = timezone.now()
+    base = data_request.due_at or (data_request.created_at + timedelta(days=RESPONSE_DAYS))
+    changes = {'due_at': base + timedelta(days=days), 'extended_at': now}
+    if reason:
+        changes['notes'] = '\n'.join(filter(None, [data_request.notes, f'[{now:%Y-%m-%d}] Deadline extended: {reason}']))
+    return update_if_current(data_request, **changes)
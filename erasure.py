@@ -0,0 +1,256 @@
+"""
+Erasure of a data subject's data across ERPlora modules.
+
+Every module that stores personal data registers one :class:`ErasureHandler`
+per kind of row, in the same way as the assistant's ``register_tool``. The
+same handlers collect the subject's data for access and portability
+archives (``archives.py``)::
+
+    # <app>/gdpr_handlers.py
+    from gdpr.erasure import ErasureHandler, register_handler
+
+    @register_handler
+    class CustomerHandler(ErasureHandler):
+        name = 'customers'
+        module_id = 'customers'
+        anonymize = {'name': '', 'email': '', 'phone': ''}
+
+        def queryset(self, hub_id, subject_email):
+            from customers.models import Customer
+            return Customer.all_objects.filter(hub_id=hub_id, email__iexact=subject_email)
+
+``gdpr_handlers`` modules are imported at startup (:func:`autodiscover_handlers`).
+:func:`run_erasure` runs the handlers concurrently in a bounded thread pool,
+each walking its rows in primary key batches of one transaction each, and
+stores a per-handler report on the ``DataRequest``. Real erasures run in
+``gdpr_worker`` under the request's lease (:func:`queue_erasure`, see
+``workqueue.py``); only dry runs are run inline.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .bulk import iter_id_chunks
+from .models import ArchivedConsentRecord, ArchivedDataRequest, ConsentEvent, ConsentRecord, DataRequest, normalize_email
+
+logger = logging.getLogger(__name__)
+
+ERASURE_BATCH_SIZE = 500
+
+ERASURE_MAX_WORKERS = 4
+
+_registry = {}
+
+
+class ErasureHandler:
+    """
+    Finds and erases one kind of subject data. Subclasses set ``name`` and
+    ``module_id`` and implement :meth:`queryset`. Rows are deleted, or updated
+    with the ``anonymize`` field values when set (for rows other data must
+    keep pointing at, such as customers on invoices).
+    """
+    name = None
+    module_id = None
+    anonymize = None
+    batch_size = ERASURE_BATCH_SIZE
+    # Columns written to subject data archives; all of them when empty.
+    export_fields = ()
+    # Whether subject data archives include these rows at all.
+    exported = True
+
+    def queryset(self, hub_id, subject_email):
+        """The rows of *hub_id* holding data of *subject_email* (normalized), including soft-deleted ones."""
+        raise NotImplementedError
+
+    def erase(self, rows):
+        """Erase one batch (a queryset of at most ``batch_size`` rows); returns the number of rows erased."""
+        if self.anonymize:
+            return rows.update(**self.anonymize)
+        _total, per_model = rows.delete()
+        return per_model.get(rows.model._meta.label, 0)
+
+    def export_rows(self, rows):
+        """The rows of :meth:`queryset` as dicts for the subject's data archive."""
+        return rows.order_by('pk').values(*self.export_fields)
+
+
+def register_handler(cls):
+    """Class decorator registering an :class:`ErasureHandler` under its ``name``."""
+    if not cls.name or not cls.module_id:
+        raise ValueError(f'{cls.__name__} must set name and module_id')
+    _registry[cls.name] = cls()
+    return cls
+
+
+def get_handlers():
+    return list(_registry.values())
+
+
+def autodiscover_handlers():
+    """Import the ``gdpr_handlers`` module of every installed app."""
+    autodiscover_modules('gdpr_handlers')
+
+
+@register_handler
+class ConsentRecordHandler(ErasureHandler):
+    name = 'consent_records'
+    module_id = 'gdpr'
+    export_fields = ('id', 'subject_name', 'subject_email', 'purpose', 'consented', 'consent_date', 'withdrawal_date', 'created_at', 'updated_at', 'is_deleted')
+
+    def queryset(self, hub_id, subject_email):
+        return ConsentRecord.all_objects.filter(hub_id=hub_id, subject_email=subject_email)
+
+
+@register_handler
+class ArchivedConsentRecordHandler(ConsentRecordHandler):
+    """Consent records moved to the archive table (see ``archiver.py``)."""
+    name = 'archived_consent_records'
+
+    def queryset(self, hub_id, subject_email):
+        return ArchivedConsentRecord.all_objects.filter(hub_id=hub_id, subject_email=subject_email)
+
+
+@register_handler
+class ConsentEventHandler(ErasureHandler):
+    """The consent ledger is append-only, except for erasure."""
+    name = 'consent_events'
+    module_id = 'gdpr'
+    export_fields = ('id', 'subject_email', 'purpose', 'action', 'occurred_at', 'source')
+
+    def queryset(self, hub_id, subject_email):
+        return ConsentEvent.all_objects.filter(hub_id=hub_id, subject_email=subject_email)
+
+
+@register_handler
+class SubjectArchiveHandler(ErasureHandler):
+    """
+    Subject data archives built for the subject's access and portability
+    requests. The requests stay; their archive files are deleted once the
+    batch commits.
+    """
+    name = 'subject_archives'
+    module_id = 'gdpr'
+    exported = False
+    model = DataRequest
+
+    def queryset(self, hub_id, subject_email):
+        return self.model.all_objects.filter(hub_id=hub_id, subject_email__iexact=subject_email).exclude(archive='')
+
+    def erase(self, rows):
+        names = list(rows.values_list('archive', flat=True))
+        count = rows.update(archive='', archive_report=None, version=F('version') + 1, updated_at=timezone.now())
+        storage = self.model._meta.get_field('archive').storage
+        transaction.on_commit(lambda: _delete_files(storage, names), using=rows.db)
+        return count
+
+
+@register_handler
+class ArchivedSubjectArchiveHandler(SubjectArchiveHandler):
+    """Subject data archives of requests moved to the archive table (see ``archiver.py``)."""
+    name = 'archived_subject_archives'
+    model = ArchivedDataRequest
+
+
+def _delete_files(storage, names):
+    for name in names:
+        storage.delete(name)
+
+
+def _run_handler(handler, hub_id, subject_email, dry_run, progress=None):
+    """
+    Run one handler, calling *progress* after every batch; failures are
+    reported, not raised, so the other handlers still run.
+    """
+    started = time.perf_counter()
+    result = {'handler': handler.name, 'module': handler.module_id, 'found': 0, 'erased': 0, 'batches': 0, 'error': None}
+    try:
+        qs = handler.queryset(hub_id, subject_email)
+        if dry_run:
+            result['found'] = qs.count()
+        else:
+            for chunk in iter_id_chunks(qs, chunk_size=handler.batch_size):
+                with transaction.atomic(using=qs.db):
+                    result['erased'] += handler.erase(qs.model._base_manager.using(qs.db).filter(pk__in=chunk))
+                result['found'] += len(chunk)
+                result['batches'] += 1
+                if progress:
+                    progress()
+    except Exception as e:
+        logger.exception('Erasure handler %s failed', handler.name)
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['seconds'] = round(time.perf_counter() - started, 4)
+    if progress:
+        progress()
+    return result
+
+
+def _run_handler_in_thread(args):
+    try:
+        return _run_handler(*args)
+    finally:
+        # Worker threads open their own connections.
+        connections.close_all()
+
+
+def run_erasure(data_request, dry_run=False, handlers=None, max_workers=ERASURE_MAX_WORKERS, progress=None):
+    """
+    Erase the data of *data_request*'s subject with every registered handler
+    (or *handlers*). With ``dry_run`` rows are only counted. *progress* is
+    called after every batch and handler, from the handler's thread.
+
+    Handlers run in up to *max_workers* threads; inside a transaction (where
+    other connections could not see its writes) they run one after another.
+    The report is stored on *data_request*, which moves to ``completed`` when
+    a real run finishes without errors, with a compare-and-set on
+    ``version``: when the request changed meanwhile nothing is stored and a
+    warning is logged. Returns the report.
+    """
+    handlers = get_handlers() if handlers is None else list(handlers)
+    subject_email = normalize_email(data_request.subject_email)
+    started = time.perf_counter()
+    jobs = [(handler, data_request.hub_id, subject_email, dry_run, progress) for handler in handlers]
+    in_transaction = any(connections[alias].in_atomic_block for alias in connections)
+    if max_workers > 1 and len(jobs) > 1 and not in_transaction:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs)), thread_name_prefix='gdpr-erasure') as pool:
+            results = list(pool.map(_run_handler_in_thread, jobs))
+    else:
+        results = [_run_handler(*job) for job in jobs]
+
+    now = timezone.now()
+    report = {
+        'dry_run': dry_run,
+        'finished_at': now.isoformat(),
+        'seconds': round(time.perf_counter() - started, 4),
+        'found': sum(r['found'] for r in results),
+        'erased': sum(r['erased'] for r in results),
+        'errors': sum(1 for r in results if r['error']),
+        'handlers': results,
+    }
+    from .workqueue import update_if_current
+    changes = {'erasure_report': report}
+    if not dry_run and not report['errors']:
+        changes.update(status='completed', completed_at=data_request.completed_at or now)
+    if not update_if_current(data_request, **changes):
+        logger.warning('Data request %s changed during its erasure; report not stored', data_request.pk)
+    return report
+
+
+def queue_erasure(data_request):
+    """
+    Queue *data_request* for ``gdpr_worker`` (see ``workqueue.py``), which
+    runs the erasure under its lease. Returns False, queueing nothing, while
+    a worker holds the request or when someone else changed it first (reload
+    it then).
+    """
+    from .workqueue import lease_held, update_if_current
+    if lease_held(data_request):
+        return False
+    return update_if_current(
+        data_request, status='pending', erasure_report={'state': 'queued'},
+        claimed_by='', lease_expires_at=None, attempts=0, last_error='',
+    )
@@ -1,7 +1,7 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
 
-from .models import ConsentRecord, DataRequest
+from .models import ConsentRecord, DataRequest, GdprSettings
 
 class ConsentRecordForm(forms.ModelForm):
     class Meta:
@@ -29,3 +29,12 @@ class DataRequestForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3}),
         }
 
+
+class GdprSettingsForm(forms.ModelForm):
+    class Meta:
+        model = GdprSettings
+        fields = ['deleted_retention_days', 'archive_after_days']
+        widgets = {
+            'deleted_retention_days': forms.NumberInput(attrs={'class': 'input input-sm w-full', 'min': 1}),
+            'archive_after_days': forms.NumberInput(attrs={'class': 'input input-sm w-full', 'min': 1}),
+        }
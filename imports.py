@@ -0,0 +1,187 @@
+"""
+Bulk import of historical consent records from CSV.
+
+The file is parsed as a stream; each row is validated with the field objects
+of ``ConsentRecordForm`` (no form instance per row) and valid rows are
+upserted in batches, one transaction per batch, together with the matching
+grant and withdrawal events on the consent ledger. An existing row holding
+a later consent or withdrawal date than the imported one is left alone. Invalid rows are written
+to an optional reject file together with the error.
+
+The upload view keeps that file in storage under ``IMPORT_REJECTS_DIR`` for
+download. It is deleted once downloaded, and ``gdpr_purge`` deletes files
+older than ``GDPR_IMPORT_REJECTS_TTL`` seconds (:func:`purge_import_rejects`)
+since they hold subject data.
+"""
+import csv
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import consent_cache
+from .forms import ConsentRecordForm
+from .ledger import UNIQUE_FIELDS, append_consent_events, is_stale
+from .models import ConsentRecord, normalize_email
+from .stats import apply_deltas, consent_upsert_deltas, existing_consent_state
+
+IMPORT_BATCH_SIZE = 5000
+
+IMPORT_FIELDS = list(ConsentRecordForm._meta.fields)
+
+UPDATE_FIELDS = ['subject_name', 'consented', 'consent_date', 'withdrawal_date', 'search_text', 'is_deleted', 'deleted_at', 'updated_at']
+
+IMPORT_REJECTS_DIR = 'gdpr/imports'
+
+IMPORT_REJECTS_TTL = 3600
+
+
+class CSVImportError(ValueError):
+    """Raised when the file cannot be imported at all (e.g. missing columns)."""
+
+
+def _column_index(header):
+    """Map form field names to column positions; accepts ``subject_email`` or ``Subject Email``."""
+    positions = {}
+    for position, title in enumerate(header):
+        name = title.strip().lstrip('\ufeff').lower().replace(' ', '_')
+        if name in IMPORT_FIELDS:
+            positions[name] = position
+    missing = [name for name in ('subject_email', 'purpose') if name not in positions]
+    if missing:
+        raise CSVImportError(f'Missing column(s): {", ".join(missing)}')
+    return positions
+
+
+def _ledger_events(record):
+    """
+    The grant and withdrawal events an imported row stands for. A row
+    without dates says nothing about when consent changed and adds none.
+    """
+    events = []
+    base = {'subject_email': record.subject_email, 'purpose': record.purpose}
+    if record.consent_date:
+        events.append(dict(base, consented=True, timestamp=record.consent_date))
+    if not record.consented and record.withdrawal_date:
+        events.append(dict(base, consented=False, timestamp=record.withdrawal_date))
+    return events
+
+
+def _changed_at(record):
+    dates = [d for d in (record.consent_date, record.withdrawal_date) if d]
+    return max(dates) if dates else None
+
+
+def _write_batch(hub_id, batch, update_existing):
+    """
+    Write one batch; returns the number of rows imported. Existing rows are
+    skipped without *update_existing*, and otherwise when they hold a later
+    consent or withdrawal date than the imported row.
+    """
+    with transaction.atomic():
+        existing = existing_consent_state(hub_id, batch, lock=True)
+        if not update_existing:
+            for key in existing:
+                batch.pop(key)
+            existing = {}
+        events = [event for record in batch.values() for event in _ledger_events(record)]
+        records = [record for key, record in batch.items() if not is_stale(existing.get(key), _changed_at(record))]
+        unique_fields = UNIQUE_FIELDS if connection.features.supports_update_conflicts_with_target else None
+        ConsentRecord.objects.bulk_create(records, update_conflicts=True, unique_fields=unique_fields, update_fields=UPDATE_FIELDS)
+        apply_deltas(hub_id, consent_upsert_deltas(existing, (record.__dict__ for record in records)))
+        append_consent_events(hub_id, events, source='import')
+    consent_cache.invalidate((hub_id, email, purpose) for email, purpose in batch)
+    return len(records)
+
+
+def import_consent_csv(fileobj, hub_id, batch_size=IMPORT_BATCH_SIZE, rejects=None, progress=None, update_existing=True):
+    """
+    Import consent records for *hub_id* from the text file *fileobj*.
+
+    *rejects* is an optional text file receiving invalid rows as CSV, with
+    the line number and error appended. *progress* is called after every
+    batch with the running totals. With ``update_existing=False`` rows for an
+    existing (subject, purpose) are skipped instead of overwriting it.
+
+    Returns ``{'rows', 'imported', 'rejected', 'seconds'}``.
+    """
+    started = time.perf_counter()
+    reader = csv.reader(fileobj)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise CSVImportError('The file is empty.')
+    positions = _column_index(header)
+    form_fields = {name: ConsentRecordForm.base_fields[name] for name in IMPORT_FIELDS}
+    reject_writer = None
+    if rejects is not None:
+        reject_writer = csv.writer(rejects)
+        reject_writer.writerow(header + ['line', 'error'])
+
+    totals = {'rows': 0, 'imported': 0, 'rejected': 0}
+    batch = {}
+
+    def flush():
+        if batch:
+            totals['imported'] += _write_batch(hub_id, batch, update_existing)
+            batch.clear()
+        if progress:
+            progress(dict(totals, seconds=time.perf_counter() - started))
+
+    for row in reader:
+        if not any(row):
+            continue
+        totals['rows'] += 1
+        try:
+            values = {
+                name: field.clean(row[positions[name]] if name in positions and positions[name] < len(row) else '')
+                for name, field in form_fields.items()
+            }
+        except ValidationError as e:
+            totals['rejected'] += 1
+            if reject_writer:
+                reject_writer.writerow(row + [reader.line_num, ' '.join(e.messages)])
+            continue
+        values['subject_email'] = normalize_email(values['subject_email'])
+        # A later row for the same subject and purpose replaces an earlier one.
+        record = ConsentRecord(hub_id=hub_id, **values)
+        record.refresh_search_text()
+        batch[(values['subject_email'], values['purpose'])] = record
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return dict(totals, seconds=time.perf_counter() - started)
+
+
+def rejects_name(hub_id, token):
+    """Storage name of the reject file the upload view saved for *hub_id* under *token*."""
+    return f'{IMPORT_REJECTS_DIR}/{hub_id}/{token}-rejects.csv'
+
+
+def purge_import_rejects(hub_id=None, now=None, dry_run=False):
+    """
+    Delete the stored reject files (of *hub_id*, or every hub) older than
+    ``GDPR_IMPORT_REJECTS_TTL`` seconds. Returns how many were (with
+    ``dry_run``, would be) deleted.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=getattr(settings, 'GDPR_IMPORT_REJECTS_TTL', IMPORT_REJECTS_TTL))
+    try:
+        hub_dirs, _files = default_storage.listdir(IMPORT_REJECTS_DIR)
+    except FileNotFoundError:
+        return 0
+    deleted = 0
+    if hub_id:
+        hub_dirs = [d for d in hub_dirs if d == str(hub_id)]
+    for hub_dir in hub_dirs:
+        _dirs, names = default_storage.listdir(f'{IMPORT_REJECTS_DIR}/{hub_dir}')
+        for name in names:
+            path = f'{IMPORT_REJECTS_DIR}/{hub_dir}/{name}'
+            if default_storage.get_modified_time(path) < cutoff:
+                if not dry_run:
+                    default_storage.delete(path)
+                deleted += 1
+    return deleted
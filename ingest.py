@@ -0,0 +1,193 @@
+"""
+High-throughput consent event ingestion.
+
+Cookie banners and storefront checkouts report consent events in bursts.
+Events are validated and appended to the ledger before the request is
+answered, so accepted consent evidence never lives only in memory. Applying
+them to the current state is what is buffered: each flush applies the latest
+event per (subject, purpose) with one ``bulk_create(update_conflicts=True)``
+against the ``gdpr_cr_subject_purpose_uniq`` constraint (see ``ledger.py``),
+so repeated clicks update a single row.
+
+The buffer flushes when it holds ``GDPR_CONSENT_INGEST_FLUSH_SIZE`` events
+or every ``GDPR_CONSENT_INGEST_FLUSH_INTERVAL`` seconds, from a daemon
+thread, and once more at interpreter exit. Each hub is written in its own
+transaction; a hub whose write fails keeps its events queued for the next
+flush without holding back the others. After
+``GDPR_CONSENT_INGEST_MAX_ATTEMPTS`` failed flushes its events are applied
+one by one and those that still fail are logged and dropped.
+
+Events queued in a process that dies before its flush are in the ledger but
+not in the current state; :func:`replay_recent_events` applies them (see
+``ledger.replay_consent_events``).
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .ledger import append_consent_events, coalesce_events, replay_consent_events, upsert_consent_state
+from .models import ConsentRecord, normalize_email
+
+logger = logging.getLogger(__name__)
+
+SOURCE_MAX_LENGTH = 30
+
+# Seconds of ledger history replayed at worker startup.
+REPLAY_WINDOW = 7 * 24 * 3600
+
+
+def parse_consent_event(data):
+    """
+    Validate one consent event payload and return it normalized.
+
+    Expected keys: ``subject_email``, ``purpose``, ``consented`` (bool) and
+    optionally ``subject_name``, ``timestamp`` (ISO 8601, defaults to now) and
+    ``source`` (e.g. ``"banner"``, recorded on the ledger event). Raises
+    ``ValidationError``.
+    """
+    if not isinstance(data, dict):
+        raise ValidationError('Event must be an object.')
+    email = normalize_email(data.get('subject_email'))
+    validate_email(email)
+    purpose = str(data.get('purpose') or '').strip()
+    if not purpose or len(purpose) > ConsentRecord._meta.get_field('purpose').max_length:
+        raise ValidationError('Invalid purpose.')
+    consented = data.get('consented')
+    if not isinstance(consented, bool):
+        raise ValidationError('consented must be true or false.')
+    subject_name = str(data.get('subject_name') or '').strip()
+    if len(subject_name) > ConsentRecord._meta.get_field('subject_name').max_length:
+        raise ValidationError('subject_name is too long.')
+    source = str(data.get('source') or '').strip()
+    if len(source) > SOURCE_MAX_LENGTH:
+        raise ValidationError('source is too long.')
+    timestamp = timezone.now()
+    if data.get('timestamp'):
+        timestamp = parse_datetime(str(data['timestamp']))
+        if timestamp is None:
+            raise ValidationError('Invalid timestamp.')
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+    return {
+        'subject_email': email, 'purpose': purpose, 'consented': consented,
+        'subject_name': subject_name, 'timestamp': timestamp, 'source': source,
+    }
+
+
+class ConsentIngestBuffer:
+    """Process-wide write buffer for consent events, flushed per hub."""
+
+    def __init__(self, flush_size=None, flush_interval=None, max_attempts=None):
+        self.flush_size = flush_size if flush_size is not None else getattr(settings, 'GDPR_CONSENT_INGEST_FLUSH_SIZE', 500)
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(settings, 'GDPR_CONSENT_INGEST_FLUSH_INTERVAL', 0.5)
+        self.max_attempts = max_attempts if max_attempts is not None else getattr(settings, 'GDPR_CONSENT_INGEST_MAX_ATTEMPTS', 5)
+        self._pending = {}
+        # hub_id → failed flushes in a row
+        self._attempts = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, hub_id, events, source='api'):
+        """
+        Append parsed *events* to the ledger and queue them for the current
+        state; flush inline if the buffer is full.
+        """
+        events = list(events)
+        append_consent_events(hub_id, events, source)
+        with self._lock:
+            self._pending.setdefault(hub_id, []).extend(events)
+            self._count += len(events)
+            full = self._count >= self.flush_size
+        if full:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def __len__(self):
+        return self._count
+
+    def flush(self):
+        """
+        Apply everything queued so far to the current state, one hub at a
+        time; returns the number of rows written. A hub whose write fails is
+        logged and requeued, up to ``max_attempts`` times.
+        """
+        with self._lock:
+            pending, self._pending, self._count = self._pending, {}, 0
+        written = 0
+        for hub_id, events in pending.items():
+            events = coalesce_events(events)
+            if self._attempts.get(hub_id, 0) >= self.max_attempts:
+                written += self._apply_each(hub_id, events)
+                continue
+            try:
+                written += self._apply(hub_id, events)
+            except Exception:
+                logger.exception('Applying consent events of hub %s failed', hub_id)
+                self._attempts[hub_id] = self._attempts.get(hub_id, 0) + 1
+                self._requeue(hub_id, events)
+            else:
+                self._attempts.pop(hub_id, None)
+        return written
+
+    def _apply(self, hub_id, events):
+        with transaction.atomic():
+            return upsert_consent_state(hub_id, events)
+
+    def _apply_each(self, hub_id, events):
+        """Apply the events of a hub that keeps failing one at a time, dropping those that fail."""
+        self._attempts.pop(hub_id, None)
+        written = 0
+        for event in events:
+            try:
+                written += self._apply(hub_id, [event])
+            except Exception:
+                # No subject email in the log; the event stays in the ledger.
+                logger.exception(
+                    'Dropping consent event of hub %s after %d failed flushes: %s at %s',
+                    hub_id, self.max_attempts, event['purpose'], event['timestamp'].isoformat(),
+                )
+        return written
+
+    def _ensure_flusher(self):
+        if self.flush_interval <= 0 or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name='gdpr-consent-ingest', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if not self._pending:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing consent events failed')
+            finally:
+                close_old_connections()
+
+
+def replay_recent_events(hub_id=None):
+    """
+    Apply the ledger events of the last ``GDPR_CONSENT_REPLAY_WINDOW``
+    seconds the current state is missing; returns the rows written.
+    """
+    window = getattr(settings, 'GDPR_CONSENT_REPLAY_WINDOW', REPLAY_WINDOW)
+    return replay_consent_events(hub_id, since=timezone.now() - timedelta(seconds=window))
+
+
+ingest_buffer = ConsentIngestBuffer()
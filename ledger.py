@@ -0,0 +1,204 @@
+"""
+Consent event ledger.
+
+Every grant and withdrawal is appended to ``ConsentEvent`` and never
+rewritten. ``ConsentRecord`` is the materialized current state: one row per
+(hub, subject, purpose), kept in step with the ledger, so list views, exports
+and consent checks read one narrow row per subject and purpose however often
+the subject has toggled.
+
+* Bulk writers (ingestion, CSV import) call :func:`record_consent_events` or
+  :func:`append_consent_events` explicitly.
+* Single-row saves (views, admin) are recorded by :func:`record_state_change`
+  from the ``post_save`` signal.
+
+Buffered ingestion appends to the ledger before it applies the state, so a
+process that dies in between leaves events the state never saw;
+:func:`replay_consent_events` applies them again (``gdpr_worker`` runs it at
+startup, ``gdpr_replay_consents`` on demand).
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import consent_cache
+from .models import ConsentEvent, ConsentRecord
+from .stats import apply_deltas, consent_upsert_deltas, existing_consent_state
+
+UNIQUE_FIELDS = ['hub_id', 'subject_email', 'purpose']
+
+LEDGER_BATCH_SIZE = 2000
+
+
+def coalesce_events(events):
+    """Keep only the latest event per (subject, purpose)."""
+    latest = {}
+    for event in events:
+        key = (event['subject_email'], event['purpose'])
+        if key not in latest or event['timestamp'] >= latest[key]['timestamp']:
+            latest[key] = event
+    return list(latest.values())
+
+
+def is_stale(stored, timestamp):
+    """
+    Whether a change dated *timestamp* (``None`` when undated) is older than
+    the *stored* row from ``existing_consent_state``: its latest consent or
+    withdrawal date. Changes to rows without dates always apply.
+    """
+    dates = [d for d in (stored['consent_date'], stored['withdrawal_date']) if d] if stored else []
+    if not dates:
+        return False
+    return timestamp is None or timestamp < max(dates)
+
+
+def append_consent_events(hub_id, events, source=''):
+    """
+    Append parsed *events* for *hub_id* to the ledger without touching the
+    current state. An event's own ``source`` wins over *source*.
+    """
+    ConsentEvent.objects.bulk_create([
+        ConsentEvent(
+            hub_id=hub_id,
+            subject_email=event['subject_email'],
+            purpose=event['purpose'],
+            action='grant' if event['consented'] else 'withdraw',
+            occurred_at=event['timestamp'],
+            source=event.get('source') or source,
+        )
+        for event in events
+    ], batch_size=LEDGER_BATCH_SIZE)
+
+
+def upsert_consent_state(hub_id, events):
+    """
+    Apply parsed *events* for *hub_id* to the current-state table.
+
+    *events* must hold at most one event per (subject, purpose), see
+    :func:`coalesce_events`. Call it inside a transaction: the stored rows
+    are locked while they are compared and written.
+
+    A grant sets consent_date and clears withdrawal_date; a withdrawal sets
+    withdrawal_date and keeps the original consent_date. Soft-deleted rows are
+    revived. An event older than the stored consent or withdrawal date (it
+    arrived late) is skipped, so the current state always reflects the latest
+    event. Dashboard statistics are adjusted from the state read before the
+    write. Returns the number of rows written.
+    """
+    existing = existing_consent_state(hub_id, ((e['subject_email'], e['purpose']) for e in events), lock=True)
+    events = [e for e in events if not is_stale(existing.get((e['subject_email'], e['purpose'])), e['timestamp'])]
+    groups = {}
+    for event in events:
+        record = ConsentRecord(
+            hub_id=hub_id,
+            subject_email=event['subject_email'],
+            subject_name=event['subject_name'],
+            purpose=event['purpose'],
+            consented=event['consented'],
+            consent_date=event['timestamp'] if event['consented'] else None,
+            withdrawal_date=None if event['consented'] else event['timestamp'],
+        )
+        record.refresh_search_text()
+        update_fields = ['consented', 'withdrawal_date', 'is_deleted', 'deleted_at', 'updated_at']
+        if event['consented']:
+            update_fields.append('consent_date')
+        if event['subject_name']:
+            update_fields += ['subject_name', 'search_text']
+        groups.setdefault(tuple(update_fields), []).append(record)
+
+    unique_fields = UNIQUE_FIELDS if connection.features.supports_update_conflicts_with_target else None
+    for update_fields, records in groups.items():
+        ConsentRecord.objects.bulk_create(
+            records, update_conflicts=True, unique_fields=unique_fields, update_fields=list(update_fields),
+        )
+    apply_deltas(hub_id, consent_upsert_deltas(existing, events))
+    consent_cache.invalidate((hub_id, e['subject_email'], e['purpose']) for e in events)
+    return len(events)
+
+
+def record_consent_events(hub_id, events, source=''):
+    """
+    Append *events* to the ledger and apply the latest one per (subject,
+    purpose) to the current state, in one transaction. Returns the number of
+    current-state rows written.
+    """
+    events = list(events)
+    with transaction.atomic():
+        append_consent_events(hub_id, events, source)
+        return upsert_consent_state(hub_id, coalesce_events(events))
+
+
+def is_unapplied(stored, event):
+    """
+    Whether the ledger *event* never reached the *stored* row from
+    ``existing_consent_state``: there is no row, or the event is not older
+    than the row and disagrees with it, or it is newer than the row's
+    consent and withdrawal dates. An event that created or matches the row
+    (single-row saves record one after writing) is not applied again.
+    """
+    if is_stale(stored, event['timestamp']):
+        return False
+    if stored is None or (not stored['is_deleted'] and stored['consented'] != event['consented']):
+        return True
+    dates = [d for d in (stored['consent_date'], stored['withdrawal_date']) if d]
+    return bool(dates) and event['timestamp'] > max(dates)
+
+
+def replay_consent_events(hub_id=None, since=None):
+    """
+    Apply ledger events the current state is missing, for *hub_id* (every
+    hub by default) and events appended at or after *since*. The latest
+    event per (subject, purpose) is applied when :func:`is_unapplied`; the
+    ledger does not keep subject names, so a row created here has none.
+    Returns the number of current-state rows written.
+    """
+    events = ConsentEvent.objects.all()
+    if hub_id is not None:
+        events = events.filter(hub_id=hub_id)
+    if since is not None:
+        events = events.filter(created_at__gte=since)
+    latest = {}
+    rows = events.order_by('created_at').values_list('hub_id', 'subject_email', 'purpose', 'action', 'occurred_at')
+    for hub, email, purpose, action, occurred_at in rows.iterator(chunk_size=LEDGER_BATCH_SIZE):
+        event = latest.setdefault(hub, {}).get((email, purpose))
+        if event is None or occurred_at >= event['timestamp']:
+            latest[hub][(email, purpose)] = {
+                'subject_email': email, 'purpose': purpose, 'consented': action == 'grant',
+                'subject_name': '', 'timestamp': occurred_at,
+            }
+    written = 0
+    for hub, by_key in latest.items():
+        with transaction.atomic():
+            existing = existing_consent_state(hub, by_key, lock=True)
+            missing = [event for key, event in by_key.items() if is_unapplied(existing.get(key), event)]
+            if missing:
+                written += upsert_consent_state(hub, missing)
+    return written
+
+
+def record_state_change(record, created, update_fields=None):
+    """
+    Append a ledger event for a single-row save of *record* when its consent
+    flipped (or it was created with consent). The source is taken from
+    ``record._consent_source`` and defaults to ``'manual'``.
+    """
+    if record.is_deleted or (update_fields is not None and 'consented' not in update_fields):
+        return
+    loaded = getattr(record, '_loaded_values', {})
+    # A revived soft-deleted row counts as new.
+    previous = None if created or loaded.get('is_deleted') else loaded.get('consented')
+    if previous is None and not record.consented:
+        return
+    if previous == record.consented:
+        return
+    if record.consented:
+        occurred_at = record.consent_date or timezone.now()
+    else:
+        occurred_at = record.withdrawal_date or timezone.now()
+    ConsentEvent.objects.create(
+        hub_id=record.hub_id,
+        subject_email=record.subject_email,
+        purpose=record.purpose,
+        action='grant' if record.consented else 'withdraw',
+        occurred_at=occurred_at,
+        source=getattr(record, '_consent_source', 'manual'),
+    )
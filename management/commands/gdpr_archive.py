@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from gdpr.archiver import ARCHIVE_BATCH_SIZE, archive_old_rows
+
+
+class Command(BaseCommand):
+    help = 'Move withdrawn or deleted consent records and completed or deleted data requests to the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub-id', help='Only this hub (defaults to every hub).')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Rows moved per transaction.')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be moved.')
+
+    def handle(self, *args, **options):
+        results = archive_old_rows(
+            options['hub_id'], batch_size=options['batch_size'], sleep=options['sleep'], dry_run=options['dry_run'],
+        )
+        total = 0
+        for hub_id, counts in results.items():
+            total += sum(counts.values())
+            self.stdout.write(f'{hub_id}: ' + ', '.join(f'{count:,} {name}' for name, count in counts.items()))
+        verb = 'would be archived' if options['dry_run'] else 'archived'
+        self.stdout.write(self.style.SUCCESS(f'{total:,} row(s) {verb} in {len(results)} hub(s).'))
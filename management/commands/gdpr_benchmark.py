@@ -0,0 +1,45 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gdpr.benchmarks import SUITES
+from gdpr.benchmarks.report import DEFAULT_TOLERANCE, build_report, compare, read_report, write_report
+
+
+class Command(BaseCommand):
+    help = 'Run GDPR module benchmark suites against the configured database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='+', choices=sorted(SUITES) + ['all'])
+        parser.add_argument('--sizes', type=int, nargs='+', help='Row counts to benchmark (defaults to the suite defaults).')
+        parser.add_argument('--json', dest='json_path', help='Write a JSON report to this path.')
+        parser.add_argument('--compare', dest='baseline', help='Fail when slower than the JSON report at this path.')
+        parser.add_argument(
+            '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+            help=f'Relative growth of seconds or peak memory tolerated by --compare (default {DEFAULT_TOLERANCE}).',
+        )
+
+    def handle(self, *args, **options):
+        names = sorted(SUITES) if 'all' in options['suites'] else options['suites']
+        baseline = read_report(options['baseline']) if options['baseline'] else None
+        rows = []
+        for name in names:
+            suite = import_module(SUITES[name])
+            for row in suite.run(options['sizes'] or suite.DEFAULT_SIZES):
+                row = {'suite': name, **row}
+                rows.append(row)
+                self.stdout.write('  '.join(f'{key}={value}' for key, value in row.items()))
+        report = build_report(rows)
+        if options['json_path']:
+            write_report(report, options['json_path'])
+            self.stdout.write(f"Report written to {options['json_path']}")
+        if baseline is None:
+            return
+        regressions = compare(baseline, report, options['tolerance'])
+        for regression in regressions:
+            suite, case, size, params = regression['key']
+            label = ' '.join([suite, case, f'size={size}', *(f'{k}={v}' for k, v in params)])
+            self.stderr.write(f"{label}: {regression['metric']} {regression['baseline']} -> {regression['current']}")
+        if regressions:
+            raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}'))
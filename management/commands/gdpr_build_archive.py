@@ -0,0 +1,28 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from gdpr.archives import ARCHIVE_REQUEST_TYPES, build_subject_archive
+from gdpr.models import DataRequest
+
+
+class Command(BaseCommand):
+    help = "Build the subject data archive (zip of NDJSON) of an access or portability request."
+
+    def add_arguments(self, parser):
+        parser.add_argument('request_id', help='DataRequest id.')
+
+    def handle(self, *args, **options):
+        try:
+            data_request = DataRequest.objects.get(pk=options['request_id'])
+        except (DataRequest.DoesNotExist, ValidationError):
+            raise CommandError(f"Data request {options['request_id']} not found.")
+        if data_request.request_type not in ARCHIVE_REQUEST_TYPES:
+            raise CommandError('Not an access or portability request.')
+
+        def progress(report):
+            self.stdout.write(f"{report['rows']:,} rows in {report['seconds']:.1f}s")
+
+        report = build_subject_archive(data_request, progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archive {data_request.archive.name} built: {report['rows']:,} rows, {report['bytes']:,} bytes."
+        ))
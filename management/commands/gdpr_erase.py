@@ -0,0 +1,37 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from gdpr.erasure import ERASURE_MAX_WORKERS, run_erasure
+from gdpr.models import DataRequest
+from gdpr.workqueue import lease_held
+
+
+class Command(BaseCommand):
+    help = "Erase a data subject's data in every module for an erasure request."
+
+    def add_arguments(self, parser):
+        parser.add_argument('request_id', help='DataRequest id.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows each handler would erase.')
+        parser.add_argument('--workers', type=int, default=ERASURE_MAX_WORKERS, help='Handlers run concurrently.')
+
+    def handle(self, *args, **options):
+        try:
+            data_request = DataRequest.objects.get(pk=options['request_id'])
+        except (DataRequest.DoesNotExist, ValidationError):
+            raise CommandError(f"Data request {options['request_id']} not found.")
+        if data_request.request_type != 'erasure':
+            raise CommandError('Not an erasure request.')
+        if lease_held(data_request):
+            raise CommandError(f'Data request {data_request.pk} is being processed by {data_request.claimed_by}.')
+        report = run_erasure(data_request, dry_run=options['dry_run'], max_workers=options['workers'])
+        for result in report['handlers']:
+            self.stdout.write(
+                f"{result['module']}.{result['handler']}: {result['found']:,} found, {result['erased']:,} erased "
+                f"in {result['seconds']:.2f}s" + (f" — {result['error']}" if result['error'] else '')
+            )
+        if report['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Dry run: {report['found']:,} row(s) would be erased."))
+        elif report['errors']:
+            raise CommandError(f"{report['errors']} handler(s) failed; {report['erased']:,} row(s) erased. The request stays open.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{report['erased']:,} row(s) erased in {report['seconds']:.2f}s; request completed."))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gdpr.imports import IMPORT_BATCH_SIZE, CSVImportError, import_consent_csv
+
+
+class Command(BaseCommand):
+    help = 'Import historical consent records from a CSV file into a hub.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with subject_name, subject_email, purpose, consented, consent_date, withdrawal_date columns.')
+        parser.add_argument('--hub-id', help='Target hub (defaults to this hub).')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--rejects', help='Write invalid rows to this CSV file.')
+        parser.add_argument('--skip-existing', action='store_true', help='Keep existing (subject, purpose) records instead of overwriting them.')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        hub_id = options['hub_id']
+        if not hub_id:
+            from apps.configuration.models import HubConfig
+            hub_id = HubConfig.get_config().hub_id
+        if not hub_id:
+            raise CommandError('No hub configured; pass --hub-id.')
+
+        def progress(totals):
+            rate = totals['rows'] / totals['seconds'] if totals['seconds'] else 0
+            self.stdout.write(f"{totals['rows']:,} rows  {totals['imported']:,} imported  {totals['rejected']:,} rejected  {rate:,.0f} rows/s")
+
+        rejects = open(options['rejects'], 'w', newline='', encoding='utf-8') if options['rejects'] else None
+        try:
+            with open(options['path'], newline='', encoding=options['encoding']) as fileobj:
+                totals = import_consent_csv(
+                    fileobj, hub_id, batch_size=options['batch_size'], rejects=rejects,
+                    progress=progress, update_existing=not options['skip_existing'],
+                )
+        except CSVImportError as e:
+            raise CommandError(str(e))
+        finally:
+            if rejects:
+                rejects.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['imported']:,} of {totals['rows']:,} rows in {totals['seconds']:.1f}s ({totals['rejected']:,} rejected)."
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from gdpr.imports import purge_import_rejects
+from gdpr.purge import PURGE_BATCH_SIZE, purge_deleted
+
+
+class Command(BaseCommand):
+    help = (
+        "Purge soft-deleted consent records and data requests older than each hub's retention period, "
+        'and expired import reject files.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub-id', help='Only this hub (defaults to every hub).')
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE, help='Rows deleted per transaction.')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be purged.')
+
+    def handle(self, *args, **options):
+        results = purge_deleted(
+            options['hub_id'], batch_size=options['batch_size'], sleep=options['sleep'], dry_run=options['dry_run'],
+        )
+        total = 0
+        for hub_id, counts in results.items():
+            total += sum(counts.values())
+            self.stdout.write(f'{hub_id}: ' + ', '.join(f'{count:,} {name}' for name, count in counts.items()))
+        rejects = purge_import_rejects(options['hub_id'], dry_run=options['dry_run'])
+        verb = 'would be purged' if options['dry_run'] else 'purged'
+        self.stdout.write(self.style.SUCCESS(f'{total:,} row(s) and {rejects:,} import reject file(s) {verb} in {len(results)} hub(s).'))
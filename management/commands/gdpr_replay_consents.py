@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gdpr.ledger import replay_consent_events
+
+
+class Command(BaseCommand):
+    help = 'Apply consent ledger events that never reached the current consent state.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub-id', help='Only this hub (defaults to every hub).')
+        parser.add_argument('--hours', type=float, help='Only events appended in the last N hours (defaults to the whole ledger).')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours']) if options['hours'] else None
+        written = replay_consent_events(options['hub_id'], since=since)
+        self.stdout.write(self.style.SUCCESS(f'{written:,} consent record(s) brought up to date from the ledger.'))
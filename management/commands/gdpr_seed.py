@@ -0,0 +1,46 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gdpr.benchmarks.harness import SEED_BATCH_SIZE, drop_hub, seed_hub, seeded_only
+from gdpr.models import ConsentRecord, DataRequest
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load synthetic consent records and data requests with realistic distributions into a hub.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub-id', type=uuid.UUID, help='Hub to seed (defaults to a new one).')
+        parser.add_argument('--consent-records', type=int, default=10_000)
+        parser.add_argument('--data-requests', type=int, default=1_000)
+        parser.add_argument('--days', type=int, default=730, help='Spread creation dates over this many days.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE, help='Rows inserted per query.')
+        parser.add_argument(
+            '--replace', action='store_true',
+            help="Drop the hub's existing GDPR rows first, ledger included; only for hubs gdpr_seed created.",
+        )
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive', help='Do not ask before --replace.')
+
+    def handle(self, *args, **options):
+        hub_id = options['hub_id'] or uuid.uuid4()
+        if options['replace']:
+            if not seeded_only(hub_id):
+                raise CommandError(f'Hub {hub_id} has GDPR rows gdpr_seed did not create; --replace only drops seeded hubs.')
+            if options['interactive']:
+                answer = input(f'Drop every GDPR row of hub {hub_id}, consent ledger included? Type "yes" to continue: ')
+                if answer != 'yes':
+                    raise CommandError('Cancelled.')
+            drop_hub(hub_id)
+        elif ConsentRecord.all_objects.filter(hub_id=hub_id).exists() or DataRequest.all_objects.filter(hub_id=hub_id).exists():
+            raise CommandError(f'Hub {hub_id} already has GDPR rows; use --replace to drop them first.')
+        started = time.perf_counter()
+        seed_hub(
+            hub_id, consent_records=options['consent_records'], data_requests=options['data_requests'],
+            days=options['days'], seed=options['seed'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded hub {hub_id} with {options['consent_records']:,} consent record(s) and "
+            f"{options['data_requests']:,} data request(s) in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,53 @@
+import multiprocessing
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from gdpr.ingest import replay_recent_events
+from gdpr.workqueue import LEASE_SECONDS, POLL_INTERVAL, work_in_process, work_in_thread, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Process queued GDPR data requests (erasure, access, portability) with a pool of workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of workers (default 2).')
+        parser.add_argument('--processes', action='store_true', help='Run workers as processes instead of threads.')
+        parser.add_argument('--drain', action='store_true', help='Exit once the queue is empty instead of polling.')
+        parser.add_argument('--poll', type=float, default=POLL_INTERVAL, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--lease', type=int, default=LEASE_SECONDS, help='Seconds a claimed request stays leased.')
+
+    def handle(self, *args, **options):
+        count = max(1, options['workers'])
+        replayed = replay_recent_events()
+        if replayed:
+            self.stdout.write(f'Applied {replayed:,} consent event(s) missing from the current state.')
+        kwargs = {'drain': options['drain'], 'poll_interval': options['poll'], 'lease_seconds': options['lease']}
+        self.stdout.write(f"Starting {count} worker {'process' if options['processes'] else 'thread'}(s).")
+        if options['processes']:
+            # Children must not share the parent's database connections.
+            connections.close_all()
+            workers = [
+                multiprocessing.Process(target=work_in_process, args=(i, kwargs['drain'], kwargs['poll_interval'], kwargs['lease_seconds']))
+                for i in range(count)
+            ]
+            stop = None
+        else:
+            stop = threading.Event()
+            workers = [
+                threading.Thread(target=work_in_thread, args=(worker_name(i), stop), kwargs=kwargs, name=f'gdpr-worker-{i}')
+                for i in range(count)
+            ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the current requests…')
+            if stop is not None:
+                stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
@@ -0,0 +1,268 @@
+"""
+Per-endpoint instrumentation of the GDPR views and assistant tools.
+
+:func:`instrument` wraps a view (every URL of ``urls.py``, named after the
+URL) or a tool's ``execute`` (``tool:<name>``) and records, per endpoint and
+hub:
+
+* ``gdpr_requests_total`` — calls, by response status
+* ``gdpr_request_seconds`` — wall time, including streaming a response
+* ``gdpr_sql_queries`` / ``gdpr_sql_seconds`` — queries run and time in them
+* ``gdpr_app_seconds`` — time outside SQL: view code and template rendering
+* ``gdpr_sql_rows_total`` — rows fetched or written, as the driver reports them
+* ``gdpr_response_bytes`` — response size (JSON size for tools)
+
+Queries are counted with ``connection.execute_wrapper``, so SQL is never
+kept. Endpoints running more queries than their ``QUERY_BUDGETS`` entry are
+logged and counted in ``gdpr_query_budget_exceeded_total``. A call armed
+for profiling (``profiling.py``) is profiled instead of counted.
+
+The numbers are served in the Prometheus text format by the ``metrics/``
+view to scrapers sending ``GDPR_METRICS_TOKEN`` as a bearer token. Set
+``GDPR_METRICS_PER_HUB = False`` to drop the ``hub`` label on installations
+with many hubs.
+
+The registry lives in the memory of one process and nothing is shared.
+Under a server with several worker processes, a scrape through the load
+balancer sees whichever worker answered. Use the endpoint with a single
+process, or scrape every worker process on its own address.
+"""
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# name → (type, help, histogram buckets)
+METRICS = {
+    'gdpr_requests_total': ('counter', 'Calls of a GDPR view or assistant tool.', None),
+    'gdpr_request_seconds': ('histogram', 'Wall time of a call, including streaming the response.', SECONDS_BUCKETS),
+    'gdpr_sql_queries': ('histogram', 'SQL queries run by a call.', (1, 2, 3, 5, 10, 20, 50, 100, 500, 1000)),
+    'gdpr_sql_seconds': ('histogram', 'Time a call spent in SQL queries.', SECONDS_BUCKETS),
+    'gdpr_app_seconds': ('histogram', 'Time a call spent outside SQL (view code, template rendering).', SECONDS_BUCKETS),
+    'gdpr_sql_rows_total': ('counter', 'Rows fetched or written by the SQL of a call, as reported by the driver.', None),
+    'gdpr_response_bytes': ('histogram', 'Size of a response.', (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)),
+    'gdpr_query_budget_exceeded_total': ('counter', 'Calls that ran more queries than their budget.', None),
+}
+
+# Session key naming the endpoint whose next call is profiled (see profiling.py).
+PROFILE_SESSION_KEY = 'gdpr_profile_endpoint'
+
+# Endpoint → most queries one call may run, authentication included. Kept
+# in step with tests/test_metrics.py; streaming exports are not budgeted.
+QUERY_BUDGETS = {
+    'dashboard': 8,
+    'consents': 8,
+    'requests': 8,
+    'consent_records_list': 8,
+    'consent_records_scroll': 5,
+    'consent_records_suggest': 5,
+    'consent_record_add': 5,
+    'consent_record_edit': 6,
+    'data_requests_list': 8,
+    'data_requests_scroll': 5,
+    'data_requests_suggest': 5,
+    'data_request_add': 5,
+    'data_request_edit': 6,
+    'data_request_archive_status': 6,
+    'data_request_erasure_status': 6,
+    'settings': 8,
+    'settings_pending': 10,
+    'tool:list_consent_records': 3,
+    'tool:list_data_requests': 3,
+    'tool:gdpr_statistics': 2,
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms, keyed by (metric, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = defaultdict(float)
+            # (name, labels) → [bucket counts..., +Inf count], sum
+            self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._counters[(name, tuple(labels))] += value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(labels))
+        with self._lock:
+            counts, total = self._histograms.get(key) or ([0] * (len(buckets) + 1), 0)
+            counts[bisect.bisect_left(buckets, value)] += 1
+            self._histograms[key] = (counts, total + value)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            if kind == 'counter':
+                series = sorted((labels, value) for (metric, labels), value in counters.items() if metric == name)
+            else:
+                series = sorted((labels, value) for (metric, labels), value in histograms.items() if metric == name)
+            if not series:
+                continue
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for labels, value in series:
+                if kind == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class SQLRecorder:
+    """``connection.execute_wrapper`` counting queries, their time and rows."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, params, many, time.perf_counter() - started, getattr(context.get('cursor'), 'rowcount', -1))
+
+    def record(self, sql, params, many, seconds, rowcount):
+        self.seconds += seconds
+        self.queries += 1
+        if rowcount and rowcount > 0:
+            self.rows += rowcount
+
+
+def _hub_label(request):
+    if request is None or not getattr(settings, 'GDPR_METRICS_PER_HUB', True):
+        return []
+    return [('hub', request.session.get('hub_id') or '')]
+
+
+def record(endpoint, request, recorder, seconds, status, size):
+    """Add one call of *endpoint* to the registry; returns its numbers."""
+    labels = [('endpoint', endpoint)] + _hub_label(request)
+    observation = {
+        'queries': recorder.queries, 'sql_seconds': recorder.seconds, 'rows': recorder.rows,
+        'seconds': seconds, 'app_seconds': max(seconds - recorder.seconds, 0), 'bytes': size,
+    }
+    registry.inc('gdpr_requests_total', labels + [('status', status)])
+    registry.inc('gdpr_sql_rows_total', labels, recorder.rows)
+    registry.observe('gdpr_request_seconds', labels, seconds)
+    registry.observe('gdpr_sql_queries', labels, recorder.queries)
+    registry.observe('gdpr_sql_seconds', labels, recorder.seconds)
+    registry.observe('gdpr_app_seconds', labels, observation['app_seconds'])
+    if size is not None:
+        registry.observe('gdpr_response_bytes', labels, size)
+    budget = QUERY_BUDGETS.get(endpoint)
+    if budget is not None and recorder.queries > budget:
+        registry.inc('gdpr_query_budget_exceeded_total', labels)
+        logger.warning('%s ran %d queries (budget %d)', endpoint, recorder.queries, budget)
+    return observation
+
+
+def _streamed(chunks, endpoint, request, recorder, started, status):
+    size = 0
+    try:
+        with connection.execute_wrapper(recorder):
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+    finally:
+        record(endpoint, request, recorder, time.perf_counter() - started, status, size)
+
+
+def _size(result):
+    if hasattr(result, 'content'):
+        return len(result.content)
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return None
+
+
+def _status(result):
+    if hasattr(result, 'status_code'):
+        return str(result.status_code)
+    return 'error' if isinstance(result, dict) and 'error' in result else 'ok'
+
+
+def instrument(endpoint):
+    """
+    Decorator recording the calls of a view or tool ``execute`` as
+    *endpoint*. The request (the argument with a session) gets the numbers
+    of its last call as ``gdpr_metrics``.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            request = next((arg for arg in args if hasattr(arg, 'session')), None)
+            if request is not None and request.session.get(PROFILE_SESSION_KEY) == endpoint:
+                from .profiling import profile_call
+                return profile_call(endpoint, request, fn, args, kwargs)
+            recorder = SQLRecorder()
+            started = time.perf_counter()
+            try:
+                with connection.execute_wrapper(recorder):
+                    result = fn(*args, **kwargs)
+            except Exception:
+                record(endpoint, request, recorder, time.perf_counter() - started, 'exception', None)
+                raise
+            if getattr(result, 'streaming', False) and not getattr(result, 'is_async', False):
+                result.streaming_content = _streamed(result.streaming_content, endpoint, request, recorder, started, _status(result))
+                return result
+            observation = record(endpoint, request, recorder, time.perf_counter() - started, _status(result), _size(result))
+            if request is not None:
+                request.gdpr_metrics = observation
+            return result
+        return wrapper
+    return decorator
+
+
+def instrument_urlpatterns(urlpatterns, exclude=()):
+    """Wrap the view of every named pattern in :func:`instrument`, named after the URL."""
+    for pattern in urlpatterns:
+        if pattern.name and pattern.name not in exclude:
+            pattern.callback = instrument(pattern.name)(pattern.callback)
+    return urlpatterns
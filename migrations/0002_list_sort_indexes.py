@@ -0,0 +1,65 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'consented', 'id'], name='gdpr_cr_hub_consented_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'subject_name', 'id'], name='gdpr_cr_hub_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'subject_email', 'id'], name='gdpr_cr_hub_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'purpose', 'id'], name='gdpr_cr_hub_purpose_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'consent_date', 'id'], name='gdpr_cr_hub_cdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'withdrawal_date', 'id'], name='gdpr_cr_hub_wdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'created_at', 'id'], name='gdpr_cr_hub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'request_type', 'id'], name='gdpr_dr_hub_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'status', 'id'], name='gdpr_dr_hub_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'subject_name', 'id'], name='gdpr_dr_hub_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'subject_email', 'id'], name='gdpr_dr_hub_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'completed_at', 'id'], name='gdpr_dr_hub_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'created_at', 'id'], name='gdpr_dr_hub_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:30
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def normalize_subject_emails(apps, schema_editor):
+    ConsentRecord = apps.get_model('gdpr', 'ConsentRecord')
+    normalized = Lower(Trim('subject_email'))
+    ConsentRecord.objects.exclude(subject_email=normalized).update(subject_email=normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0002_list_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_subject_emails, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'purpose', 'subject_email', 'consented'], name='gdpr_cr_consent_check_idx'),
+        ),
+    ]
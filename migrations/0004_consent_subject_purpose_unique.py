@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:00
+"""
+Soft-delete superseded duplicate consent records.
+
+Despite its name, this migration adds no constraint and deletes no rows.
+The unique (hub_id, subject_email, purpose) constraint
+``gdpr_cr_subject_purpose_uniq`` is added by 0005, after the duplicates'
+history is copied to the ledger and the duplicates are dropped. The name is
+kept because applied migrations are recorded by name.
+"""
+from django.db import migrations
+from django.db.models import Count
+from django.utils import timezone
+
+
+def superseded_duplicates(ConsentRecord):
+    """
+    Per (hub_id, subject_email, purpose) with several rows, the rows other
+    than the most recently updated live one.
+    """
+    duplicates = (
+        ConsentRecord.objects.values('hub_id', 'subject_email', 'purpose')
+        .annotate(n=Count('id')).filter(n__gt=1).values_list('hub_id', 'subject_email', 'purpose')
+    )
+    for hub_id, subject_email, purpose in duplicates.iterator():
+        rows = ConsentRecord.objects.filter(hub_id=hub_id, subject_email=subject_email, purpose=purpose)
+        keep = rows.order_by('is_deleted', '-updated_at').values_list('id', flat=True)[0]
+        yield rows.exclude(id=keep)
+
+
+def soft_delete_duplicate_consents(apps, schema_editor):
+    """
+    Hide superseded duplicates. They are kept until 0005 has copied their
+    grants and withdrawals to the ledger, and only then dropped to make room
+    for the unique constraint.
+    """
+    ConsentRecord = apps.get_model('gdpr', 'ConsentRecord')
+    now = timezone.now()
+    for rows in superseded_duplicates(ConsentRecord):
+        rows.filter(is_deleted=False).update(is_deleted=True, deleted_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0003_consent_check_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(soft_delete_duplicate_consents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:30
+
+import uuid
+from django.db import migrations, models
+from django.db.models import Count
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_events(apps, schema_editor):
+    """Seed the ledger with the grants and withdrawals recorded on existing rows."""
+    ConsentRecord = apps.get_model('gdpr', 'ConsentRecord')
+    ConsentEvent = apps.get_model('gdpr', 'ConsentEvent')
+    batch = []
+    rows = ConsentRecord.objects.values_list('hub_id', 'subject_email', 'purpose', 'consent_date', 'withdrawal_date')
+    for hub_id, subject_email, purpose, consent_date, withdrawal_date in rows.iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        for action, occurred_at in (('grant', consent_date), ('withdraw', withdrawal_date)):
+            if occurred_at:
+                batch.append(ConsentEvent(
+                    hub_id=hub_id, subject_email=subject_email, purpose=purpose,
+                    action=action, occurred_at=occurred_at, source='migration',
+                ))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            ConsentEvent.objects.bulk_create(batch)
+            batch = []
+    ConsentEvent.objects.bulk_create(batch)
+
+
+def drop_duplicate_consents(apps, schema_editor):
+    """
+    Drop the duplicates 0004 soft-deleted, now that the ledger holds their
+    grants and withdrawals, keeping the row 0004 kept.
+    """
+    ConsentRecord = apps.get_model('gdpr', 'ConsentRecord')
+    duplicates = (
+        ConsentRecord.objects.values('hub_id', 'subject_email', 'purpose')
+        .annotate(n=Count('id')).filter(n__gt=1).values_list('hub_id', 'subject_email', 'purpose')
+    )
+    for hub_id, subject_email, purpose in duplicates.iterator():
+        rows = ConsentRecord.objects.filter(hub_id=hub_id, subject_email=subject_email, purpose=purpose)
+        keep = rows.order_by('is_deleted', '-updated_at').values_list('id', flat=True)[0]
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0004_consent_subject_purpose_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsentEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+                ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+                ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('subject_email', models.EmailField(max_length=254, verbose_name='Subject Email')),
+                ('purpose', models.CharField(max_length=100, verbose_name='Purpose')),
+                ('action', models.CharField(choices=[('grant', 'Granted'), ('withdraw', 'Withdrawn')], max_length=10, verbose_name='Action')),
+                ('occurred_at', models.DateTimeField(verbose_name='Occurred At')),
+                ('source', models.CharField(blank=True, max_length=30, verbose_name='Source')),
+            ],
+            options={
+                'db_table': 'gdpr_consentevent',
+                'abstract': False,
+                'indexes': [models.Index(fields=['hub_id', 'subject_email', 'purpose', 'occurred_at'], name='gdpr_ce_subject_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+        migrations.RunPython(drop_duplicate_consents, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='consentrecord',
+            constraint=models.UniqueConstraint(fields=('hub_id', 'subject_email', 'purpose'), name='gdpr_cr_subject_purpose_uniq'),
+        ),
+    ]
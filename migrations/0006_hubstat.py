@@ -0,0 +1,59 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:00
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_stats(apps, schema_editor):
+    """Initial counters; same aggregation as ``stats.compute_stats``."""
+    ConsentRecord = apps.get_model('gdpr', 'ConsentRecord')
+    DataRequest = apps.get_model('gdpr', 'DataRequest')
+    HubStat = apps.get_model('gdpr', 'HubStat')
+    totals = defaultdict(Counter)
+    for row in ConsentRecord.objects.filter(is_deleted=False).values('hub_id', 'purpose').annotate(
+        total=Count('id'), consented=Count('id', filter=Q(consented=True)),
+    ).order_by():
+        counters = totals[row['hub_id']]
+        counters[('consent_records', '')] += row['total']
+        counters[('consent_purpose', row['purpose'])] += row['total']
+        counters[('consent_status', 'consented')] += row['consented']
+        counters[('consent_status', 'withdrawn')] += row['total'] - row['consented']
+    for row in DataRequest.objects.filter(is_deleted=False).values('hub_id', 'request_type', 'status').annotate(
+        total=Count('id'),
+    ).order_by():
+        counters = totals[row['hub_id']]
+        counters[('data_requests', '')] += row['total']
+        counters[('request_type', row['request_type'])] += row['total']
+        counters[('request_status', row['status'])] += row['total']
+    HubStat.objects.bulk_create([
+        HubStat(hub_id=hub_id, metric=metric, key=key, count=count)
+        for hub_id, counters in totals.items() if hub_id is not None
+        for (metric, key), count in counters.items() if count
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0005_consentevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HubStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_id', models.UUIDField(db_index=True)),
+                ('metric', models.CharField(max_length=30)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'gdpr_hubstat',
+                'constraints': [models.UniqueConstraint(fields=('hub_id', 'metric', 'key'), name='gdpr_hubstat_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
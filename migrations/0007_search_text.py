@@ -0,0 +1,63 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:30
+
+import unicodedata
+
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 2000
+
+SEARCH_FIELDS = {
+    'ConsentRecord': ('subject_name', 'subject_email', 'purpose'),
+    'DataRequest': ('subject_name', 'subject_email', 'request_type', 'status'),
+}
+
+
+def _normalize(value):
+    # Same as models.normalize_search_text.
+    decomposed = unicodedata.normalize('NFKD', str(value or '').casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).strip()
+
+
+def backfill_search_text(apps, schema_editor):
+    for model_name, fields in SEARCH_FIELDS.items():
+        model = apps.get_model('gdpr', model_name)
+        batch = []
+        for row in model.objects.only('id', *fields).iterator(chunk_size=BACKFILL_BATCH_SIZE):
+            row.search_text = '\n'.join(_normalize(getattr(row, name)) for name in fields)
+            batch.append(row)
+            if len(batch) >= BACKFILL_BATCH_SIZE:
+                model.objects.bulk_update(batch, ['search_text'])
+                batch = []
+        model.objects.bulk_update(batch, ['search_text'])
+
+
+def install_search_indexes(apps, schema_editor):
+    from gdpr.search import install_search_indexes
+    install_search_indexes(schema_editor)
+
+
+def remove_search_indexes(apps, schema_editor):
+    from gdpr.search import remove_search_indexes
+    remove_search_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0006_hubstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consentrecord',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='datarequest',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(install_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Nullable without a default: a plain ADD COLUMN on SQLite, so the
+    # search triggers on gdpr_datarequest survive.
+
+    dependencies = [
+        ('gdpr', '0007_search_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datarequest',
+            name='erasure_report',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Erasure Report'),
+        ),
+    ]
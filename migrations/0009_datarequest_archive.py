@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+import gdpr.models
+
+
+def install_search_indexes(apps, schema_editor):
+    # Adding a non-null column makes SQLite rebuild gdpr_datarequest, which
+    # drops its search triggers.
+    if schema_editor.connection.vendor == 'sqlite':
+        from gdpr.search import install_search_indexes
+        install_search_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0008_datarequest_erasure_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datarequest',
+            name='archive',
+            field=models.FileField(blank=True, editable=False, upload_to=gdpr.models.archive_upload_to, verbose_name='Archive'),
+        ),
+        migrations.AddField(
+            model_name='datarequest',
+            name='archive_report',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Archive Report'),
+        ),
+        migrations.RunPython(install_search_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+def install_search_indexes(apps, schema_editor):
+    # Adding non-null columns makes SQLite rebuild gdpr_datarequest, which
+    # drops its search triggers.
+    if schema_editor.connection.vendor == 'sqlite':
+        from gdpr.search import install_search_indexes
+        install_search_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0009_datarequest_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datarequest',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='datarequest',
+            name='claimed_by',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Claimed By'),
+        ),
+        migrations.AddField(
+            model_name='datarequest',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Lease Expires At'),
+        ),
+        migrations.AddField(
+            model_name='datarequest',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='datarequest',
+            name='last_error',
+            field=models.TextField(blank=True, editable=False, verbose_name='Last Error'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['status', 'created_at'], name='gdpr_dr_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['status', 'lease_expires_at'], name='gdpr_dr_lease_idx'),
+        ),
+        migrations.RunPython(install_search_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:10
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+RESPONSE_DAYS = 30
+
+
+def backfill_due_at(apps, schema_editor):
+    # One set-based UPDATE; the deadline of existing requests is derived from
+    # when they were received.
+    DataRequest = apps.get_model('gdpr', 'DataRequest')
+    DataRequest.objects.filter(due_at__isnull=True).update(due_at=models.F('created_at') + timedelta(days=RESPONSE_DAYS))
+
+
+class Migration(migrations.Migration):
+    # Nullable columns without defaults: plain ADD COLUMNs on SQLite, so the
+    # search triggers on gdpr_datarequest survive.
+
+    dependencies = [
+        ('gdpr', '0010_datarequest_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datarequest',
+            name='due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Due At'),
+        ),
+        migrations.AddField(
+            model_name='datarequest',
+            name='extended_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Extended At'),
+        ),
+        migrations.RunPython(backfill_due_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'due_at', 'id'], name='gdpr_dr_hub_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'status', 'due_at'], name='gdpr_dr_hub_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:00
+
+import django.core.validators
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0011_datarequest_due_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GdprSettings',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+                ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+                ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('deleted_retention_days', models.PositiveIntegerField(default=90, help_text='Deleted consent records and data requests are purged for good after this many days.', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Keep Deleted Records (days)')),
+            ],
+            options={
+                'db_table': 'gdpr_settings',
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('hub_id',), name='gdpr_settings_hub_uniq')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='consentrecord',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['hub_id', 'id'], name='gdpr_cr_hub_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarequest',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['hub_id', 'id'], name='gdpr_dr_hub_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 6.0.2 on 2026-10-18 20:00
+
+import django.core.validators
+import gdpr.models
+import uuid
+from django.db import migrations, models
+
+
+def hub_base_fields():
+    return [
+        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+        ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+        ('created_at', models.DateTimeField(auto_now_add=True)),
+        ('updated_at', models.DateTimeField(auto_now=True)),
+        ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+        ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+        ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+        ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+    ]
+
+
+class Migration(migrations.Migration):
+    # The archive tables get no search triggers: archived rows are searched
+    # by a plain substring match on search_text.
+
+    dependencies = [
+        ('gdpr', '0012_gdprsettings_purge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedConsentRecord',
+            fields=hub_base_fields() + [
+                ('subject_name', models.CharField(max_length=255, verbose_name='Subject Name')),
+                ('subject_email', models.EmailField(max_length=254, verbose_name='Subject Email')),
+                ('purpose', models.CharField(max_length=100, verbose_name='Purpose')),
+                ('consented', models.BooleanField(default=False, verbose_name='Consented')),
+                ('consent_date', models.DateTimeField(blank=True, null=True, verbose_name='Consent Date')),
+                ('withdrawal_date', models.DateTimeField(blank=True, null=True, verbose_name='Withdrawal Date')),
+                ('search_text', models.TextField(blank=True, default='', editable=False)),
+            ],
+            options={
+                'db_table': 'gdpr_consentrecord_archive',
+                'abstract': False,
+                'indexes': [
+                    models.Index(fields=['hub_id', 'subject_email'], name='gdpr_cra_subject_idx'),
+                    models.Index(condition=models.Q(('is_deleted', True)), fields=['hub_id', 'id'], name='gdpr_cra_hub_deleted_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedDataRequest',
+            fields=hub_base_fields() + [
+                ('subject_name', models.CharField(max_length=255, verbose_name='Subject Name')),
+                ('subject_email', models.EmailField(max_length=254, verbose_name='Subject Email')),
+                ('request_type', models.CharField(choices=[('access', 'Data Access'), ('erasure', 'Right to Erasure'), ('portability', 'Data Portability'), ('rectification', 'Rectification')], max_length=30, verbose_name='Request Type')),
+                ('status', models.CharField(default='pending', max_length=20, verbose_name='Status')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Completed At')),
+                ('notes', models.TextField(blank=True, verbose_name='Notes')),
+                ('due_at', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Due At')),
+                ('extended_at', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Extended At')),
+                ('search_text', models.TextField(blank=True, default='', editable=False)),
+                ('erasure_report', models.JSONField(blank=True, editable=False, null=True, verbose_name='Erasure Report')),
+                ('archive', models.FileField(blank=True, editable=False, upload_to=gdpr.models.archive_upload_to, verbose_name='Archive')),
+                ('archive_report', models.JSONField(blank=True, editable=False, null=True, verbose_name='Archive Report')),
+                ('version', models.PositiveIntegerField(default=0, editable=False)),
+                ('claimed_by', models.CharField(blank=True, editable=False, max_length=100, verbose_name='Claimed By')),
+                ('lease_expires_at', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Lease Expires At')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Attempts')),
+                ('last_error', models.TextField(blank=True, editable=False, verbose_name='Last Error')),
+            ],
+            options={
+                'db_table': 'gdpr_datarequest_archive',
+                'abstract': False,
+                'indexes': [
+                    models.Index(fields=['hub_id', 'subject_email'], name='gdpr_dra_subject_idx'),
+                    models.Index(condition=models.Q(('is_deleted', True)), fields=['hub_id', 'id'], name='gdpr_dra_hub_deleted_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='gdprsettings',
+            name='archive_after_days',
+            field=models.PositiveIntegerField(default=365, help_text='Withdrawn consents and completed data requests untouched for this many days move to the archive tables.', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Archive After (days)'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-18 21:00
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0013_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+                ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+                ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('endpoint', models.CharField(max_length=100, verbose_name='Endpoint')),
+                ('path', models.CharField(max_length=500, verbose_name='Path')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Status')),
+                ('seconds', models.FloatField(default=0, verbose_name='Seconds')),
+                ('sql_seconds', models.FloatField(default=0, verbose_name='SQL Seconds')),
+                ('queries', models.PositiveIntegerField(default=0, verbose_name='Queries')),
+                ('frames', models.JSONField(blank=True, default=list, editable=False)),
+                ('statements', models.JSONField(blank=True, default=list, editable=False)),
+            ],
+            options={
+                'db_table': 'gdpr_profile_run',
+                'ordering': ['-created_at'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['hub_id', 'created_at'], name='gdpr_profile_hub_created_idx')],
+            },
+        ),
+    ]
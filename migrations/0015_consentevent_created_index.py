@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0014_profilerun'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consentevent',
+            index=models.Index(fields=['created_at'], name='gdpr_ce_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-18 23:00
+
+from django.db import migrations
+
+
+def install_search_indexes(apps, schema_editor):
+    # Replaces the rowid-keyed SQLite FTS tables with ones keyed by row id.
+    if schema_editor.connection.vendor == 'sqlite':
+        from gdpr.search import install_search_indexes
+        install_search_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gdpr', '0015_consentevent_created_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_indexes, migrations.RunPython.noop),
+    ]
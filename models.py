@@ -1,4 +1,10 @@
+import unicodedata
+import uuid
+from datetime import timedelta
+
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from apps.core.models.base import HubBaseModel
@@ -10,32 +16,345 @@ REQ_TYPE = [
     ('rectification', _('Rectification')),
 ]
 
-class ConsentRecord(HubBaseModel):
+# GDPR Art. 12(3): answer within one month, extendable by two further months.
+RESPONSE_DAYS = 30
+EXTENSION_DAYS = 60
+
+# Statuses of requests still waiting for an answer.
+OPEN_STATUSES = ('pending', 'in_progress')
+
+# Days a soft-deleted row is kept before ``gdpr_purge`` removes it, unless the
+# hub's GdprSettings say otherwise.
+DEFAULT_RETENTION_DAYS = 90
+
+# Days after which withdrawn consents and completed requests are archived.
+DEFAULT_ARCHIVE_DAYS = 365
+
+CONSENT_ACTION = [
+    ('grant', _('Granted')),
+    ('withdraw', _('Withdrawn')),
+]
+
+# Partial-index predicate: every list, search and sort query reads live rows only.
+LIVE_ROWS = models.Q(is_deleted=False)
+
+# The purge walks the soft-deleted rows of a hub in primary key order.
+DELETED_ROWS = models.Q(is_deleted=True)
+
+
+def normalize_email(email):
+    """Canonical form in which subject emails are stored and looked up."""
+    return (email or '').strip().lower()
+
+
+def normalize_search_text(value):
+    """Case- and accent-insensitive form used for the search column and queries."""
+    decomposed = unicodedata.normalize('NFKD', str(value or '').casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).strip()
+
+
+class SearchTextMixin:
+    """
+    Maintains ``search_text``, the normalized ``SEARCH_FIELDS`` joined by
+    newlines, on every save; see ``search.py``. Bulk writers call
+    ``refresh_search_text()`` themselves.
+    """
+    SEARCH_FIELDS = ()
+
+    def refresh_search_text(self):
+        self.search_text = '\n'.join(normalize_search_text(getattr(self, name)) for name in self.SEARCH_FIELDS)
+
+    def save(self, *args, **kwargs):
+        self.refresh_search_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.SEARCH_FIELDS):
+            kwargs['update_fields'] = [*update_fields, 'search_text']
+        super().save(*args, **kwargs)
+
+
+class LoadedValuesMixin:
+    """
+    Keeps the column values as last read from or written to the database in
+    ``_loaded_values``, so post_save handlers can see what changed.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        fields = self._meta.concrete_fields if update_fields is None else [self._meta.get_field(name) for name in update_fields]
+        self._loaded_values = dict(getattr(self, '_loaded_values', {}), **{f.attname: getattr(self, f.attname) for f in fields})
+
+
+class ConsentRecordBase(HubBaseModel):
+    """Columns of ConsentRecord, shared with its archive table."""
     subject_name = models.CharField(max_length=255, verbose_name=_('Subject Name'))
     subject_email = models.EmailField(verbose_name=_('Subject Email'))
     purpose = models.CharField(max_length=100, verbose_name=_('Purpose'))
     consented = models.BooleanField(default=False, verbose_name=_('Consented'))
     consent_date = models.DateTimeField(null=True, blank=True, verbose_name=_('Consent Date'))
     withdrawal_date = models.DateTimeField(null=True, blank=True, verbose_name=_('Withdrawal Date'))
+    search_text = models.TextField(blank=True, default='', editable=False)
 
     class Meta(HubBaseModel.Meta):
+        abstract = True
+
+
+class ConsentRecord(LoadedValuesMixin, SearchTextMixin, ConsentRecordBase):
+    SEARCH_FIELDS = ('subject_name', 'subject_email', 'purpose')
+
+    class Meta(ConsentRecordBase.Meta):
         db_table = 'gdpr_consentrecord'
+        # One (hub_id, <sort field>, id) index per sortable list column, so
+        # the list views and keyset pagination read rows in index order.
+        indexes = [
+            models.Index(fields=['hub_id', field, 'id'], condition=LIVE_ROWS, name=f'gdpr_cr_hub_{suffix}_idx')
+            for field, suffix in [
+                ('consented', 'consented'),
+                ('subject_name', 'name'),
+                ('subject_email', 'email'),
+                ('purpose', 'purpose'),
+                ('consent_date', 'cdate'),
+                ('withdrawal_date', 'wdate'),
+                ('created_at', 'created'),
+            ]
+        ] + [
+            # Covers the "does X consent to Y" check (see services.py) without
+            # touching the table: consented is part of the key.
+            models.Index(fields=['hub_id', 'purpose', 'subject_email', 'consented'], condition=LIVE_ROWS, name='gdpr_cr_consent_check_idx'),
+            models.Index(fields=['hub_id', 'id'], condition=DELETED_ROWS, name='gdpr_cr_hub_deleted_idx'),
+        ]
+        # One row per subject and purpose: repeated consent events upsert it.
+        constraints = [
+            models.UniqueConstraint(fields=['hub_id', 'subject_email', 'purpose'], name='gdpr_cr_subject_purpose_uniq'),
+        ]
 
     def __str__(self):
         return str(self.id)
 
+    def save(self, *args, **kwargs):
+        self.subject_email = normalize_email(self.subject_email)
+        super().save(*args, **kwargs)
+
+
+class ConsentEvent(HubBaseModel):
+    """
+    Append-only ledger of consent grants and withdrawals.
+
+    ConsentRecord holds the current state per (subject, purpose) and is kept
+    up to date as events are written (see ``ledger.py``); the full history
+    lives here.
+    """
+    subject_email = models.EmailField(verbose_name=_('Subject Email'))
+    purpose = models.CharField(max_length=100, verbose_name=_('Purpose'))
+    action = models.CharField(max_length=10, choices=CONSENT_ACTION, verbose_name=_('Action'))
+    occurred_at = models.DateTimeField(verbose_name=_('Occurred At'))
+    source = models.CharField(max_length=30, blank=True, verbose_name=_('Source'))
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'gdpr_consentevent'
+        indexes = [
+            models.Index(fields=['hub_id', 'subject_email', 'purpose', 'occurred_at'], name='gdpr_ce_subject_idx'),
+            # Replay scans recent events (ledger.replay_consent_events).
+            models.Index(fields=['created_at'], name='gdpr_ce_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject_email} {self.action} {self.purpose}'
+
+
+def archive_upload_to(instance, filename):
+    # Random name: archives are only served through the download view.
+    return f'gdpr/archives/{instance.hub_id}/{uuid.uuid4().hex}.zip'
+
 
-class DataRequest(HubBaseModel):
+class DataRequestBase(HubBaseModel):
+    """Columns of DataRequest, shared with its archive table."""
     subject_name = models.CharField(max_length=255, verbose_name=_('Subject Name'))
     subject_email = models.EmailField(verbose_name=_('Subject Email'))
     request_type = models.CharField(max_length=30, choices=REQ_TYPE, verbose_name=_('Request Type'))
     status = models.CharField(max_length=20, default='pending', verbose_name=_('Status'))
     completed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Completed At'))
     notes = models.TextField(blank=True, verbose_name=_('Notes'))
+    # Statutory deadline, set on creation and moved by an extension (see ``deadlines.py``).
+    due_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name=_('Due At'))
+    extended_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name=_('Extended At'))
+    search_text = models.TextField(blank=True, default='', editable=False)
+    # Last erasure run (see ``erasure.py``).
+    erasure_report = models.JSONField(null=True, blank=True, editable=False, verbose_name=_('Erasure Report'))
+    # Subject data archive of access/portability requests (see ``archives.py``).
+    archive = models.FileField(upload_to=archive_upload_to, blank=True, editable=False, verbose_name=_('Archive'))
+    archive_report = models.JSONField(null=True, blank=True, editable=False, verbose_name=_('Archive Report'))
+    # Work queue (see ``workqueue.py``). ``version`` goes up on every write, for
+    # compare-and-set updates.
+    version = models.PositiveIntegerField(default=0, editable=False)
+    claimed_by = models.CharField(max_length=100, blank=True, editable=False, verbose_name=_('Claimed By'))
+    lease_expires_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name=_('Lease Expires At'))
+    attempts = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name=_('Attempts'))
+    last_error = models.TextField(blank=True, editable=False, verbose_name=_('Last Error'))
 
     class Meta(HubBaseModel.Meta):
+        abstract = True
+
+
+class DataRequest(LoadedValuesMixin, SearchTextMixin, DataRequestBase):
+    SEARCH_FIELDS = ('subject_name', 'subject_email', 'request_type', 'status')
+
+    class Meta(DataRequestBase.Meta):
         db_table = 'gdpr_datarequest'
+        # Same access path as ConsentRecord. ``notes`` is sortable but left
+        # unindexed: a TextField can exceed the btree row size limit.
+        indexes = [
+            models.Index(fields=['hub_id', field, 'id'], condition=LIVE_ROWS, name=f'gdpr_dr_hub_{suffix}_idx')
+            for field, suffix in [
+                ('request_type', 'type'),
+                ('status', 'status'),
+                ('subject_name', 'name'),
+                ('subject_email', 'email'),
+                ('completed_at', 'completed'),
+                ('created_at', 'created'),
+                ('due_at', 'due'),
+            ]
+        ] + [
+            # Overdue and at-risk requests: open statuses only, by deadline.
+            models.Index(fields=['hub_id', 'status', 'due_at'], condition=LIVE_ROWS, name='gdpr_dr_hub_status_due_idx'),
+            # Queue claims across hubs: oldest pending first, expired leases.
+            models.Index(fields=['status', 'created_at'], condition=LIVE_ROWS, name='gdpr_dr_queue_idx'),
+            models.Index(fields=['status', 'lease_expires_at'], condition=LIVE_ROWS, name='gdpr_dr_lease_idx'),
+            models.Index(fields=['hub_id', 'id'], condition=DELETED_ROWS, name='gdpr_dr_hub_deleted_idx'),
+        ]
+
+    @property
+    def is_open(self):
+        return self.status in OPEN_STATUSES
+
+    @property
+    def is_overdue(self):
+        return self.is_open and self.due_at is not None and self.due_at < timezone.now()
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.due_at is None:
+            self.due_at = timezone.now() + timedelta(days=RESPONSE_DAYS)
+        if not self._state.adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = [*kwargs['update_fields'], 'version']
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return str(self.id)
+
+
+class ArchivedConsentRecord(ConsentRecordBase):
+    """
+    Withdrawn and deleted consent records moved out of ``gdpr_consentrecord``
+    by ``archiver.py``; same columns, rows keep their id.
+    """
+
+    class Meta(ConsentRecordBase.Meta):
+        db_table = 'gdpr_consentrecord_archive'
+        indexes = [
+            models.Index(fields=['hub_id', 'subject_email'], name='gdpr_cra_subject_idx'),
+            models.Index(fields=['hub_id', 'id'], condition=DELETED_ROWS, name='gdpr_cra_hub_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.id)
+
+
+class ArchivedDataRequest(DataRequestBase):
+    """Completed and deleted data requests moved out of ``gdpr_datarequest``; see ArchivedConsentRecord."""
+
+    class Meta(DataRequestBase.Meta):
+        db_table = 'gdpr_datarequest_archive'
+        indexes = [
+            models.Index(fields=['hub_id', 'subject_email'], name='gdpr_dra_subject_idx'),
+            models.Index(fields=['hub_id', 'id'], condition=DELETED_ROWS, name='gdpr_dra_hub_deleted_idx'),
+        ]
 
     def __str__(self):
         return str(self.id)
 
+
+class GdprSettings(HubBaseModel):
+    """Per-hub settings of the module; see ``for_hub``."""
+    deleted_retention_days = models.PositiveIntegerField(
+        default=DEFAULT_RETENTION_DAYS,
+        validators=[MinValueValidator(1)],
+        verbose_name=_('Keep Deleted Records (days)'),
+        help_text=_('Deleted consent records and data requests are purged for good after this many days.'),
+    )
+    archive_after_days = models.PositiveIntegerField(
+        default=DEFAULT_ARCHIVE_DAYS,
+        validators=[MinValueValidator(1)],
+        verbose_name=_('Archive After (days)'),
+        help_text=_('Withdrawn consents and completed data requests untouched for this many days move to the archive tables.'),
+    )
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'gdpr_settings'
+        constraints = [
+            models.UniqueConstraint(fields=['hub_id'], condition=LIVE_ROWS, name='gdpr_settings_hub_uniq'),
+        ]
+
+    @classmethod
+    def for_hub(cls, hub_id):
+        """The settings of *hub_id*; an unsaved instance with the defaults when it has none."""
+        return cls.objects.filter(hub_id=hub_id).first() or cls(hub_id=hub_id)
+
+    def __str__(self):
+        return f'GDPR settings of {self.hub_id}'
+
+
+class ProfileRun(HubBaseModel):
+    """
+    One profiled request (see ``profiling.py``): its cProfile frames and
+    the EXPLAIN plan of each distinct SQL statement it ran.
+    """
+    endpoint = models.CharField(max_length=100, verbose_name=_('Endpoint'))
+    path = models.CharField(max_length=500, verbose_name=_('Path'))
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name=_('Status'))
+    seconds = models.FloatField(default=0, verbose_name=_('Seconds'))
+    sql_seconds = models.FloatField(default=0, verbose_name=_('SQL Seconds'))
+    queries = models.PositiveIntegerField(default=0, verbose_name=_('Queries'))
+    # [{'function', 'calls', 'self_seconds', 'cumulative_seconds', 'slow'}], by cumulative time
+    frames = models.JSONField(default=list, blank=True, editable=False)
+    # [{'sql', 'count', 'seconds', 'max_seconds', 'plan', 'slow'}], by total time
+    statements = models.JSONField(default=list, blank=True, editable=False)
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'gdpr_profile_run'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['hub_id', 'created_at'], name='gdpr_profile_hub_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.endpoint} ({self.seconds:.3f}s)'
+
+
+class HubStat(models.Model):
+    """
+    Per-hub dashboard counter, e.g. (``consent_purpose``, ``marketing``) → 120.
+
+    Derived from ConsentRecord and DataRequest and maintained incrementally by
+    ``stats.py``; ``gdpr_reconcile_stats`` rebuilds it from the source tables.
+    """
+    hub_id = models.UUIDField(db_index=True)
+    metric = models.CharField(max_length=30)
+    key = models.CharField(max_length=100, blank=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'gdpr_hubstat'
+        constraints = [
+            models.UniqueConstraint(fields=['hub_id', 'metric', 'key'], name='gdpr_hubstat_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.metric}[{self.key}]={self.count}'
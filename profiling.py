@@ -0,0 +1,156 @@
+"""
+On-demand profiling of one request.
+
+An administrator with ``gdpr.manage_settings`` arms profiling from the
+settings page for one endpoint (:func:`arm`, stored in their session). The
+next call of that endpoint in their session runs under cProfile with every
+SQL statement captured (``metrics.instrument`` hands it to
+:func:`profile_call`), then each distinct SELECT is explained and the run is
+stored as a ``ProfileRun``:
+
+* frames: the ``PROFILE_FRAMES`` functions with the most cumulative time
+* statements: distinct statements by total time, with their plan
+
+Frames and statements taking at least ``SLOW_SHARE`` of the request are
+flagged ``slow`` for the settings page to highlight. No subject data is
+stored: statements keep their placeholders, parameters (subject emails,
+names) are only used for EXPLAIN and string constants the database inlined
+into a plan are replaced by ``'?'``, and the stored path keeps the names of
+its query parameters but not their values. The last ``PROFILE_KEEP`` runs
+of a hub are kept.
+"""
+import cProfile
+import os
+import pstats
+import re
+import time
+from collections import OrderedDict
+
+from django.db import DatabaseError, connection
+
+from .metrics import PROFILE_SESSION_KEY, SQLRecorder
+from .models import ProfileRun
+
+# Endpoints that can be profiled: pages and partials read with GET.
+PROFILABLE_ENDPOINTS = [
+    'dashboard', 'consent_records_list', 'consent_records_scroll', 'consent_records_suggest',
+    'data_requests_list', 'data_requests_scroll', 'data_requests_suggest', 'settings',
+]
+
+PROFILE_FRAMES = 30
+
+# Distinct statements explained per run.
+PROFILE_STATEMENTS = 50
+
+SLOW_SHARE = 0.1
+
+# Quoted constants in a plan (PostgreSQL inlines bound values, e.g.
+# ``Filter: (subject_email = 'ana@example.com'::text)``).
+PLAN_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+PROFILE_KEEP = 20
+
+
+def arm(request, endpoint):
+    """Profile the next call of *endpoint* in this session."""
+    if endpoint not in PROFILABLE_ENDPOINTS:
+        raise ValueError(f'Unknown endpoint: {endpoint}')
+    request.session[PROFILE_SESSION_KEY] = endpoint
+
+
+class StatementRecorder(SQLRecorder):
+    """:class:`SQLRecorder` that also keeps each statement, grouped by SQL text."""
+
+    def __init__(self):
+        super().__init__()
+        self.statements = OrderedDict()
+
+    def record(self, sql, params, many, seconds, rowcount):
+        super().record(sql, params, many, seconds, rowcount)
+        entry = self.statements.setdefault(sql, {'sql': sql, 'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'params': params, 'many': many})
+        entry['count'] += 1
+        entry['seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+
+
+def explain(sql, params):
+    """
+    The plan of a SELECT as text, or the error the database gave, with quoted
+    constants (bound values among them) replaced by ``'?'``.
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+    except DatabaseError as e:
+        plan = f'EXPLAIN failed: {e}'
+    return PLAN_LITERAL.sub("'?'", plan)
+
+
+def redacted_path(request):
+    """The request path with the values of its query parameters dropped (``?q=…``)."""
+    if not request.GET:
+        return request.path
+    return request.path + '?' + '&'.join(f'{name}=…' for name in request.GET)
+
+
+def _frames(profiler, seconds):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_cc, calls, self_time, cumulative, _callers) in stats.stats.items():
+        location = f'{os.path.basename(filename)}:{line}' if line else filename
+        rows.append({
+            'function': f'{function} ({location})',
+            'calls': calls,
+            'self_seconds': round(self_time, 6),
+            'cumulative_seconds': round(cumulative, 6),
+            'slow': bool(seconds) and self_time >= seconds * SLOW_SHARE,
+        })
+    rows.sort(key=lambda row: -row['cumulative_seconds'])
+    return rows[:PROFILE_FRAMES]
+
+
+def _statements(recorder, seconds):
+    rows = sorted(recorder.statements.values(), key=lambda entry: -entry['seconds'])[:PROFILE_STATEMENTS]
+    result = []
+    for entry in rows:
+        readonly = entry['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+        result.append({
+            'sql': entry['sql'],
+            'count': entry['count'],
+            'seconds': round(entry['seconds'], 6),
+            'max_seconds': round(entry['max_seconds'], 6),
+            'plan': explain(entry['sql'], entry['params']) if readonly and not entry['many'] else '',
+            'slow': bool(seconds) and entry['seconds'] >= seconds * SLOW_SHARE,
+        })
+    return result
+
+
+def profile_call(endpoint, request, fn, args, kwargs):
+    """Run ``fn(*args, **kwargs)`` (the view) under the profiler and store a ``ProfileRun``."""
+    request.session.pop(PROFILE_SESSION_KEY, None)
+    recorder = StatementRecorder()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    with connection.execute_wrapper(recorder):
+        profiler.enable()
+        try:
+            response = fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+    seconds = time.perf_counter() - started
+    hub_id = request.session.get('hub_id')
+    ProfileRun.objects.create(
+        hub_id=hub_id,
+        endpoint=endpoint,
+        path=redacted_path(request)[:500],
+        status_code=getattr(response, 'status_code', None),
+        seconds=seconds,
+        sql_seconds=recorder.seconds,
+        queries=recorder.queries,
+        frames=_frames(profiler, seconds),
+        statements=_statements(recorder, seconds),
+    )
+    keep = ProfileRun.objects.filter(hub_id=hub_id).order_by('-created_at').values_list('pk', flat=True)[:PROFILE_KEEP]
+    ProfileRun.all_objects.filter(hub_id=hub_id).exclude(pk__in=list(keep)).delete()
+    return response
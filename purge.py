@@ -0,0 +1,84 @@
+"""
+Purge of soft-deleted rows.
+
+Deleting a consent record or data request only flags it (``is_deleted``).
+:func:`purge_deleted` removes flagged rows for good once they have been
+deleted for longer than the hub's retention period
+(``GdprSettings.deleted_retention_days``).
+
+Rows are walked in primary key order on the ``(hub_id, id) WHERE
+is_deleted`` indexes and removed ``batch_size`` per transaction, with an
+optional pause between batches, so no lock is held for long and replicas keep
+up. The archive tables (see ``archiver.py``) are purged the same way. Purged
+rows were already out of the statistics and the consent cache; subject
+archives of purged data requests are deleted with them.
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .bulk import iter_id_chunks
+from .models import ArchivedConsentRecord, ArchivedDataRequest, ConsentRecord, DataRequest, GdprSettings
+
+PURGE_BATCH_SIZE = 500
+
+PURGE_MODELS = (ConsentRecord, DataRequest, ArchivedConsentRecord, ArchivedDataRequest)
+
+
+def purge_cutoff(hub_id, now=None):
+    """Rows of *hub_id* deleted before this moment are due for purging."""
+    return (now or timezone.now()) - timedelta(days=GdprSettings.for_hub(hub_id).deleted_retention_days)
+
+
+def purgeable(model, hub_id, cutoff):
+    return model.all_objects.filter(hub_id=hub_id, is_deleted=True, deleted_at__lt=cutoff)
+
+
+def hubs_with_deleted_rows():
+    hubs = set()
+    for model in PURGE_MODELS:
+        hubs.update(model.all_objects.filter(is_deleted=True, hub_id__isnull=False).values_list('hub_id', flat=True).distinct())
+    return sorted(hubs, key=str)
+
+
+def _purge_chunk(model, chunk):
+    rows = model.all_objects.filter(pk__in=chunk, is_deleted=True)
+    files = []
+    if model in (DataRequest, ArchivedDataRequest):
+        files = list(rows.exclude(archive='').values_list('archive', flat=True))
+    with transaction.atomic():
+        count, _ = rows.delete()
+    storage = DataRequest._meta.get_field('archive').storage
+    for name in files:
+        storage.delete(name)
+    return count
+
+
+def purge_hub(hub_id, batch_size=PURGE_BATCH_SIZE, sleep=0, dry_run=False, now=None):
+    """
+    Purge the expired soft-deleted rows of *hub_id*, sleeping *sleep* seconds
+    after each batch. Returns ``{model_name: rows}`` (with ``dry_run``, the
+    rows that would be purged).
+    """
+    cutoff = purge_cutoff(hub_id, now)
+    result = {}
+    for model in PURGE_MODELS:
+        qs = purgeable(model, hub_id, cutoff)
+        if dry_run:
+            result[model._meta.model_name] = qs.count()
+            continue
+        purged = 0
+        for chunk in iter_id_chunks(qs, chunk_size=batch_size):
+            purged += _purge_chunk(model, chunk)
+            if sleep:
+                time.sleep(sleep)
+        result[model._meta.model_name] = purged
+    return result
+
+
+def purge_deleted(hub_id=None, batch_size=PURGE_BATCH_SIZE, sleep=0, dry_run=False, now=None):
+    """:func:`purge_hub` for *hub_id*, or every hub with deleted rows. Returns ``{hub_id: result}``."""
+    hubs = [hub_id] if hub_id else hubs_with_deleted_rows()
+    return {hub: purge_hub(hub, batch_size, sleep, dry_run, now) for hub in hubs}
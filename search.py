@@ -0,0 +1,164 @@
+"""
+Indexed search over consent records and data requests.
+
+Both models keep ``search_text``, their searchable columns normalized
+(casefolded, accents stripped) and joined by newlines, so a search is a
+single substring match on one column instead of an ``icontains`` per column:
+
+* PostgreSQL: ``LIKE`` on ``search_text`` backed by a ``pg_trgm`` GIN index.
+* SQLite: an FTS5 ``trigram`` table holding a copy of ``search_text``, kept
+  in sync by triggers. The model tables have UUID keys and an implicit
+  ``rowid`` that VACUUM and table rebuilds renumber, so the FTS rows are
+  keyed by ``<fts table>_ids``, which gives every row id a stable
+  ``INTEGER PRIMARY KEY``.
+
+Both are created by :func:`install_search_indexes` (migrations 0007 and
+0016). SQLite drops the triggers when Django rebuilds a table;
+:func:`ensure_search_indexes` reinstalls them after every ``migrate``
+(``post_migrate``).
+
+Queries shorter than a trigram, and databases without either index, fall
+back to a plain substring match on ``search_text``.
+"""
+import logging
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models.expressions import RawSQL
+
+from .models import ConsentRecord, DataRequest, normalize_search_text
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_LENGTH = 3
+
+SUGGEST_LIMIT = 10
+
+# Per model: the SQLite FTS table and the columns returned by suggest().
+SEARCH_MODELS = {
+    ConsentRecord: ('gdpr_consentrecord_fts', ['id', 'subject_name', 'subject_email', 'purpose', 'consented']),
+    DataRequest: ('gdpr_datarequest_fts', ['id', 'subject_name', 'subject_email', 'request_type', 'status']),
+}
+
+TRIGRAM_INDEXES = {
+    'gdpr_consentrecord': 'gdpr_cr_search_trgm_idx',
+    'gdpr_datarequest': 'gdpr_dr_search_trgm_idx',
+}
+
+_fts_ready = {}
+
+
+def _sqlite_fts_statements(table, fts_table):
+    ids = f'{fts_table}_ids'
+    rowid_of = f'(SELECT rowid FROM {ids} WHERE id = {{}}.id)'
+    return [
+        f"CREATE TABLE {ids} (fts_rowid INTEGER PRIMARY KEY, id char(32) NOT NULL UNIQUE)",
+        f"CREATE VIRTUAL TABLE {fts_table} USING fts5(search_text, tokenize='trigram')",
+        f"INSERT INTO {ids}(id) SELECT id FROM {table}",
+        f"INSERT INTO {fts_table}(rowid, search_text) SELECT i.rowid, t.search_text FROM {table} t JOIN {ids} i ON i.id = t.id",
+        f"CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {ids}(id) VALUES (new.id); "
+        f"INSERT INTO {fts_table}(rowid, search_text) VALUES ({rowid_of.format('new')}, new.search_text); END",
+        f"CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {fts_table} WHERE rowid = {rowid_of.format('old')}; "
+        f"DELETE FROM {ids} WHERE id = old.id; END",
+        f"CREATE TRIGGER {fts_table}_au AFTER UPDATE OF search_text ON {table} BEGIN "
+        f"UPDATE {fts_table} SET search_text = new.search_text WHERE rowid = {rowid_of.format('new')}; END",
+    ]
+
+
+def remove_search_indexes(schema_editor):
+    vendor = schema_editor.connection.vendor
+    for model, (fts_table, _columns) in SEARCH_MODELS.items():
+        if vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEXES[model._meta.db_table]}')
+        elif vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts_table}_ids')
+    _fts_ready.clear()
+
+
+def install_search_indexes(schema_editor):
+    """
+    Create (or on SQLite, recreate and rebuild) the search indexes. Skipped
+    with a warning where the database lacks ``pg_trgm`` or the FTS5 trigram
+    tokenizer (SQLite < 3.34).
+    """
+    remove_search_indexes(schema_editor)
+    vendor = schema_editor.connection.vendor
+    try:
+        if vendor == 'postgresql':
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for table, index in TRIGRAM_INDEXES.items():
+                schema_editor.execute(
+                    f'CREATE INDEX {index} ON {table} USING gin (search_text gin_trgm_ops) WHERE NOT is_deleted'
+                )
+        elif vendor == 'sqlite':
+            for model, (fts_table, _columns) in SEARCH_MODELS.items():
+                for statement in _sqlite_fts_statements(model._meta.db_table, fts_table):
+                    schema_editor.execute(statement)
+    except DatabaseError:
+        if vendor == 'postgresql':
+            raise
+        logger.warning('SQLite FTS5 trigram tokenizer unavailable; gdpr search will scan search_text')
+        remove_search_indexes(schema_editor)
+
+
+def _has_fts(alias, fts_table):
+    """Whether the FTS table, its id table and all its triggers exist on *alias*."""
+    if (alias, fts_table) not in _fts_ready:
+        names = [fts_table, f'{fts_table}_ids', f'{fts_table}_ai', f'{fts_table}_ad', f'{fts_table}_au']
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names)
+            _fts_ready[alias, fts_table] = cursor.fetchone()[0] == len(names)
+    return _fts_ready[alias, fts_table]
+
+
+def ensure_search_indexes(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    ``post_migrate`` receiver: reinstall the SQLite search index when a
+    migration rebuilt a table and so dropped its triggers. The index is
+    filled again from ``search_text``, catching up on rows written since.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    _fts_ready.clear()
+    if all(_has_fts(using, fts_table) for fts_table, _columns in SEARCH_MODELS.values()):
+        return
+    tables = set(connection.introspection.table_names())
+    if not all(model._meta.db_table in tables for model in SEARCH_MODELS):
+        return
+    with connection.schema_editor() as schema_editor:
+        install_search_indexes(schema_editor)
+
+
+def search(qs, query):
+    """
+    Filter *qs* (of a model in ``SEARCH_MODELS``, or an archive table, which
+    is not indexed) to rows whose searchable columns contain *query*.
+    """
+    term = normalize_search_text(query)
+    if not term:
+        return qs
+    if len(term) >= TRIGRAM_LENGTH and qs.model in SEARCH_MODELS and connections[qs.db].vendor == 'sqlite':
+        fts_table, _columns = SEARCH_MODELS[qs.model]
+        if _has_fts(qs.db, fts_table):
+            phrase = '"{}"'.format(term.replace('"', '""'))
+            return qs.filter(pk__in=RawSQL(
+                f'SELECT id FROM {fts_table}_ids WHERE rowid IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s)',
+                [phrase],
+            ))
+    return qs.filter(search_text__contains=term)
+
+
+def suggest(qs, query, limit=SUGGEST_LIMIT):
+    """
+    Up to *limit* matches for search-as-you-type, as dicts of the model's
+    suggest columns, ordered by subject name. The trigram index narrows the
+    candidates, but every match is found and sorted before the first *limit*
+    are returned, so short, common queries cost the most.
+    """
+    _fts_table, columns = SEARCH_MODELS[qs.model]
+    return list(search(qs, query).order_by('subject_name', 'id').values(*columns)[:limit])
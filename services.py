@@ -0,0 +1,57 @@
+"""
+GDPR services for other ERPlora modules.
+
+These are the supported entry points for asking the GDPR module about a
+subject's consent; callers should not query ConsentRecord directly.
+"""
+from itertools import islice
+
+from django.db import connection
+
+from .cache import consent_cache
+from .models import ConsentRecord, normalize_email
+
+# Emails per IN (...) lookup in filter_consenting_emails.
+CONSENT_CHECK_BATCH_SIZE = 1000
+
+
+def _batch_size(requested):
+    # Leave room for the hub_id, purpose and consented parameters.
+    limit = connection.features.max_query_params
+    return min(requested, limit - 3) if limit else requested
+
+
+def _batches(emails, size):
+    normalized = (normalize_email(e) for e in emails)
+    iterator = (e for e in normalized if e)
+    while True:
+        batch = set(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def filter_consenting_emails(hub_id, emails, purpose, batch_size=CONSENT_CHECK_BATCH_SIZE):
+    """
+    Yield the emails from *emails* that have active consent for *purpose*.
+
+    *emails* can be any iterable, e.g. a generator over a mailing list. It is
+    read in batches of *batch_size*, and each batch costs one ``IN (...)``
+    lookup on the ``gdpr_cr_consent_check_idx`` index, so memory is bounded
+    by the batch size and not by the list. Emails are yielded normalized, in
+    no particular order. An email that appears in more than one batch may be
+    yielded more than once.
+    """
+    size = _batch_size(batch_size)
+    for batch in _batches(emails, size):
+        yield from ConsentRecord.objects.filter(
+            hub_id=hub_id, is_deleted=False, purpose=purpose, consented=True, subject_email__in=batch,
+        ).values_list('subject_email', flat=True).distinct()
+
+
+def has_consent(hub_id, email, purpose):
+    """Whether *email* has active consent for *purpose*, served from ``consent_cache`` when possible."""
+    email = normalize_email(email)
+    return consent_cache.get(hub_id, email, purpose, lambda: ConsentRecord.objects.filter(
+        hub_id=hub_id, is_deleted=False, purpose=purpose, consented=True, subject_email=email,
+    ).exists())
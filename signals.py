@@ -0,0 +1,44 @@
+"""
+Signal handlers keeping GDPR derived state in sync with the source rows.
+
+``QuerySet.update()`` and ``bulk_create()`` do not send these signals; code
+using them must call the matching helpers itself.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import consent_cache
+from .ledger import record_state_change
+from .models import ConsentRecord, DataRequest
+from .stats import apply_deltas, instance_deltas
+
+
+def _consent_keys(instance):
+    keys = {(instance.hub_id, instance.subject_email, instance.purpose)}
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded and 'subject_email' in loaded and 'purpose' in loaded:
+        keys.add((loaded.get('hub_id', instance.hub_id), loaded['subject_email'], loaded['purpose']))
+    return keys
+
+
+@receiver(post_save, sender=ConsentRecord)
+def consent_record_saved(sender, instance, created, update_fields=None, **kwargs):
+    consent_cache.invalidate(_consent_keys(instance))
+    record_state_change(instance, created, update_fields)
+    apply_deltas(instance.hub_id, instance_deltas(instance, created=created))
+
+
+@receiver(post_delete, sender=ConsentRecord)
+def consent_record_deleted(sender, instance, **kwargs):
+    consent_cache.invalidate(_consent_keys(instance))
+    apply_deltas(instance.hub_id, instance_deltas(instance, deleted=True))
+
+
+@receiver(post_save, sender=DataRequest)
+def data_request_saved(sender, instance, created, **kwargs):
+    apply_deltas(instance.hub_id, instance_deltas(instance, created=created))
+
+
+@receiver(post_delete, sender=DataRequest)
+def data_request_deleted(sender, instance, **kwargs):
+    apply_deltas(instance.hub_id, instance_deltas(instance, deleted=True))
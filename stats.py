@@ -0,0 +1,258 @@
+"""
+Per-hub dashboard statistics.
+
+``HubStat`` holds one counter per (hub, metric, key) for live rows:
+
+* ``consent_records`` / ``data_requests`` — totals (key ``''``)
+* ``consent_purpose`` — consent records per purpose
+* ``consent_status`` — ``consented`` / ``withdrawn``
+* ``request_type`` / ``request_status`` — data requests per type and status
+
+Counters move by deltas: single-row saves and deletes from ``signals.py``,
+``QuerySet.update()`` and bulk upserts through :func:`apply_queryset` and
+:func:`consent_upsert_deltas`. Writes that bypass both (raw SQL, an
+unloaded instance saved over an existing row) cause drift, which
+``gdpr_reconcile_stats`` repairs with :func:`reconcile`.
+
+Breakdowns the counters do not hold (combinations, time buckets) are
+computed on demand by :func:`grouped_counts`, one GROUP BY query each.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+
+from .cache import invalidate_hub_snapshot
+from .models import ConsentRecord, DataRequest, HubStat
+
+
+def consent_record_keys(row):
+    """The counters a ConsentRecord row (a mapping of attnames) contributes to."""
+    if row.get('is_deleted'):
+        return []
+    return [
+        ('consent_records', ''),
+        ('consent_purpose', row['purpose']),
+        ('consent_status', 'consented' if row['consented'] else 'withdrawn'),
+    ]
+
+
+def data_request_keys(row):
+    """The counters a DataRequest row (a mapping of attnames) contributes to."""
+    if row.get('is_deleted'):
+        return []
+    return [
+        ('data_requests', ''),
+        ('request_type', row['request_type']),
+        ('request_status', row['status']),
+    ]
+
+
+ROW_KEYS = {
+    ConsentRecord: (consent_record_keys, ['purpose', 'consented']),
+    DataRequest: (data_request_keys, ['request_type', 'status']),
+}
+
+
+def apply_deltas(hub_id, deltas):
+    """
+    Add the (metric, key) → delta mapping *deltas* to the counters of
+    *hub_id*; the hub's assistant snapshot is dropped when any of them moves.
+    """
+    if hub_id is None:
+        return
+    changed = False
+    for (metric, key), delta in deltas.items():
+        if not delta:
+            continue
+        changed = True
+        counter = HubStat.objects.filter(hub_id=hub_id, metric=metric, key=key)
+        if counter.update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                HubStat.objects.create(hub_id=hub_id, metric=metric, key=key, count=delta)
+        except IntegrityError:
+            # Created concurrently since the update above.
+            counter.update(count=F('count') + delta)
+    if changed:
+        invalidate_hub_snapshot(hub_id)
+
+
+def instance_deltas(instance, created=False, deleted=False):
+    """Counter changes for a single-row save (or hard delete) of *instance*."""
+    row_keys, fields = ROW_KEYS[type(instance)]
+    deltas = Counter()
+    loaded = getattr(instance, '_loaded_values', None)
+    if not created and loaded and all(name in loaded for name in fields + ['is_deleted']):
+        deltas.subtract(row_keys(loaded))
+    if not deleted:
+        deltas.update(row_keys(instance.__dict__))
+    return deltas
+
+
+def apply_queryset(qs, sign=-1):
+    """
+    Count the rows of *qs* out of (``sign=-1``) or into (``sign=1``) the
+    statistics, grouped in one query; call before ``qs.update()``.
+    """
+    row_keys, fields = ROW_KEYS[qs.model]
+    by_hub = defaultdict(Counter)
+    for row in qs.values('hub_id', 'is_deleted', *fields).annotate(n=Count('id')).order_by():
+        for key in row_keys(row):
+            by_hub[row['hub_id']][key] += sign * row['n']
+    for hub_id, deltas in by_hub.items():
+        apply_deltas(hub_id, deltas)
+
+
+def existing_consent_state(hub_id, keys, lock=False):
+    """
+    The stored ``consented``/``is_deleted`` state and consent and withdrawal
+    dates for the (email, purpose) *keys* of *hub_id*, including soft-deleted
+    rows, as ``{key: row}``. With *lock* the rows are read ``FOR UPDATE``
+    (inside a transaction) so they cannot change before the caller writes.
+    """
+    keys = set(keys)
+    emails = sorted({email for email, _purpose in keys})
+    limit = connection.features.max_query_params
+    size = min(len(emails), limit - 2) if limit else len(emails)
+    existing = {}
+    for start in range(0, len(emails), size or 1):
+        rows = ConsentRecord.all_objects.filter(hub_id=hub_id, subject_email__in=emails[start:start + size])
+        if lock:
+            rows = rows.select_for_update()
+        rows = rows.values('subject_email', 'purpose', 'consented', 'is_deleted', 'consent_date', 'withdrawal_date')
+        for row in rows:
+            key = (row['subject_email'], row['purpose'])
+            if key in keys:
+                existing[key] = row
+    return existing
+
+
+def consent_upsert_deltas(existing, rows):
+    """
+    Counter changes for upserting *rows* (mappings with subject_email, purpose
+    and consented; written live) over the *existing* state from
+    :func:`existing_consent_state`.
+    """
+    deltas = Counter()
+    for row in rows:
+        before = existing.get((row['subject_email'], row['purpose']))
+        if before is not None:
+            deltas.subtract(consent_record_keys(before))
+        deltas.update(consent_record_keys(row))
+    return deltas
+
+
+def compute_stats(hub_id=None):
+    """
+    ``{hub_id: Counter}`` rebuilt from the source tables: one grouped pass
+    over each, with the consented/withdrawn split as conditional aggregates.
+    """
+    totals = defaultdict(Counter)
+    consents = ConsentRecord.objects.filter(is_deleted=False)
+    requests = DataRequest.objects.filter(is_deleted=False)
+    if hub_id is not None:
+        consents = consents.filter(hub_id=hub_id)
+        requests = requests.filter(hub_id=hub_id)
+
+    for row in consents.values('hub_id', 'purpose').annotate(
+        total=Count('id'), consented=Count('id', filter=Q(consented=True)),
+    ).order_by():
+        counters = totals[row['hub_id']]
+        counters[('consent_records', '')] += row['total']
+        counters[('consent_purpose', row['purpose'])] += row['total']
+        counters[('consent_status', 'consented')] += row['consented']
+        counters[('consent_status', 'withdrawn')] += row['total'] - row['consented']
+
+    for row in requests.values('hub_id', 'request_type', 'status').annotate(total=Count('id')).order_by():
+        counters = totals[row['hub_id']]
+        counters[('data_requests', '')] += row['total']
+        counters[('request_type', row['request_type'])] += row['total']
+        counters[('request_status', row['status'])] += row['total']
+    return totals
+
+
+def reconcile(hub_id=None):
+    """
+    Replace the stored counters of *hub_id* (or every hub) with freshly
+    computed ones. Returns the number of counters that were wrong.
+    """
+    stored_qs = HubStat.objects.all() if hub_id is None else HubStat.objects.filter(hub_id=hub_id)
+    with transaction.atomic():
+        computed = compute_stats(hub_id)
+        stored = defaultdict(Counter)
+        for stat in stored_qs.select_for_update():
+            stored[stat.hub_id][(stat.metric, stat.key)] = stat.count
+        drift = 0
+        for hub in set(stored) | set(computed):
+            old, new = stored[hub], computed[hub]
+            drift += sum(1 for key in set(old) | set(new) if old[key] != new[key])
+        stored_qs.delete()
+        HubStat.objects.bulk_create([
+            HubStat(hub_id=hub, metric=metric, key=key, count=count)
+            for hub, counters in computed.items() if hub is not None
+            for (metric, key), count in counters.items()
+            if count
+        ])
+    for hub in set(stored) | set(computed):
+        invalidate_hub_snapshot(hub)
+    return drift
+
+
+def hub_count(hub_id, metric, key=''):
+    """A single counter of *hub_id*, in one indexed lookup."""
+    return HubStat.objects.filter(hub_id=hub_id, metric=metric, key=key).values_list('count', flat=True).first() or 0
+
+
+def hub_stats(hub_id):
+    """The non-zero counters of *hub_id* as ``{metric: {key: count}}``, in one query."""
+    stats = defaultdict(dict)
+    for metric, key, count in HubStat.objects.filter(hub_id=hub_id).exclude(count=0).values_list('metric', 'key', 'count'):
+        stats[metric][key] = count
+    return stats
+
+
+# Columns grouped_counts() may group by, per source.
+GROUP_FIELDS = {
+    'consent_records': ('purpose', 'consented'),
+    'data_requests': ('request_type', 'status'),
+}
+
+# Time buckets over created_at.
+TIME_BUCKETS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth, 'year': TruncYear}
+
+
+def grouped_counts(hub_id, source, group_by=(), bucket=None, since=None, until=None):
+    """
+    Live rows of *hub_id* in *source* (a ``GROUP_FIELDS`` key) created in
+    [*since*, *until*), counted per combination of the *group_by* columns and,
+    with *bucket*, per ``created_at`` period (key ``period``), in one GROUP BY
+    query. Consent groups not split by ``consented`` also count their
+    consented rows. Returns a list of dicts; raises ``ValueError`` on an
+    unknown source, column or bucket.
+    """
+    if source not in GROUP_FIELDS:
+        raise ValueError(f'Unknown source: {source}')
+    unknown = set(group_by) - set(GROUP_FIELDS[source])
+    if unknown:
+        raise ValueError(f"Cannot group {source} by {', '.join(sorted(unknown))}")
+    if bucket is not None and bucket not in TIME_BUCKETS:
+        raise ValueError(f'Unknown time bucket: {bucket}')
+    model = ConsentRecord if source == 'consent_records' else DataRequest
+    qs = model.objects.filter(hub_id=hub_id, is_deleted=False)
+    if since is not None:
+        qs = qs.filter(created_at__gte=since)
+    if until is not None:
+        qs = qs.filter(created_at__lt=until)
+    aggregates = {'count': Count('id')}
+    if model is ConsentRecord and 'consented' not in group_by:
+        aggregates['consented'] = Count('id', filter=Q(consented=True))
+    columns = list(group_by)
+    if bucket is not None:
+        qs = qs.annotate(period=TIME_BUCKETS[bucket]('created_at'))
+        columns.append('period')
+    if not columns:
+        return [qs.aggregate(**aggregates)]
+    return list(qs.values(*columns).annotate(**aggregates).order_by(*columns))
@@ -51,6 +51,22 @@ def admin_user(db, hub_id):
     )
 
 
+class PermissionsUser:
+    """Request user holding a fixed set of permissions, for calling assistant tools directly."""
+
+    def __init__(self, *permissions):
+        self.permissions = set(permissions)
+
+    def has_perm(self, permission):
+        return permission in self.permissions
+
+
+@pytest.fixture
+def tool_user():
+    """User allowed to read consent records and data requests."""
+    return PermissionsUser('gdpr.view_consentrecord', 'gdpr.view_datarequest')
+
+
 @pytest.fixture
 def auth_client(client, admin_user, store_config):
     """Authenticated client with session."""
@@ -0,0 +1,129 @@
+"""Tests for the gdpr assistant tools."""
+import importlib
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.test import RequestFactory
+from django.utils import timezone
+
+from gdpr import ai_tools
+from gdpr.ai_context import STATIC_CONTEXT, get_context, hub_snapshot
+from gdpr.ai_tools import GdprStatistics, ListConsentRecords, ListDataRequests
+from gdpr.models import ConsentRecord, DataRequest
+
+
+@pytest.fixture
+def tool_request(hub_id, tool_user):
+    request = RequestFactory().get('/')
+    request.session = {'hub_id': str(hub_id)}
+    request.user = tool_user
+    return request
+
+
+@pytest.fixture
+def consents(hub_id):
+    for i in range(5):
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name=f'S{i}', subject_email=f's{i}@example.com', purpose='marketing', consented=i % 2 == 0)
+    ConsentRecord.objects.create(hub_id=uuid.uuid4(), subject_name='Other', subject_email='other@example.com', purpose='marketing', consented=True)
+
+
+@pytest.mark.django_db
+class TestListTools:
+    """list_consent_records and list_data_requests tests."""
+
+    def test_pages_through_the_hub_only(self, tool_request, consents):
+        """Test pages are bounded, chained by cursor and never leave the hub."""
+        tool = ListConsentRecords()
+        first = tool.execute({'limit': 2}, tool_request)
+        assert len(first['records']) == 2 and first['total'] == 5
+        emails = [r['subject_email'] for r in first['records']]
+        cursor = first['next_cursor']
+        while cursor:
+            page = tool.execute({'limit': 2, 'cursor': cursor}, tool_request)
+            emails += [r['subject_email'] for r in page['records']]
+            cursor = page['next_cursor']
+        assert sorted(emails) == [f's{i}@example.com' for i in range(5)]
+        assert set(first['records'][0]) == {'id', 'subject_name', 'subject_email', 'purpose', 'consented', 'consent_date', 'created_at'}
+
+    def test_totals(self, tool_request, consents, monkeypatch):
+        """Test single-filter totals come from the hub counters and combined filters are capped."""
+        tool = ListConsentRecords()
+        assert tool.execute({'consented': True}, tool_request)['total'] == 3
+        monkeypatch.setattr(ai_tools, 'TOOL_COUNT_CAP', 1)
+        result = tool.execute({'consented': True, 'purpose': 'marketing'}, tool_request)
+        assert (result['total'], result['total_capped']) == (1, True)
+
+    def test_data_requests_are_scoped(self, hub_id, tool_request):
+        """Test data requests of other hubs are not listed."""
+        DataRequest.objects.create(hub_id=hub_id, subject_name='A', subject_email='a@example.com', request_type='erasure')
+        DataRequest.objects.create(hub_id=uuid.uuid4(), subject_name='B', subject_email='b@example.com', request_type='erasure')
+        result = ListDataRequests().execute({'request_type': 'erasure'}, tool_request)
+        assert [r['subject_name'] for r in result['requests']] == ['A']
+        assert result['total'] == 1 and result['next_cursor'] is None
+
+
+@pytest.mark.django_db
+class TestStatisticsTool:
+    """gdpr_statistics tests."""
+
+    def test_consent_rate_per_purpose_in_one_query(self, hub_id, tool_request, consents, django_assert_num_queries):
+        """Test groups carry count, share and consent rate from a single GROUP BY."""
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name='A', subject_email='a@example.com', purpose='analytics', consented=True)
+        with django_assert_num_queries(1):
+            result = GdprStatistics().execute({'source': 'consent_records', 'group_by': ['purpose']}, tool_request)
+        assert result['total'] == 6
+        marketing = result['groups'][0]
+        assert (marketing['purpose'], marketing['count'], marketing['consent_rate']) == ('marketing', 5, 0.6)
+        assert result['groups'][1]['share'] == round(1 / 6, 4)
+
+    def test_time_buckets_and_status(self, hub_id, tool_request):
+        """Test requests grouped by status and month."""
+        for status in ('pending', 'pending', 'completed'):
+            DataRequest.objects.create(hub_id=hub_id, subject_name='A', subject_email='a@example.com', request_type='erasure', status=status)
+        result = GdprStatistics().execute({'source': 'data_requests', 'group_by': ['status'], 'bucket': 'month'}, tool_request)
+        assert {(g['status'], g['count']) for g in result['groups']} == {('pending', 2), ('completed', 1)}
+        assert all(g['period'] for g in result['groups'])
+
+    def test_source_needs_its_own_permission(self, tool_request):
+        """Test data request statistics need gdpr.view_datarequest, not only the tool's permission."""
+        tool_request.user.permissions = {GdprStatistics.required_permission}
+        assert 'error' not in GdprStatistics().execute({'source': 'consent_records'}, tool_request)
+        result = GdprStatistics().execute({'source': 'data_requests'}, tool_request)
+        assert result['error'] == 'Permission denied: gdpr.view_datarequest'
+
+    def test_rejects_foreign_columns(self, tool_request):
+        """Test grouping a source by another source's column is an error, not a query."""
+        result = GdprStatistics().execute({'source': 'data_requests', 'group_by': ['purpose']}, tool_request)
+        assert 'error' in result
+
+
+@pytest.mark.django_db
+class TestHubSnapshot:
+    """Per-hub snapshot appended to the module context."""
+
+    def test_snapshot_is_cached_and_dropped_on_writes(self, hub_id, consents, django_assert_num_queries):
+        """Test the snapshot is served from cache until a write moves the counters."""
+        DataRequest.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='ana@example.com', request_type='access', due_at=timezone.now() - timedelta(days=1))
+        snapshot = hub_snapshot(hub_id)
+        assert (snapshot['consent_records'], snapshot['consented'], snapshot['withdrawn']) == (5, 3, 2)
+        assert snapshot['purposes'] == ['marketing']
+        assert (snapshot['statuses'], snapshot['overdue']) == ({'pending': 1}, 1)
+        with django_assert_num_queries(0):
+            hub_snapshot(hub_id)
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name='Bo', subject_email='bo@example.com', purpose='analytics', consented=True)
+        assert hub_snapshot(hub_id)['purposes'] == ['analytics', 'marketing']
+
+    def test_context_includes_the_request_hub(self, tool_request, consents):
+        """Test get_context appends the snapshot of the session's hub."""
+        context = get_context(tool_request)
+        assert context.startswith(STATIC_CONTEXT)
+        assert 'Consent records: 5 (3 consented, 2 withdrawn)' in context
+        assert 'Overdue open requests: 0' in context
+
+    def test_module_context_is_computed_when_read(self, configured_hub, consents):
+        """Test reading the module's CONTEXT, as the assistant's loader does, includes this hub's snapshot."""
+        ai_context = importlib.import_module('gdpr.ai_context')
+        assert 'Consent records: 5 (3 consented, 2 withdrawn)' in ai_context.CONTEXT
+        ConsentRecord.objects.create(hub_id=configured_hub.hub_id, subject_name='Bo', subject_email='bo@example.com', purpose='analytics', consented=True)
+        assert 'Consent records: 6 (4 consented, 2 withdrawn)' in ai_context.CONTEXT
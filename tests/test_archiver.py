@@ -0,0 +1,57 @@
+"""Tests for moving old gdpr rows to the archive tables."""
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from gdpr.archiver import archive_hub
+from gdpr.models import ArchivedConsentRecord, ArchivedDataRequest, ConsentRecord, DataRequest
+from gdpr.stats import hub_stats
+
+
+@pytest.fixture
+def old_rows(hub_id):
+    long_ago = timezone.now() - timedelta(days=400)
+    withdrawn = ConsentRecord.objects.create(hub_id=hub_id, subject_name='Old', subject_email='old@example.com', purpose='marketing')
+    ConsentRecord.objects.create(hub_id=hub_id, subject_name='Live', subject_email='live@example.com', purpose='marketing', consented=True)
+    completed = DataRequest.objects.create(hub_id=hub_id, subject_name='Old', subject_email='old@example.com', request_type='access', status='completed')
+    DataRequest.objects.create(hub_id=hub_id, subject_name='Open', subject_email='open@example.com', request_type='access')
+    ConsentRecord.objects.filter(pk=withdrawn.pk).update(updated_at=long_ago)
+    DataRequest.objects.filter(pk=completed.pk).update(updated_at=long_ago)
+    return withdrawn, completed
+
+
+@pytest.mark.django_db
+class TestArchiveHub:
+    """archive_hub() tests."""
+
+    def test_moves_old_closed_rows(self, hub_id, old_rows):
+        """Test old withdrawn consents and completed requests move, keeping their ids, and leave the stats."""
+        withdrawn, completed = old_rows
+        assert archive_hub(hub_id, dry_run=True) == {'consentrecord': 1, 'datarequest': 1}
+        assert archive_hub(hub_id, batch_size=1) == {'consentrecord': 1, 'datarequest': 1}
+        assert not ConsentRecord.all_objects.filter(pk=withdrawn.pk).exists()
+        assert ArchivedConsentRecord.objects.get(pk=withdrawn.pk).subject_email == 'old@example.com'
+        assert ArchivedDataRequest.objects.get(pk=completed.pk).status == 'completed'
+        stats = hub_stats(hub_id)
+        assert stats['consent_records'] == {'': 1}
+        assert stats['request_status'] == {'pending': 1}
+        assert archive_hub(hub_id) == {'consentrecord': 0, 'datarequest': 0}
+
+
+@pytest.mark.django_db
+class TestIncludeArchived:
+    """The "include archived" toggle on lists and exports."""
+
+    def test_lists_read_archive_only_when_asked(self, auth_client, hub_id, old_rows):
+        """Test archived rows appear in pages, scroll chunks and exports with archived=1 only."""
+        archive_hub(hub_id)
+        url = reverse('gdpr:consent_records_list')
+        headers = {'HTTP_HX_REQUEST': 'true', 'HTTP_HX_TARGET': 'datatable-body'}
+        assert 'old@example.com' not in auth_client.get(url, **headers).content.decode()
+        for per_page in (12, 0):
+            content = auth_client.get(url, {'archived': '1', 'per_page': per_page}, **headers).content.decode()
+            assert 'old@example.com' in content and 'live@example.com' in content
+        response = auth_client.get(reverse('gdpr:data_requests_list'), {'export': 'csv', 'archived': '1'})
+        assert 'old@example.com' in b''.join(response.streaming_content).decode()
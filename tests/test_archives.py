@@ -0,0 +1,85 @@
+"""Tests for gdpr subject data archives."""
+import io
+import json
+import zipfile
+
+import pytest
+from django.urls import reverse
+
+from gdpr.archives import build_subject_archive
+from gdpr.models import ConsentRecord, DataRequest
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def access_request(hub_id):
+    for purpose in ('marketing', 'analytics'):
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='ana@example.com', purpose=purpose, consented=True)
+    ConsentRecord.objects.create(hub_id=hub_id, subject_name='Bob', subject_email='bob@example.com', purpose='marketing', consented=True)
+    return DataRequest.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='ana@example.com', request_type='access')
+
+
+@pytest.mark.django_db
+class TestBuildSubjectArchive:
+    """build_subject_archive() tests."""
+
+    def test_archive_holds_subject_rows_only(self, media, access_request):
+        """Test the archive has one NDJSON member per handler with the subject's rows and a manifest."""
+        progress = []
+        report = build_subject_archive(access_request, progress=progress.append, chunk_size=1)
+        assert report['state'] == 'ready'
+        assert report['handlers'] == {'gdpr.consent_records': 2, 'gdpr.archived_consent_records': 0, 'gdpr.consent_events': 2}
+        assert progress[-1]['rows'] == 4
+        access_request.refresh_from_db()
+        assert access_request.archive_report['state'] == 'ready'
+        with access_request.archive.open('rb') as f, zipfile.ZipFile(f) as archive:
+            records = [json.loads(line) for line in archive.read('gdpr/consent_records.ndjson').splitlines()]
+            manifest = json.loads(archive.read('manifest.json'))
+        assert sorted(r['purpose'] for r in records) == ['analytics', 'marketing']
+        assert {r['subject_email'] for r in records} == {'ana@example.com'}
+        assert manifest['rows']['gdpr.consent_records'] == 2
+
+    def test_rebuild_replaces_archive(self, media, access_request):
+        """Test a rebuild deletes the previous file."""
+        build_subject_archive(access_request)
+        first = access_request.archive.name
+        build_subject_archive(access_request)
+        assert access_request.archive.name != first
+        assert not access_request.archive.storage.exists(first)
+
+
+@pytest.mark.django_db
+class TestArchiveViews:
+    """Archive view tests."""
+
+    def test_build_and_download(self, auth_client, media, access_request):
+        """Test POST queues the build for the worker and GET downloads the result."""
+        from gdpr.workqueue import work
+        url = reverse('gdpr:data_request_archive', args=[access_request.pk])
+        assert auth_client.get(url).status_code == 404
+        response = auth_client.post(url)
+        assert 'Building archive' in response.content.decode()
+        assert DataRequest.objects.get(pk=access_request.pk).archive_report['state'] == 'queued'
+        assert work('w1', drain=True) == 1
+        response = auth_client.get(url)
+        assert response['Content-Disposition'].startswith('attachment')
+        assert zipfile.is_zipfile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_refused_while_building(self, auth_client, media, access_request):
+        """Test a second build is not started while a worker holds the request."""
+        from gdpr.workqueue import claim
+        claimed = claim('w1')
+        assert claimed.pk == access_request.pk
+        response = auth_client.post(reverse('gdpr:data_request_archive', args=[access_request.pk]))
+        assert 'already being built' in response.content.decode()
+        assert DataRequest.objects.get(pk=access_request.pk).claimed_by == 'w1'
+
+    def test_rejects_other_request_types(self, auth_client, data_request):
+        """Test only access and portability requests get an archive."""
+        url = reverse('gdpr:data_request_archive', args=[data_request.pk])
+        assert auth_client.post(url).status_code == 400
@@ -0,0 +1,63 @@
+"""Tests for the gdpr benchmark seeding and reports."""
+from datetime import timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from gdpr.benchmarks.harness import seed_hub
+from gdpr.benchmarks.report import compare
+from gdpr.models import ConsentRecord, DataRequest
+from gdpr.stats import hub_stats
+
+
+@pytest.mark.django_db
+class TestSeeding:
+    """seed_hub and gdpr_seed tests."""
+
+    def test_seeds_realistic_rows_and_counters(self, hub_id):
+        """Test seeded rows are spread over time, unique per subject and purpose, and counted."""
+        seed_hub(hub_id, consent_records=500, data_requests=100, days=100, batch_size=64)
+        consents = ConsentRecord.objects.filter(hub_id=hub_id)
+        assert consents.count() == 500
+        assert consents.values('subject_email', 'purpose').distinct().count() == 500
+        assert consents.filter(created_at__lt=timezone.now() - timedelta(days=90)).exists()
+        assert DataRequest.objects.filter(hub_id=hub_id, status='completed', completed_at__isnull=False).exists()
+        stats = hub_stats(hub_id)
+        assert (stats['consent_records'][''], stats['data_requests']['']) == (500, 100)
+        assert stats['consent_purpose']['marketing'] > stats['consent_purpose']['profiling']
+
+    def test_command_refuses_a_seeded_hub(self, hub_id):
+        """Test gdpr_seed does not mix into existing data unless asked to replace it."""
+        call_command('gdpr_seed', hub_id=str(hub_id), consent_records=20, data_requests=5)
+        with pytest.raises(CommandError):
+            call_command('gdpr_seed', hub_id=str(hub_id), consent_records=20, data_requests=5)
+        call_command('gdpr_seed', hub_id=str(hub_id), consent_records=10, data_requests=0, replace=True, interactive=False)
+        assert ConsentRecord.objects.filter(hub_id=hub_id).count() == 10
+        assert hub_stats(hub_id)['consent_records'][''] == 10
+
+    def test_replace_refuses_real_data(self, hub_id, consent_record):
+        """Test --replace never drops a hub holding rows the seeder did not write."""
+        with pytest.raises(CommandError):
+            call_command('gdpr_seed', hub_id=str(hub_id), consent_records=10, replace=True, interactive=False)
+        assert ConsentRecord.objects.filter(pk=consent_record.pk).exists()
+
+
+class TestReportComparison:
+    """Benchmark report comparison tests."""
+
+    def _report(self, **metrics):
+        return {'results': [{'suite': 'search', 'case': 'search_indexed', 'size': 1000, 'query': 'market', **metrics}]}
+
+    def test_flags_slower_heavier_and_chattier_rows(self):
+        """Test growth beyond the tolerance and any extra query are regressions."""
+        baseline = self._report(seconds=0.1, peak_mb=10, queries=2)
+        assert compare(baseline, self._report(seconds=0.12, peak_mb=10.5, queries=2)) == []
+        regressions = compare(baseline, self._report(seconds=0.2, peak_mb=20, queries=3))
+        assert [r['metric'] for r in regressions] == ['seconds', 'peak_mb', 'queries']
+
+    def test_ignores_noise_and_unmatched_rows(self):
+        """Test tiny absolute differences and rows missing from the baseline are not flagged."""
+        assert compare(self._report(seconds=0.001), self._report(seconds=0.004)) == []
+        other = {'results': [{'suite': 'search', 'case': 'search_indexed', 'size': 1000, 'query': 'nobody', 'seconds': 9}]}
+        assert compare(self._report(seconds=0.1), other) == []
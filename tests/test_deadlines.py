@@ -0,0 +1,73 @@
+"""Tests for gdpr data request deadlines."""
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from gdpr.deadlines import ExtensionError, deadline_summary, record_extension
+from gdpr.models import EXTENSION_DAYS, RESPONSE_DAYS, DataRequest
+
+
+def _request(hub_id, status='pending', due_in=None, **kwargs):
+    due_at = None if due_in is None else timezone.now() + timedelta(days=due_in)
+    return DataRequest.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='ana@example.com', request_type='access', status=status, due_at=due_at, **kwargs)
+
+
+@pytest.mark.django_db
+class TestDeadlines:
+    """Deadline tests."""
+
+    def test_due_at_set_on_creation(self, hub_id):
+        """Test a new request is due one month after receipt."""
+        obj = _request(hub_id)
+        assert abs(obj.due_at - (obj.created_at + timedelta(days=RESPONSE_DAYS))) < timedelta(seconds=5)
+        obj.notes = 'edited'
+        obj.save()
+        assert abs(obj.due_at - (obj.created_at + timedelta(days=RESPONSE_DAYS))) < timedelta(seconds=5)
+
+    def test_summary_counts_open_requests_only(self, hub_id):
+        """Test overdue and at-risk counts ignore closed and far-off requests."""
+        overdue = _request(hub_id, due_in=-2)
+        _request(hub_id, status='in_progress', due_in=3)
+        _request(hub_id, due_in=20)
+        _request(hub_id, status='completed', due_in=-40)
+        summary = deadline_summary(hub_id)
+        assert (summary['overdue'], summary['at_risk']) == (1, 1)
+        assert summary['requests'][0].pk == overdue.pk
+        assert summary['requests'][0].is_overdue
+
+    def test_extension_moves_due_at_once(self, hub_id):
+        """Test an extension moves the deadline, notes the reason and cannot be repeated."""
+        obj = _request(hub_id)
+        due_at = obj.due_at
+        assert record_extension(obj, reason='Complex request') is True
+        obj.refresh_from_db()
+        assert obj.due_at == due_at + timedelta(days=EXTENSION_DAYS)
+        assert 'Complex request' in obj.notes
+        with pytest.raises(ExtensionError):
+            record_extension(obj)
+
+    def test_extension_rejected_when_closed(self, hub_id):
+        """Test closed requests cannot be extended."""
+        with pytest.raises(ExtensionError):
+            record_extension(_request(hub_id, status='completed'))
+
+    def test_dashboard_and_extend_view(self, auth_client, hub_id):
+        """Test the dashboard lists urgent requests and the panel records an extension."""
+        obj = _request(hub_id, due_in=-1)
+        response = auth_client.get(reverse('gdpr:dashboard'))
+        assert response.context['deadlines']['overdue'] == 1
+        response = auth_client.post(reverse('gdpr:data_request_extend', args=[obj.pk]), {'days': '30'})
+        assert response.status_code == 200
+        obj.refresh_from_db()
+        assert obj.extended_at is not None
+        assert not obj.is_overdue
+
+    def test_sort_by_due_at(self, auth_client, hub_id):
+        """Test the list can be sorted by deadline."""
+        later = _request(hub_id, due_in=10)
+        sooner = _request(hub_id, due_in=1)
+        response = auth_client.get(reverse('gdpr:data_requests_list'), {'sort': 'due_at', 'dir': 'asc'}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        html = response.content.decode()
+        assert html.index(str(sooner.pk)) < html.index(str(later.pk))
@@ -0,0 +1,134 @@
+"""Tests for gdpr cross-module erasure."""
+import pytest
+from django.urls import reverse
+
+from gdpr.erasure import ErasureHandler, get_handlers, register_handler, run_erasure
+from gdpr.models import ConsentEvent, ConsentRecord, DataRequest
+from gdpr.stats import hub_stats
+
+
+@pytest.fixture
+def erasure_request(hub_id):
+    for purpose in ('marketing', 'analytics'):
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='ana@example.com', purpose=purpose, consented=True)
+    ConsentRecord.objects.create(hub_id=hub_id, subject_name='Bob', subject_email='bob@example.com', purpose='marketing', consented=True)
+    return DataRequest.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='Ana@Example.com', request_type='erasure')
+
+
+class FailingHandler(ErasureHandler):
+    name = 'failing'
+    module_id = 'tests'
+
+    def queryset(self, hub_id, subject_email):
+        raise RuntimeError('boom')
+
+
+@pytest.mark.django_db
+class TestRunErasure:
+    """run_erasure() tests."""
+
+    def test_dry_run_only_counts(self, hub_id, erasure_request):
+        """Test a dry run reports what would be erased and changes nothing."""
+        report = run_erasure(erasure_request, dry_run=True)
+        by_handler = {r['handler']: r for r in report['handlers']}
+        assert by_handler['consent_records']['found'] == 2
+        assert by_handler['consent_events']['found'] == 2
+        assert report['erased'] == 0
+        assert ConsentRecord.objects.filter(hub_id=hub_id).count() == 3
+        erasure_request.refresh_from_db()
+        assert erasure_request.status == 'pending'
+        assert erasure_request.erasure_report['dry_run'] is True
+
+    def test_erases_subject_and_completes_request(self, hub_id, erasure_request):
+        """Test a run erases only the subject's rows, in batches, and completes the request."""
+        handlers = get_handlers()
+        for handler in handlers:
+            handler.batch_size = 1
+        try:
+            report = run_erasure(erasure_request, handlers=handlers)
+        finally:
+            for handler in handlers:
+                del handler.batch_size
+        by_handler = {r['handler']: r for r in report['handlers']}
+        assert by_handler['consent_records']['erased'] == 2
+        assert by_handler['consent_records']['batches'] == 2
+        assert all(r['seconds'] >= 0 for r in report['handlers'])
+        assert list(ConsentRecord.all_objects.filter(hub_id=hub_id).values_list('subject_email', flat=True)) == ['bob@example.com']
+        assert not ConsentEvent.objects.filter(hub_id=hub_id, subject_email='ana@example.com').exists()
+        assert hub_stats(hub_id)['consent_records'] == {'': 1}
+        erasure_request.refresh_from_db()
+        assert erasure_request.status == 'completed'
+        assert erasure_request.completed_at is not None
+
+    def test_erases_subject_archives(self, hub_id, erasure_request, settings, tmp_path, django_capture_on_commit_callbacks):
+        """Test the archive files of the subject's access requests are deleted, the requests kept."""
+        from gdpr.archives import build_subject_archive
+        settings.MEDIA_ROOT = str(tmp_path)
+        access = DataRequest.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='ana@example.com', request_type='access')
+        build_subject_archive(access)
+        name = access.archive.name
+        with django_capture_on_commit_callbacks(execute=True):
+            report = run_erasure(erasure_request)
+        assert {r['handler']: r['erased'] for r in report['handlers']}['subject_archives'] == 1
+        access.refresh_from_db()
+        assert not access.archive and access.archive_report is None
+        assert not access.archive.storage.exists(name)
+
+    def test_failing_handler_keeps_request_open(self, hub_id, erasure_request):
+        """Test a handler error is reported without stopping the others or completing the request."""
+        report = run_erasure(erasure_request, handlers=get_handlers() + [FailingHandler()])
+        assert report['errors'] == 1
+        assert report['handlers'][-1]['error'] == 'RuntimeError: boom'
+        assert not ConsentRecord.all_objects.filter(hub_id=hub_id, subject_email='ana@example.com').exists()
+        erasure_request.refresh_from_db()
+        assert erasure_request.status == 'pending'
+
+    def test_register_requires_name(self):
+        """Test handlers without a name or module are refused."""
+        with pytest.raises(ValueError):
+            register_handler(type('Nameless', (ErasureHandler,), {}))
+
+
+@pytest.mark.django_db
+class TestEraseView:
+    """Erase view tests."""
+
+    def test_erase_queues_for_worker(self, auth_client, hub_id, erasure_request):
+        """Test the view queues the erasure instead of running it; the worker erases and stores the report."""
+        from gdpr.workqueue import work
+        url = reverse('gdpr:data_request_erase', args=[erasure_request.pk])
+        response = auth_client.post(url)
+        assert response.status_code == 200
+        assert reverse('gdpr:data_request_erasure_status', args=[erasure_request.pk]) in response.content.decode()
+        assert ConsentRecord.objects.filter(hub_id=hub_id, subject_email='ana@example.com').count() == 2
+        erasure_request.refresh_from_db()
+        assert (erasure_request.status, erasure_request.erasure_report) == ('pending', {'state': 'queued'})
+        assert work('w1', drain=True) == 1
+        response = auth_client.get(reverse('gdpr:data_request_erasure_status', args=[erasure_request.pk]))
+        assert 'consent_records' in response.content.decode()
+        erasure_request.refresh_from_db()
+        assert erasure_request.status == 'completed'
+
+    def test_refused_while_worker_holds_request(self, auth_client, hub_id, erasure_request):
+        """Test neither a dry run nor a new erasure starts while a worker holds the request."""
+        from gdpr.workqueue import claim
+        claimed = claim('w1')
+        assert claimed.pk == erasure_request.pk
+        url = reverse('gdpr:data_request_erase', args=[erasure_request.pk])
+        for data in ({}, {'dry_run': '1'}):
+            response = auth_client.post(url, data, HTTP_ACCEPT='application/json')
+            assert response.status_code == 409
+        erasure_request.refresh_from_db()
+        assert (erasure_request.status, erasure_request.claimed_by, erasure_request.erasure_report) == ('in_progress', 'w1', None)
+
+    def test_run_does_not_overwrite_concurrent_change(self, hub_id, erasure_request):
+        """Test a run stores nothing when the request changed while it ran."""
+        DataRequest.objects.get(pk=erasure_request.pk).save()
+        run_erasure(erasure_request)
+        current = DataRequest.objects.get(pk=erasure_request.pk)
+        assert (current.status, current.erasure_report) == ('pending', None)
+
+    def test_rejects_other_request_types(self, auth_client, data_request):
+        """Test only erasure requests can be erased."""
+        url = reverse('gdpr:data_request_erase', args=[data_request.pk])
+        assert auth_client.post(url).status_code == 400
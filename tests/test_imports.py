@@ -0,0 +1,122 @@
+"""Tests for gdpr CSV import."""
+import io
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from gdpr.imports import CSVImportError, import_consent_csv
+from gdpr.models import ConsentEvent, ConsentRecord
+
+CSV = '''Subject Name,Subject Email,Purpose,Consented,Consent Date,Withdrawal Date
+Ana,ANA@example.com,marketing,True,2024-01-01T10:00:00+00:00,
+Bob,not-an-email,marketing,True,,
+,cy@example.com,marketing,False,,
+Dee,dee@example.com,analytics,False,2023-05-01 09:00,2024-02-01 09:00
+Ana Again,ana@example.com,marketing,False,2024-01-01T10:00:00+00:00,2024-03-01T10:00:00+00:00
+'''
+
+
+@pytest.mark.django_db
+class TestImportConsentCsv:
+    """CSV import service tests."""
+
+    def test_imports_and_rejects(self, hub_id):
+        """Test valid rows are upserted and invalid rows go to the reject file."""
+        rejects = io.StringIO()
+        progress = []
+        totals = import_consent_csv(io.StringIO(CSV), hub_id, batch_size=2, rejects=rejects, progress=progress.append)
+        assert totals['rows'] == 5
+        assert totals['rejected'] == 2
+        rows = dict(ConsentRecord.objects.filter(hub_id=hub_id).values_list('subject_email', 'consented'))
+        assert rows == {'ana@example.com': False, 'dee@example.com': False}
+        assert ConsentRecord.objects.get(subject_email='ana@example.com').subject_name == 'Ana Again'
+        reject_lines = rejects.getvalue().splitlines()
+        assert reject_lines[0].endswith(',line,error')
+        assert len(reject_lines) == 3
+        assert progress[-1]['imported'] == totals['imported']
+
+    def test_appends_ledger_events(self, hub_id):
+        """Test imported rows leave their grants and withdrawals on the ledger."""
+        import_consent_csv(io.StringIO(CSV), hub_id)
+        events = list(ConsentEvent.objects.filter(hub_id=hub_id, subject_email='dee@example.com').order_by('occurred_at'))
+        assert [(e.action, e.occurred_at.year, e.source) for e in events] == [('grant', 2023, 'import'), ('withdraw', 2024, 'import')]
+
+    def test_keeps_later_state(self, hub_id):
+        """Test an imported row older than the stored dates does not overwrite them."""
+        import_consent_csv(io.StringIO(CSV), hub_id)
+        older = 'subject_name,subject_email,purpose,consented,consent_date\nOld,dee@example.com,analytics,True,2022-01-01 09:00\n'
+        assert import_consent_csv(io.StringIO(older), hub_id)['imported'] == 0
+        record = ConsentRecord.objects.get(hub_id=hub_id, subject_email='dee@example.com')
+        assert not record.consented and record.subject_name == 'Dee'
+        assert ConsentEvent.objects.filter(hub_id=hub_id, subject_email='dee@example.com', occurred_at__year=2022).exists()
+
+    def test_undated_rows_add_no_events(self, hub_id):
+        """Test a row without dates adds no ledger event stamped with the import time."""
+        import_consent_csv(io.StringIO(CSV), hub_id)
+        assert not ConsentEvent.objects.filter(hub_id=hub_id, subject_email='cy@example.com').exists()
+
+    def test_skip_existing(self, hub_id, consent_record):
+        """Test update_existing=False leaves existing rows alone."""
+        data = 'subject_name,subject_email,purpose,consented\nNew,test@example.com,Test Purpose,False\n'
+        import_consent_csv(io.StringIO(data), hub_id, update_existing=False)
+        consent_record.refresh_from_db()
+        assert consent_record.subject_name == 'Test Subject Name'
+        assert not ConsentEvent.objects.filter(hub_id=hub_id, source='import').exists()
+
+    def test_missing_columns(self, hub_id):
+        """Test a file without the key columns is refused."""
+        with pytest.raises(CSVImportError):
+            import_consent_csv(io.StringIO('name,email\nA,a@example.com\n'), hub_id)
+
+    def test_command(self, hub_id, tmp_path):
+        """Test the management command imports a file and writes rejects."""
+        path = tmp_path / 'consents.csv'
+        path.write_text(CSV)
+        rejects = tmp_path / 'rejects.csv'
+        out = io.StringIO()
+        call_command('gdpr_import_consents', str(path), hub_id=str(hub_id), rejects=str(rejects), stdout=out)
+        assert 'Imported 2 of 5 rows' in out.getvalue()
+        assert len(rejects.read_text().splitlines()) == 3
+
+    def test_upload_view(self, auth_client, hub_id, settings, tmp_path):
+        """Test the upload view imports the posted file."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        settings.MEDIA_ROOT = str(tmp_path)
+        url = reverse('gdpr:consent_records_import')
+        upload = SimpleUploadedFile('consents.csv', CSV.encode(), content_type='text/csv')
+        response = auth_client.post(url, {'file': upload, 'update_existing': 'on'})
+        assert response.status_code == 200
+        assert ConsentRecord.objects.filter(hub_id=hub_id).count() == 2
+        assert reverse('gdpr:consent_records_import_rejects', args=['x'])[:-2] in response.content.decode()
+
+    def test_rejects_deleted_after_download(self, auth_client, hub_id, settings, tmp_path):
+        """Test the reject file is served once and then removed from storage."""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from gdpr.imports import rejects_name
+        settings.MEDIA_ROOT = str(tmp_path)
+        name = rejects_name(hub_id, 'abc')
+        default_storage.save(name, ContentFile(b'subject_email,line,error\n'))
+        url = reverse('gdpr:consent_records_import_rejects', args=['abc'])
+        response = auth_client.get(url)
+        assert b''.join(response.streaming_content).startswith(b'subject_email')
+        assert not default_storage.exists(name)
+        assert auth_client.get(url).status_code == 404
+
+    def test_purge_expired_rejects(self, hub_id, settings, tmp_path):
+        """Test gdpr_purge deletes reject files older than the TTL only."""
+        from datetime import timedelta
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.utils import timezone
+        from gdpr.imports import purge_import_rejects, rejects_name
+        settings.MEDIA_ROOT = str(tmp_path)
+        name = rejects_name(hub_id, 'abc')
+        default_storage.save(name, ContentFile(b'x'))
+        assert purge_import_rejects() == 0
+        later = timezone.now() + timedelta(hours=2)
+        assert purge_import_rejects(now=later, dry_run=True) == 1
+        assert default_storage.exists(name)
+        assert purge_import_rejects(now=later) == 1
+        assert not default_storage.exists(name)
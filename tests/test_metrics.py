@@ -0,0 +1,101 @@
+"""Tests for the gdpr view and tool instrumentation."""
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+
+from gdpr.ai_tools import GdprStatistics, ListConsentRecords
+from gdpr.metrics import QUERY_BUDGETS, MetricsRegistry, registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    """Every budgeted view stays within its query budget."""
+
+    @pytest.mark.parametrize('name', [
+        'dashboard', 'consents', 'requests', 'consent_records_list', 'consent_records_scroll', 'consent_records_suggest',
+        'consent_record_add', 'data_requests_list', 'data_requests_scroll', 'data_requests_suggest', 'data_request_add',
+        'settings',
+    ])
+    def test_view_within_budget(self, auth_client, consent_record, data_request, name):
+        """Test a view runs at most its budgeted queries."""
+        response = auth_client.get(reverse(f'gdpr:{name}'))
+        assert response.status_code == 200
+        assert response.wsgi_request.gdpr_metrics['queries'] <= QUERY_BUDGETS[name]
+
+    @pytest.mark.parametrize('name, fixture', [
+        ('consent_record_edit', 'consent_record'),
+        ('data_request_edit', 'data_request'),
+        ('data_request_archive_status', 'data_request'),
+        ('data_request_erasure_status', 'data_request'),
+    ])
+    @pytest.mark.parametrize('kind', ['purge', 'archive'])
+    def test_settings_pending_within_budget(self, auth_client, consent_record, data_request, kind):
+        """Test counting the rows due runs at most its budgeted queries."""
+        response = auth_client.get(reverse('gdpr:settings_pending', args=[kind]))
+        assert response.status_code == 200
+        assert response.wsgi_request.gdpr_metrics['queries'] <= QUERY_BUDGETS['settings_pending']
+
+    def test_detail_view_within_budget(self, auth_client, request, name, fixture):
+        """Test a view of one row runs at most its budgeted queries."""
+        obj = request.getfixturevalue(fixture)
+        response = auth_client.get(reverse(f'gdpr:{name}', args=[obj.pk]))
+        assert response.status_code == 200
+        assert response.wsgi_request.gdpr_metrics['queries'] <= QUERY_BUDGETS[name]
+
+    def test_tools_within_budget(self, hub_id, consent_record, tool_user):
+        """Test the read-only assistant tools run at most their budgeted queries."""
+        tool_request = RequestFactory().get('/')
+        tool_request.session = {'hub_id': str(hub_id)}
+        tool_request.user = tool_user
+        for tool, args in ((ListConsentRecords, {'purpose': 'Test Purpose'}), (GdprStatistics, {'source': 'consent_records'})):
+            tool().execute(args, tool_request)
+            assert tool_request.gdpr_metrics['queries'] <= QUERY_BUDGETS[f'tool:{tool.name}']
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    """Prometheus exposition tests."""
+
+    def test_exposes_instrumented_views_per_hub(self, auth_client, hub_id, settings):
+        """Test a view call shows up as counters and histograms labelled by endpoint and hub."""
+        settings.GDPR_METRICS_TOKEN = 's3cret'
+        auth_client.get(reverse('gdpr:dashboard'))
+        text = auth_client.get(reverse('gdpr:metrics'), HTTP_AUTHORIZATION='Bearer s3cret').content.decode()
+        labels = f'endpoint="dashboard",hub="{hub_id}"'
+        assert f'gdpr_requests_total{{{labels},status="200"}} 1' in text
+        assert f'gdpr_sql_queries_count{{{labels}}} 1' in text
+        assert f'gdpr_request_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+        assert '# TYPE gdpr_response_bytes histogram' in text
+
+    def test_requires_token(self, client, settings):
+        """Test the endpoint is hidden without the configured bearer token, whatever the address."""
+        url = reverse('gdpr:metrics')
+        assert client.get(url, REMOTE_ADDR='127.0.0.1').status_code == 404
+        settings.GDPR_METRICS_TOKEN = 's3cret'
+        assert client.get(url, REMOTE_ADDR='127.0.0.1').status_code == 404
+        assert client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code == 404
+        assert client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code == 200
+
+
+class TestRegistry:
+    """Registry and exposition format tests."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test observations land in the first bucket they fit and buckets accumulate."""
+        metrics = MetricsRegistry()
+        for value in (1, 4, 2000):
+            metrics.observe('gdpr_sql_queries', [('endpoint', 'x')], value)
+        metrics.inc('gdpr_sql_rows_total', [('endpoint', 'x')], 1_500_000)
+        text = metrics.render()
+        assert 'gdpr_sql_queries_bucket{endpoint="x",le="1"} 1' in text
+        assert 'gdpr_sql_queries_bucket{endpoint="x",le="5"} 2' in text
+        assert 'gdpr_sql_queries_bucket{endpoint="x",le="+Inf"} 3' in text
+        assert 'gdpr_sql_queries_sum{endpoint="x"} 2005' in text
+        assert 'gdpr_sql_rows_total{endpoint="x"} 1500000' in text
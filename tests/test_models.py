@@ -1,8 +1,26 @@
 """Tests for gdpr models."""
 import pytest
+from django.db import connection
 from django.utils import timezone
 
-from gdpr.models import ConsentRecord, DataRequest
+from gdpr.models import ConsentEvent, ConsentRecord, DataRequest
+from gdpr.pagination import keyset_order
+from gdpr.views import CONSENT_RECORD_SORT_FIELDS, DATA_REQUEST_SORT_FIELDS
+
+
+def _explain(qs):
+    """Query plan for *qs*; sequential scans are disabled on PostgreSQL so tiny test tables still use indexes."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return qs.explain()
+
+
+def _sort_index(model, field):
+    for index in model._meta.indexes:
+        if index.fields == ['hub_id', field, 'id']:
+            return index.name
+    return None
 
 
 @pytest.mark.django_db
@@ -31,6 +49,35 @@ class TestConsentRecord:
         assert ConsentRecord.objects.filter(hub_id=hub_id).count() == 0
 
 
+@pytest.mark.django_db
+class TestConsentLedger:
+    """ConsentEvent ledger tests."""
+
+    def test_single_saves_append_events(self, hub_id):
+        """Test creating and toggling a record appends one event per change."""
+        record = ConsentRecord.objects.create(
+            hub_id=hub_id, subject_name='A', subject_email='a@example.com', purpose='marketing', consented=True,
+        )
+        record.subject_name = 'Ann'
+        record.save()
+        record = ConsentRecord.objects.get(pk=record.pk)
+        record.consented = False
+        record.save()
+        record.consented = True
+        record.save()
+        actions = list(ConsentEvent.objects.filter(hub_id=hub_id).order_by('created_at').values_list('action', flat=True))
+        assert actions == ['grant', 'withdraw', 'grant']
+        assert ConsentRecord.objects.filter(hub_id=hub_id).count() == 1
+
+    def test_unconsented_create_and_soft_delete_are_not_events(self, hub_id):
+        """Test rows without consent and soft deletes leave the ledger alone."""
+        record = ConsentRecord.objects.create(
+            hub_id=hub_id, subject_name='B', subject_email='b@example.com', purpose='marketing', consented=False,
+        )
+        record.delete()
+        assert not ConsentEvent.objects.filter(hub_id=hub_id).exists()
+
+
 @pytest.mark.django_db
 class TestDataRequest:
     """DataRequest model tests."""
@@ -57,3 +104,32 @@ class TestDataRequest:
         assert DataRequest.objects.filter(hub_id=hub_id).count() == 0
 
 
+
+@pytest.mark.django_db
+class TestListIndexes:
+    """The list, search and sort access paths must stay index-backed."""
+
+    @pytest.mark.parametrize('field', sorted(set(CONSENT_RECORD_SORT_FIELDS.values())))
+    @pytest.mark.parametrize('descending', [False, True])
+    def test_consent_record_sort_uses_index(self, hub_id, field, descending):
+        """Test every ConsentRecord sort column is served by its composite index."""
+        name = _sort_index(ConsentRecord, field)
+        assert name, f'missing (hub_id, {field}, id) index'
+        qs = ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False).order_by(*keyset_order(field, descending))[:12]
+        assert name in _explain(qs)
+
+    @pytest.mark.parametrize('field', sorted(set(DATA_REQUEST_SORT_FIELDS.values()) - {'notes'}))
+    @pytest.mark.parametrize('descending', [False, True])
+    def test_data_request_sort_uses_index(self, hub_id, field, descending):
+        """Test every DataRequest sort column (except free-text notes) is served by its composite index."""
+        name = _sort_index(DataRequest, field)
+        assert name, f'missing (hub_id, {field}, id) index'
+        qs = DataRequest.objects.filter(hub_id=hub_id, is_deleted=False).order_by(*keyset_order(field, descending))[:12]
+        assert name in _explain(qs)
+
+    def test_indexes_are_partial_where_supported(self):
+        """Test the sort indexes only cover live rows."""
+        for model in (ConsentRecord, DataRequest):
+            for index in model._meta.indexes:
+                if index.name.startswith(('gdpr_cr_hub_', 'gdpr_dr_hub_')):
+                    assert index.condition is not None
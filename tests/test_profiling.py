@@ -0,0 +1,62 @@
+"""Tests for on-demand profiling of gdpr views."""
+import json
+
+import pytest
+from django.urls import reverse
+from django.utils.html import escape
+
+from gdpr import profiling
+from gdpr.models import ProfileRun
+
+
+def _profile(client, endpoint, query=''):
+    response = client.post(reverse('gdpr:settings_profile'), {'endpoint': endpoint, 'query': query})
+    assert response.status_code == 204
+    return client.get(response['HX-Redirect'])
+
+
+@pytest.mark.django_db
+class TestProfiling:
+    """Arming, capture and display of profile runs."""
+
+    def test_profiles_the_next_call_only(self, auth_client, consent_record, hub_id):
+        """Test one armed request stores frames and explained statements, without their parameters."""
+        response = _profile(auth_client, 'consent_records_list', 'q=test@example.com')
+        assert response.status_code == 200
+        run = ProfileRun.objects.get(hub_id=hub_id)
+        assert (run.endpoint, run.status_code) == ('consent_records_list', 200)
+        assert run.path.endswith('?q=…')
+        assert 'test@example.com' not in run.path
+        assert run.queries == sum(s['count'] for s in run.statements) > 0
+        assert all(s['plan'] for s in run.statements if s['sql'].startswith('SELECT'))
+        assert 'test@example.com' not in json.dumps(run.statements)
+        assert not any('test@example.com' in s['plan'] for s in run.statements)
+        assert run.frames and run.frames[0]['cumulative_seconds'] >= run.frames[-1]['cumulative_seconds']
+        auth_client.get(reverse('gdpr:consent_records_list'))
+        assert ProfileRun.objects.filter(hub_id=hub_id).count() == 1
+
+    def test_plans_drop_inlined_constants(self):
+        """Test quoted constants in a plan, such as PostgreSQL's inlined parameters, are scrubbed."""
+        plan = "Index Scan  (cost=0.42..8.44 rows=1 width=90)\n  Filter: (subject_email = 'o''brien@example.com'::text)"
+        assert profiling.PLAN_LITERAL.sub("'?'", plan) == "Index Scan  (cost=0.42..8.44 rows=1 width=90)\n  Filter: (subject_email = '?'::text)"
+
+    def test_rejects_unknown_endpoints(self, auth_client):
+        """Test only the profilable GET endpoints can be armed."""
+        response = auth_client.post(reverse('gdpr:settings_profile'), {'endpoint': 'consent_records_bulk_action'})
+        assert response.status_code == 400
+
+    def test_keeps_the_latest_runs(self, auth_client, hub_id, monkeypatch):
+        """Test older runs of the hub are dropped beyond PROFILE_KEEP."""
+        monkeypatch.setattr(profiling, 'PROFILE_KEEP', 2)
+        for _ in range(3):
+            _profile(auth_client, 'dashboard')
+        assert ProfileRun.all_objects.filter(hub_id=hub_id).count() == 2
+
+    def test_settings_lists_and_shows_runs(self, auth_client, hub_id):
+        """Test the settings page lists runs and the detail page shows frames and statements."""
+        _profile(auth_client, 'dashboard')
+        run = ProfileRun.objects.get(hub_id=hub_id)
+        assert run.path in auth_client.get(reverse('gdpr:settings')).content.decode()
+        detail = auth_client.get(reverse('gdpr:settings_profile_detail', args=[run.pk]))
+        assert detail.status_code == 200
+        assert escape(run.statements[0]['sql'][:40]) in detail.content.decode()
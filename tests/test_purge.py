@@ -0,0 +1,79 @@
+"""Tests for the purge of soft-deleted gdpr rows."""
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from gdpr.models import ConsentRecord, DataRequest, GdprSettings
+from gdpr.purge import purge_deleted, purge_hub
+from gdpr.stats import hub_stats
+
+
+@pytest.fixture
+def deleted_rows(hub_id):
+    now = timezone.now()
+    rows = []
+    for days, email in ((200, 'old@example.com'), (100, 'mid@example.com'), (10, 'new@example.com')):
+        rows.append(ConsentRecord.objects.create(
+            hub_id=hub_id, subject_name='S', subject_email=email, purpose='marketing', consented=True,
+            is_deleted=True, deleted_at=now - timedelta(days=days),
+        ))
+    ConsentRecord.objects.create(hub_id=hub_id, subject_name='Live', subject_email='live@example.com', purpose='marketing', consented=True)
+    DataRequest.objects.create(
+        hub_id=hub_id, subject_name='S', subject_email='old@example.com', request_type='access',
+        is_deleted=True, deleted_at=now - timedelta(days=200),
+    )
+    return rows
+
+
+@pytest.mark.django_db
+class TestPurge:
+    """purge_hub() and purge_deleted() tests."""
+
+    def test_purges_rows_past_default_retention(self, hub_id, deleted_rows):
+        """Test rows deleted more than 90 days ago go, newer and live rows stay."""
+        before = hub_stats(hub_id)
+        assert purge_hub(hub_id, batch_size=1) == {'consentrecord': 2, 'datarequest': 1, 'archivedconsentrecord': 0, 'archiveddatarequest': 0}
+        emails = set(ConsentRecord.all_objects.filter(hub_id=hub_id).values_list('subject_email', flat=True))
+        assert emails == {'new@example.com', 'live@example.com'}
+        assert not DataRequest.all_objects.filter(hub_id=hub_id).exists()
+        assert hub_stats(hub_id) == before
+
+    def test_hub_retention_and_dry_run(self, hub_id, deleted_rows):
+        """Test the hub's retention setting is used and a dry run only counts."""
+        GdprSettings.objects.create(hub_id=hub_id, deleted_retention_days=150)
+        assert purge_deleted(dry_run=True)[hub_id] == {'consentrecord': 1, 'datarequest': 1, 'archivedconsentrecord': 0, 'archiveddatarequest': 0}
+        assert ConsentRecord.all_objects.filter(hub_id=hub_id).count() == 4
+        purge_deleted(hub_id)
+        assert ConsentRecord.all_objects.filter(hub_id=hub_id).count() == 3
+
+
+@pytest.mark.django_db
+class TestSettingsView:
+    """Settings page tests."""
+
+    def test_saves_retention(self, auth_client, hub_id):
+        """Test the retention period is stored per hub."""
+        response = auth_client.post(reverse('gdpr:settings'), {'deleted_retention_days': 30})
+        assert response.status_code == 200
+        assert GdprSettings.for_hub(hub_id).deleted_retention_days == 30
+
+    def test_rejects_zero_days(self, auth_client, hub_id):
+        """Test a retention period below one day is refused."""
+        auth_client.post(reverse('gdpr:settings'), {'deleted_retention_days': 0})
+        assert not GdprSettings.objects.filter(hub_id=hub_id).exists()
+
+    def test_pending_counts_on_request(self, auth_client, hub_id):
+        """Test the settings page leaves the due rows uncounted until asked, then counts each kind."""
+        ConsentRecord.all_objects.create(
+            hub_id=hub_id, subject_name='Old', subject_email='old@example.com', purpose='marketing',
+            is_deleted=True, deleted_at=timezone.now() - timedelta(days=400),
+        )
+        response = auth_client.get(reverse('gdpr:settings'))
+        assert 'Due for purging' not in response.content.decode()
+        response = auth_client.get(reverse('gdpr:settings_pending', args=['purge']))
+        assert 'Due for purging: 1 consent record(s)' in response.content.decode()
+        response = auth_client.get(reverse('gdpr:settings_pending', args=['archive']))
+        assert 'Due for archiving' in response.content.decode()
+        assert auth_client.get(reverse('gdpr:settings_pending', args=['other'])).status_code == 404
@@ -0,0 +1,101 @@
+"""Tests for gdpr search."""
+import pytest
+from django.urls import reverse
+
+from gdpr.models import ConsentRecord, DataRequest
+from gdpr.search import search, suggest
+
+
+@pytest.fixture
+def people(hub_id):
+    for name, email, purpose in [
+        ('José Núñez', 'jose@example.com', 'marketing'),
+        ('Ana López', 'ana@example.com', 'analytics'),
+        ('Bob Stone', 'bob@shop.test', 'marketing'),
+    ]:
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name=name, subject_email=email, purpose=purpose, consented=True)
+    return ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False)
+
+
+def _names(qs):
+    return sorted(qs.values_list('subject_name', flat=True))
+
+
+@pytest.mark.django_db
+class TestSearch:
+    """search() tests."""
+
+    def test_case_and_accent_insensitive(self, people):
+        """Test matches ignore case and accents, across all searchable columns."""
+        assert _names(search(people, 'NUNEZ')) == ['José Núñez']
+        assert _names(search(people, 'market')) == ['Bob Stone', 'José Núñez']
+        assert _names(search(people, 'shop.te')) == ['Bob Stone']
+        assert _names(search(people, 'nobody')) == []
+
+    def test_short_queries(self, people):
+        """Test queries shorter than a trigram still match."""
+        assert _names(search(people, 'ló')) == ['Ana López']
+        assert search(people, '  ').count() == 3
+
+    def test_follows_updates_and_deletes(self, hub_id, people):
+        """Test the index follows edits, including partial saves, and deletes."""
+        bob = people.get(subject_name='Bob Stone')
+        bob.subject_name = 'Robert Stone'
+        bob.save(update_fields=['subject_name', 'updated_at'])
+        assert _names(search(people, 'robert')) == ['Robert Stone']
+        assert _names(search(people, 'bob st')) == []
+        ConsentRecord.all_objects.filter(pk=bob.pk).delete()
+        assert _names(search(people, 'stone')) == []
+
+    def test_data_requests(self, hub_id):
+        """Test data requests are searchable by type and status."""
+        DataRequest.objects.create(hub_id=hub_id, subject_name='Eve', subject_email='eve@example.com', request_type='erasure', status='in_progress')
+        qs = DataRequest.objects.filter(hub_id=hub_id)
+        assert search(qs, 'progress').count() == 1
+        assert search(qs, 'erasure').count() == 1
+
+    def test_suggest_limit(self, people):
+        """Test suggest returns at most limit projected rows."""
+        rows = suggest(people, 'example', limit=1)
+        assert len(rows) == 1
+        assert set(rows[0]) == {'id', 'subject_name', 'subject_email', 'purpose', 'consented'}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSqliteIndex:
+    """SQLite FTS index maintenance tests."""
+
+    def test_index_survives_lost_triggers(self, people):
+        """Test a migration that dropped the triggers is repaired after migrate, rows written since included."""
+        from django.db import connection
+
+        from gdpr.search import SEARCH_MODELS, _has_fts, ensure_search_indexes
+        fts_table, _columns = SEARCH_MODELS[ConsentRecord]
+        if connection.vendor != 'sqlite' or not _has_fts(connection.alias, fts_table):
+            pytest.skip('SQLite FTS5 trigram index only')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {fts_table}_ai')
+        hub_id = people.first().hub_id
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name='Eve Moss', subject_email='eve@example.com', purpose='marketing')
+        ensure_search_indexes(connection.alias)
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name='Max Moss', subject_email='max@example.com', purpose='marketing')
+        assert _names(search(people, 'moss')) == ['Eve Moss', 'Max Moss']
+        people.filter(subject_name='Eve Moss').delete()
+        assert _names(search(people, 'moss')) == ['Max Moss']
+
+
+@pytest.mark.django_db
+class TestSuggestView:
+    """Search-as-you-type endpoint tests."""
+
+    def test_suggest(self, auth_client, hub_id, people):
+        """Test the endpoint returns the matching rows of the session hub."""
+        response = auth_client.get(reverse('gdpr:consent_records_suggest'), {'q': 'jose'})
+        assert response.status_code == 200
+        assert [r['subject_email'] for r in response.json()['results']] == ['jose@example.com']
+
+    def test_suggest_bad_limit(self, auth_client, people):
+        """Test a malformed limit falls back to the default."""
+        response = auth_client.get(reverse('gdpr:data_requests_suggest'), {'q': 'x', 'limit': 'many'})
+        assert response.status_code == 200
+        assert response.json() == {'results': []}
@@ -0,0 +1,292 @@
+"""Tests for gdpr services."""
+import pytest
+
+from gdpr.models import ConsentEvent, ConsentRecord
+from gdpr.services import filter_consenting_emails, has_consent
+
+
+@pytest.fixture
+def consents(hub_id):
+    for email, purpose, consented in [
+        ('ana@example.com', 'marketing', True),
+        ('bob@example.com', 'marketing', False),
+        ('cy@example.com', 'analytics', True),
+        ('dee@example.com', 'marketing', True),
+    ]:
+        ConsentRecord.objects.create(hub_id=hub_id, subject_name=email, subject_email=email, purpose=purpose, consented=consented)
+    dee = ConsentRecord.objects.get(subject_email='dee@example.com')
+    dee.is_deleted = True
+    dee.save()
+
+
+@pytest.mark.django_db
+class TestConsentCheck:
+    """Batch and single consent check tests."""
+
+    def test_filter_consenting_emails(self, hub_id, consents):
+        """Test only live, consented subjects for the purpose are returned."""
+        emails = ['ana@example.com', 'bob@example.com', 'cy@example.com', 'dee@example.com', 'nobody@example.com']
+        assert set(filter_consenting_emails(hub_id, emails, 'marketing')) == {'ana@example.com'}
+
+    def test_filter_consenting_emails_batches(self, hub_id, consents, django_assert_num_queries):
+        """Test each batch costs one query and input is normalized."""
+        emails = iter([' ANA@example.com', 'x@example.com', 'y@example.com', 'z@example.com', ''])
+        with django_assert_num_queries(2):
+            assert list(filter_consenting_emails(hub_id, emails, 'marketing', batch_size=2)) == ['ana@example.com']
+
+    def test_filter_consenting_emails_other_hub(self, consents):
+        """Test the check is scoped to the hub."""
+        import uuid
+        assert list(filter_consenting_emails(uuid.uuid4(), ['ana@example.com'], 'marketing')) == []
+
+    def test_has_consent(self, hub_id, consents):
+        """Test the single-subject check."""
+        assert has_consent(hub_id, 'Ana@Example.com', 'marketing')
+        assert not has_consent(hub_id, 'bob@example.com', 'marketing')
+
+    def test_email_normalized_on_save(self, hub_id):
+        """Test subject emails are stored normalized."""
+        record = ConsentRecord.objects.create(hub_id=hub_id, subject_name='X', subject_email=' X@Example.COM ', purpose='p')
+        assert record.subject_email == 'x@example.com'
+
+
+@pytest.fixture
+def fresh_cache():
+    from gdpr.cache import consent_cache
+    consent_cache.clear_local()
+    consent_cache.reset_stats()
+    return consent_cache
+
+
+@pytest.mark.django_db
+class TestConsentCache:
+    """Consent-state cache tests."""
+
+    def test_second_lookup_is_a_hit(self, hub_id, consents, fresh_cache, django_assert_num_queries):
+        """Test repeated lookups are served without a query."""
+        assert has_consent(hub_id, 'ana@example.com', 'marketing')
+        with django_assert_num_queries(0):
+            assert has_consent(hub_id, 'ANA@example.com', 'marketing')
+        stats = fresh_cache.stats()
+        assert stats['misses'] == 1
+        assert stats['local_hits'] == 1
+
+    def test_negative_answers_are_cached(self, hub_id, consents, fresh_cache, django_assert_num_queries):
+        """Test a missing consent is cached too."""
+        assert not has_consent(hub_id, 'nobody@example.com', 'marketing')
+        with django_assert_num_queries(0):
+            assert not has_consent(hub_id, 'nobody@example.com', 'marketing')
+
+    def test_save_invalidates(self, hub_id, consents, fresh_cache):
+        """Test post_save invalidates the cached state."""
+        assert has_consent(hub_id, 'ana@example.com', 'marketing')
+        record = ConsentRecord.objects.get(hub_id=hub_id, subject_email='ana@example.com')
+        record.consented = False
+        record.save()
+        assert not has_consent(hub_id, 'ana@example.com', 'marketing')
+
+    def test_save_invalidates_previous_key(self, hub_id, consents, fresh_cache):
+        """Test changing the purpose invalidates the old (email, purpose) entry."""
+        assert has_consent(hub_id, 'ana@example.com', 'marketing')
+        record = ConsentRecord.objects.get(hub_id=hub_id, subject_email='ana@example.com')
+        record.purpose = 'newsletter'
+        record.save()
+        assert not has_consent(hub_id, 'ana@example.com', 'marketing')
+
+    def test_invalidated_again_on_commit(self, hub_id, consents, fresh_cache, django_capture_on_commit_callbacks):
+        """Test a stale answer cached while the write was uncommitted is dropped on commit."""
+        record = ConsentRecord.objects.get(hub_id=hub_id, subject_email='ana@example.com')
+        with django_capture_on_commit_callbacks(execute=True):
+            record.consented = False
+            record.save()
+            # A concurrent reader still sees the committed row and caches it.
+            fresh_cache.get(hub_id, 'ana@example.com', 'marketing', lambda: True)
+        assert not has_consent(hub_id, 'ana@example.com', 'marketing')
+
+    def test_bulk_delete_invalidates(self, auth_client, hub_id, consents, fresh_cache):
+        """Test the queryset.update() bulk delete path invalidates too."""
+        from django.urls import reverse
+        assert has_consent(hub_id, 'ana@example.com', 'marketing')
+        record = ConsentRecord.objects.get(hub_id=hub_id, subject_email='ana@example.com')
+        auth_client.post(reverse('gdpr:consent_records_bulk_action'), {'ids': str(record.pk), 'action': 'delete'})
+        assert not has_consent(hub_id, 'ana@example.com', 'marketing')
+
+
+@pytest.mark.django_db
+class TestConsentIngestBuffer:
+    """Buffered consent ingestion tests."""
+
+    def _event(self, email, consented, minute=0):
+        from datetime import datetime, timezone as dt_timezone
+        return {
+            'subject_email': email, 'purpose': 'cookies', 'consented': consented, 'subject_name': '',
+            'timestamp': datetime(2026, 1, 1, 10, minute, tzinfo=dt_timezone.utc),
+        }
+
+    def test_coalesces_and_flushes(self, hub_id):
+        """Test repeated events collapse to the latest state while the ledger keeps them all."""
+        from gdpr.ingest import ConsentIngestBuffer
+        buffer = ConsentIngestBuffer(flush_size=100, flush_interval=0)
+        buffer.add(hub_id, [self._event('a@example.com', True, 1), self._event('a@example.com', False, 5)])
+        buffer.add(hub_id, [self._event('a@example.com', True, 3), self._event('b@example.com', True)])
+        assert len(buffer) == 4
+        assert buffer.flush() == 2
+        assert dict(ConsentRecord.objects.filter(hub_id=hub_id).values_list('subject_email', 'consented')) == {
+            'a@example.com': False, 'b@example.com': True,
+        }
+        assert ConsentEvent.objects.filter(hub_id=hub_id, subject_email='a@example.com').count() == 3
+
+    def test_flushes_when_full(self, hub_id):
+        """Test the buffer writes inline once it reaches flush_size."""
+        from gdpr.ingest import ConsentIngestBuffer
+        buffer = ConsentIngestBuffer(flush_size=2, flush_interval=0)
+        buffer.add(hub_id, [self._event('a@example.com', True), self._event('b@example.com', True)])
+        assert len(buffer) == 0
+        assert ConsentRecord.objects.filter(hub_id=hub_id).count() == 2
+
+    def test_late_event_does_not_roll_back(self, hub_id):
+        """Test an event older than the stored state reaches the ledger only."""
+        from gdpr.ledger import record_consent_events
+        record_consent_events(hub_id, [self._event('a@example.com', False, 5)])
+        assert record_consent_events(hub_id, [self._event('a@example.com', True, 1)]) == 0
+        assert not ConsentRecord.objects.get(hub_id=hub_id, subject_email='a@example.com').consented
+        assert ConsentEvent.objects.filter(hub_id=hub_id, subject_email='a@example.com').count() == 2
+
+    def test_ledger_written_before_flush(self, hub_id):
+        """Test accepted events reach the ledger before the current state is flushed."""
+        from gdpr.ingest import ConsentIngestBuffer
+        buffer = ConsentIngestBuffer(flush_size=100, flush_interval=0)
+        buffer.add(hub_id, [self._event('a@example.com', True)])
+        assert ConsentEvent.objects.filter(hub_id=hub_id, source='api').count() == 1
+        assert not ConsentRecord.objects.filter(hub_id=hub_id).exists()
+
+    def test_failed_hub_is_requeued(self, hub_id, monkeypatch):
+        """Test a failing hub keeps its events queued and does not hold back other hubs."""
+        import uuid
+        from gdpr import ingest
+        other_hub = uuid.uuid4()
+        buffer = ingest.ConsentIngestBuffer(flush_size=100, flush_interval=0)
+        buffer.add(hub_id, [self._event('a@example.com', True)])
+        buffer.add(other_hub, [self._event('b@example.com', True)])
+        upsert = ingest.upsert_consent_state
+
+        def failing(hub, events):
+            if hub == hub_id:
+                raise RuntimeError('boom')
+            return upsert(hub, events)
+
+        monkeypatch.setattr(ingest, 'upsert_consent_state', failing)
+        assert buffer.flush() == 1
+        assert ConsentRecord.objects.filter(hub_id=other_hub).count() == 1
+        assert len(buffer) == 1
+        monkeypatch.setattr(ingest, 'upsert_consent_state', upsert)
+        assert buffer.flush() == 1
+        assert ConsentRecord.objects.filter(hub_id=hub_id, subject_email='a@example.com', consented=True).exists()
+
+    def test_poison_events_are_dropped(self, hub_id, monkeypatch):
+        """Test a hub failing max_attempts flushes is applied event by event and the failing events dropped."""
+        from gdpr import ingest
+        buffer = ingest.ConsentIngestBuffer(flush_size=100, flush_interval=0, max_attempts=2)
+        buffer.add(hub_id, [self._event('a@example.com', True), self._event('poison@example.com', True)])
+        upsert = ingest.upsert_consent_state
+
+        def failing(hub, events):
+            if any(e['subject_email'] == 'poison@example.com' for e in events):
+                raise RuntimeError('boom')
+            return upsert(hub, events)
+
+        monkeypatch.setattr(ingest, 'upsert_consent_state', failing)
+        assert buffer.flush() == 0
+        assert buffer.flush() == 0
+        assert len(buffer) == 2
+        assert buffer.flush() == 1
+        assert len(buffer) == 0
+        assert list(ConsentRecord.objects.filter(hub_id=hub_id).values_list('subject_email', flat=True)) == ['a@example.com']
+
+    def test_replay_applies_events_lost_before_flush(self, hub_id):
+        """Test events that reached the ledger but not the state (a process died) are replayed once."""
+        from gdpr.ingest import ConsentIngestBuffer
+        from gdpr.ledger import record_consent_events, replay_consent_events
+        record_consent_events(hub_id, [self._event('a@example.com', True, 1), self._event('b@example.com', True, 1)])
+        buffer = ConsentIngestBuffer(flush_size=100, flush_interval=0)
+        buffer.add(hub_id, [self._event('a@example.com', False, 5), self._event('c@example.com', True, 5)])
+        # The buffer is lost without flushing.
+        assert replay_consent_events(hub_id) == 2
+        assert dict(ConsentRecord.objects.filter(hub_id=hub_id).values_list('subject_email', 'consented')) == {
+            'a@example.com': False, 'b@example.com': True, 'c@example.com': True,
+        }
+        assert replay_consent_events(hub_id) == 0
+
+    def test_replay_keeps_later_manual_changes(self, hub_id):
+        """Test replay does not undo a change saved after the event was applied."""
+        from gdpr.ledger import record_consent_events, replay_consent_events
+        record_consent_events(hub_id, [self._event('a@example.com', True, 1)])
+        record = ConsentRecord.objects.get(hub_id=hub_id, subject_email='a@example.com')
+        record.consent_date = record.withdrawal_date = None
+        record.consented = False
+        record.save()
+        assert replay_consent_events(hub_id) == 0
+        assert not ConsentRecord.objects.get(pk=record.pk).consented
+
+    def test_upsert_revives_deleted_and_invalidates_cache(self, hub_id, consents, fresh_cache):
+        """Test an event for a soft-deleted subject revives the row and refreshes has_consent."""
+        from gdpr.ledger import record_consent_events
+        assert not has_consent(hub_id, 'dee@example.com', 'marketing')
+        event = dict(self._event('dee@example.com', True), purpose='marketing')
+        record_consent_events(hub_id, [event])
+        assert has_consent(hub_id, 'dee@example.com', 'marketing')
+        assert ConsentRecord.all_objects.filter(hub_id=hub_id, subject_email='dee@example.com').count() == 1
+
+
+@pytest.mark.django_db
+class TestHubStats:
+    """Incrementally maintained dashboard statistics tests."""
+
+    def _assert_in_sync(self, hub_id):
+        from gdpr.stats import compute_stats, hub_stats
+        stored = {(metric, key): count for metric, keys in hub_stats(hub_id).items() for key, count in keys.items() if count}
+        assert stored == {key: count for key, count in compute_stats(hub_id)[hub_id].items() if count}
+
+    def test_single_row_changes(self, hub_id, consents):
+        """Test create, edit, soft delete and revive move the counters."""
+        from gdpr.stats import hub_stats
+        self._assert_in_sync(hub_id)
+        record = ConsentRecord.objects.get(hub_id=hub_id, subject_email='bob@example.com')
+        record.consented = True
+        record.purpose = 'newsletter'
+        record.save()
+        self._assert_in_sync(hub_id)
+        record.is_deleted = True
+        record.save(update_fields=['is_deleted'])
+        self._assert_in_sync(hub_id)
+        assert hub_stats(hub_id)['consent_records'][''] == 2
+        dee = ConsentRecord.all_objects.get(hub_id=hub_id, subject_email='dee@example.com')
+        dee.is_deleted = False
+        dee.save()
+        self._assert_in_sync(hub_id)
+
+    def test_bulk_paths(self, hub_id, consents, data_request):
+        """Test upserts and queryset updates keep the counters in step."""
+        from datetime import datetime, timezone as dt_timezone
+        from gdpr.ledger import record_consent_events
+        from gdpr.stats import apply_queryset
+        event = {
+            'subject_email': 'bob@example.com', 'purpose': 'marketing', 'consented': True, 'subject_name': '',
+            'timestamp': datetime(2026, 1, 1, tzinfo=dt_timezone.utc),
+        }
+        record_consent_events(hub_id, [event, dict(event, subject_email='dee@example.com'), dict(event, subject_email='eve@example.com')])
+        self._assert_in_sync(hub_id)
+        qs = ConsentRecord.objects.filter(hub_id=hub_id, purpose='marketing')
+        apply_queryset(qs)
+        qs.update(is_deleted=True)
+        self._assert_in_sync(hub_id)
+
+    def test_reconcile_repairs_drift(self, hub_id, consents):
+        """Test the reconcile command rebuilds counters after writes that bypass them."""
+        import io
+        from django.core.management import call_command
+        ConsentRecord.objects.filter(hub_id=hub_id).update(consented=False)
+        out = io.StringIO()
+        call_command('gdpr_reconcile_stats', hub_id=str(hub_id), stdout=out)
+        assert '2 counter(s) corrected' in out.getvalue()
+        self._assert_in_sync(hub_id)
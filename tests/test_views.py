@@ -1,7 +1,26 @@
 """Tests for gdpr views."""
+import re
+
 import pytest
 from django.urls import reverse
 
+from gdpr.models import ConsentRecord, DataRequest
+
+
+def _scroll_all(client, url, params):
+    """Follow infinite-scroll cursors until exhausted, returning the row ids."""
+    ids = []
+    cursor = None
+    while True:
+        response = client.get(url, {**params, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        html = response.content.decode()
+        ids += re.findall(r'data-id="([0-9a-f-]+)"', html)
+        match = re.search(r'cursor=([\w%-]+)"', html)
+        if not match:
+            return ids
+        cursor = match.group(1).replace('%3D', '=')
+
 
 @pytest.mark.django_db
 class TestDashboard:
@@ -19,6 +38,14 @@ class TestDashboard:
         response = auth_client.get(url, HTTP_HX_REQUEST='true')
         assert response.status_code == 200
 
+    def test_dashboard_breakdowns(self, auth_client, hub_id, consent_record, data_request):
+        """Test dashboard renders the per-hub statistics."""
+        response = auth_client.get(reverse('gdpr:dashboard'), HTTP_HX_REQUEST='true')
+        assert response.context['consented_count'] == 1
+        assert response.context['consents_by_purpose'] == [('Test Purpose', 1)]
+        assert response.context['requests_by_type'] == [(data_request.request_type, 1)]
+        assert b'Test Purpose' in response.content
+
     def test_dashboard_requires_auth(self, client):
         """Test dashboard requires authentication."""
         url = reverse('gdpr:dashboard')
@@ -61,6 +88,24 @@ class TestConsentRecordViews:
         assert response.status_code == 200
         assert 'text/csv' in response['Content-Type']
 
+    def test_export_csv_streams_rows(self, auth_client, consent_record):
+        """Test the CSV export is streamed and contains the rows."""
+        url = reverse('gdpr:consent_records_list')
+        response = auth_client.get(url, {'export': 'csv'})
+        assert response.streaming
+        body = b''.join(response.streaming_content).decode()
+        assert body.splitlines()[0] == 'Consented,Subject Name,Subject Email,Purpose,Consent Date,Withdrawal Date'
+        assert 'test@example.com' in body
+
+    def test_export_csv_gzip(self, auth_client, consent_record):
+        """Test the optional gzip transfer."""
+        import gzip
+        url = reverse('gdpr:consent_records_list')
+        response = auth_client.get(url, {'export': 'csv', 'gzip': '1'}, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        assert 'test@example.com' in body
+
     def test_export_excel(self, auth_client):
         """Test Excel export."""
         url = reverse('gdpr:consent_records_list')
@@ -121,6 +166,187 @@ class TestConsentRecordViews:
         consent_record.refresh_from_db()
         assert consent_record.is_deleted is True
 
+    def test_bulk_withdraw_json_ids(self, auth_client, hub_id, consent_record):
+        """Test withdraw with a JSON id list returns the changed row count and records the event."""
+        import json
+        from gdpr.models import ConsentEvent
+        url = reverse('gdpr:consent_records_bulk_action')
+        body = json.dumps({'action': 'withdraw', 'ids': [str(consent_record.pk)]})
+        response = auth_client.post(url, body, content_type='application/json')
+        assert response.json() == {'count': 1}
+        consent_record.refresh_from_db()
+        assert consent_record.consented is False
+        assert ConsentEvent.objects.filter(hub_id=hub_id, action='withdraw', source='bulk').count() == 1
+        # Already withdrawn: nothing left to change.
+        assert auth_client.post(url, body, content_type='application/json').json() == {'count': 0}
+
+    def test_bulk_restore_all_matching(self, auth_client, hub_id):
+        """Test select_all restores every row matching the search, in chunks."""
+        import json
+        from gdpr.bulk import bulk_consent_action
+        from gdpr.stats import hub_stats
+        for i in range(7):
+            ConsentRecord.objects.create(hub_id=hub_id, subject_name=f'S{i}', subject_email=f's{i}@example.com', purpose='newsletter' if i < 5 else 'ads')
+        qs = ConsentRecord.objects.filter(hub_id=hub_id, purpose='newsletter')
+        assert bulk_consent_action(qs, 'restore', chunk_size=2) == 5
+        assert ConsentRecord.objects.filter(hub_id=hub_id, consented=True).count() == 5
+        assert hub_stats(hub_id)['consent_status'] == {'consented': 5, 'withdrawn': 2}
+        url = reverse('gdpr:consent_records_bulk_action')
+        response = auth_client.post(url, {'action': 'withdraw', 'select_all': '1', 'q': 'newsletter'})
+        assert response.status_code == 200
+        assert json.loads(response['HX-Trigger']) == {'gdpr:bulk-action': {'count': 5}, 'gdpr-total': {'value': 7}}
+
+    def test_bulk_skips_rows_changed_after_chunking(self, hub_id, monkeypatch):
+        """Test a row that stops matching between reading a chunk and its transaction is left alone."""
+        from gdpr import bulk
+        from gdpr.models import ConsentEvent
+        record = ConsentRecord.objects.create(hub_id=hub_id, subject_name='S', subject_email='s@example.com', purpose='ads', consented=True)
+        chunks = bulk.iter_id_chunks
+
+        def racing(qs, ids=None, chunk_size=bulk.BULK_CHUNK_SIZE):
+            for chunk in chunks(qs, ids, chunk_size):
+                ConsentRecord.objects.filter(pk=record.pk).update(consented=False)
+                yield chunk
+
+        monkeypatch.setattr(bulk, 'iter_id_chunks', racing)
+        assert bulk.bulk_consent_action(ConsentRecord.objects.filter(hub_id=hub_id), 'withdraw') == 0
+        assert not ConsentEvent.objects.filter(hub_id=hub_id, source='bulk').exists()
+
+    def test_edit_from_list_swaps_one_row(self, auth_client, consent_record):
+        """Test an edit sent from the list returns only the changed row, out of band, and the new total."""
+        import json
+        url = reverse('gdpr:consent_record_edit', args=[consent_record.pk])
+        data = {'subject_name': 'Renamed', 'subject_email': 'test@example.com', 'purpose': 'Test Purpose', 'consented': 'on'}
+        response = auth_client.post(url, data, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        html = response.content.decode()
+        assert response['HX-Reswap'] == 'none'
+        assert json.loads(response['HX-Trigger']) == {'gdpr-total': {'value': 1}}
+        assert f'id="consent-record-{consent_record.pk}"' in html
+        assert 'hx-swap-oob="true"' in html
+        assert html.count('<tr') == 1
+
+    def test_edit_query_count_is_constant(self, auth_client, hub_id, consent_record):
+        """Test a row edit costs the same number of queries however many records the hub holds."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('gdpr:consent_record_edit', args=[consent_record.pk])
+
+        def edit_queries(consented):
+            data = {'subject_name': 'Renamed', 'subject_email': 'test@example.com', 'purpose': 'Test Purpose', 'consented': consented}
+            with CaptureQueriesContext(connection) as queries:
+                response = auth_client.post(url, data, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+            assert response.status_code == 200
+            assert not any('COUNT(' in q['sql'].upper() for q in queries.captured_queries)
+            return len(queries)
+
+        small = edit_queries('')
+        ConsentRecord.objects.bulk_create([
+            ConsentRecord(hub_id=hub_id, subject_name=f'S{i}', subject_email=f's{i}@example.com', purpose='newsletter')
+            for i in range(200)
+        ])
+        assert edit_queries('on') == small
+
+    def test_delete_removes_row_out_of_band(self, auth_client, consent_record):
+        """Test a row delete returns an out-of-band removal of that row only."""
+        import json
+        url = reverse('gdpr:consent_record_delete', args=[consent_record.pk])
+        response = auth_client.post(url, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        assert f'<tr id="consent-record-{consent_record.pk}" hx-swap-oob="delete">' in response.content.decode()
+        assert json.loads(response['HX-Trigger']) == {'gdpr-total': {'value': 0}}
+
+    def test_bulk_rejects_bad_input(self, auth_client):
+        """Test malformed ids and unknown actions are refused."""
+        url = reverse('gdpr:consent_records_bulk_action')
+        assert auth_client.post(url, {'ids': 'nope', 'action': 'delete'}).status_code == 400
+        assert auth_client.post(url, {'ids': '[]', 'action': 'explode'}).status_code == 400
+
+    def test_list_all_is_infinite_scroll(self, auth_client, hub_id):
+        """Test per_page=0 renders the first keyset chunk without paginating."""
+        ConsentRecord.objects.bulk_create([
+            ConsentRecord(hub_id=hub_id, subject_name=f'S{i}', subject_email=f's{i}@example.com', purpose='marketing')
+            for i in range(60)
+        ])
+        url = reverse('gdpr:consent_records_list')
+        response = auth_client.get(url, {'per_page': 0}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        assert response.status_code == 200
+        assert response.content.decode().count('data-id=') == 50
+        assert reverse('gdpr:consent_records_scroll') in response.content.decode()
+
+    @pytest.mark.parametrize('sort', ['consented', 'subject_name', 'consent_date', 'withdrawal_date', 'created_at'])
+    @pytest.mark.parametrize('direction', ['asc', 'desc'])
+    def test_scroll_visits_every_row_once(self, auth_client, hub_id, sort, direction):
+        """Test chained cursors return each row exactly once, NULLs included."""
+        from django.utils import timezone
+        now = timezone.now()
+        ConsentRecord.objects.bulk_create([
+            ConsentRecord(
+                hub_id=hub_id, subject_name=f'S{i % 7}', subject_email=f's{i}@example.com', purpose='marketing',
+                consented=bool(i % 2), consent_date=now if i % 3 else None,
+            )
+            for i in range(130)
+        ])
+        ids = _scroll_all(auth_client, reverse('gdpr:consent_records_scroll'), {'sort': sort, 'dir': direction})
+        assert len(ids) == 130
+        assert len(set(ids)) == 130
+
+    def test_scroll_invalid_cursor(self, auth_client):
+        """Test a malformed cursor is rejected."""
+        url = reverse('gdpr:consent_records_scroll')
+        response = auth_client.get(url, {'cursor': 'not-a-cursor'})
+        assert response.status_code == 400
+
+    def test_add_existing_subject_updates(self, auth_client, consent_record):
+        """Test adding an existing (subject, purpose) updates the row instead of duplicating it."""
+        url = reverse('gdpr:consent_record_add')
+        data = {'subject_name': 'Renamed', 'subject_email': 'TEST@example.com', 'purpose': 'Test Purpose'}
+        auth_client.post(url, data)
+        consent_record.refresh_from_db()
+        assert consent_record.subject_name == 'Renamed'
+        assert consent_record.consented is False
+        assert ConsentRecord.all_objects.filter(hub_id=consent_record.hub_id).count() == 1
+
+    def test_ingest_sync_upserts(self, client, hub_id, settings):
+        """Test batched ingestion upserts one row per (subject, purpose) of the token's hub."""
+        settings.GDPR_CONSENT_INGEST_TOKENS = {str(hub_id): 'banner-token'}
+        url = reverse('gdpr:consent_records_ingest') + '?sync=1'
+        auth = {'HTTP_AUTHORIZATION': 'Bearer banner-token'}
+        events = [
+            {'subject_email': 'a@example.com', 'purpose': 'cookies', 'consented': True, 'timestamp': '2026-01-01T10:00:00Z'},
+            {'subject_email': 'A@example.com', 'purpose': 'cookies', 'consented': False, 'timestamp': '2026-01-01T10:05:00Z'},
+            {'subject_email': 'b@example.com', 'purpose': 'cookies', 'consented': True},
+            {'subject_email': 'not-an-email', 'purpose': 'cookies', 'consented': True},
+        ]
+        response = client.post(url, {'events': events}, content_type='application/json', **auth)
+        assert response.status_code == 200
+        assert response.json()['accepted'] == 3
+        assert [r['index'] for r in response.json()['rejected']] == [3]
+        response = client.post(url, events[2], content_type='application/json', **auth)
+        assert response.status_code == 200
+        rows = ConsentRecord.objects.filter(hub_id=hub_id).order_by('subject_email')
+        assert [(r.subject_email, r.consented) for r in rows] == [('a@example.com', False), ('b@example.com', True)]
+        assert rows[0].consent_date is None and rows[0].withdrawal_date is not None
+
+    def test_ingest_requires_token(self, auth_client, hub_id, settings):
+        """Test ingestion ignores the session and needs a hub's ingest token, without a CSRF token."""
+        from django.test import Client
+        url = reverse('gdpr:consent_records_ingest') + '?sync=1'
+        event = {'subject_email': 'a@example.com', 'purpose': 'cookies', 'consented': True}
+        assert auth_client.post(url, event, content_type='application/json').status_code == 401
+        settings.GDPR_CONSENT_INGEST_TOKENS = {str(hub_id): 'banner-token'}
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(url, event, content_type='application/json', HTTP_AUTHORIZATION='Bearer wrong')
+        assert response.status_code == 401
+        response = client.post(url, event, content_type='application/json', HTTP_AUTHORIZATION='Bearer banner-token')
+        assert response.status_code == 200
+        assert ConsentRecord.objects.filter(hub_id=hub_id, subject_email='a@example.com').exists()
+
+    def test_ingest_invalid_json(self, client, hub_id, settings):
+        """Test a malformed body is rejected."""
+        settings.GDPR_CONSENT_INGEST_TOKENS = {str(hub_id): 'banner-token'}
+        url = reverse('gdpr:consent_records_ingest')
+        response = client.post(url, 'nope', content_type='application/json', HTTP_AUTHORIZATION='Bearer banner-token')
+        assert response.status_code == 400
+
     def test_list_requires_auth(self, client):
         """Test list requires authentication."""
         url = reverse('gdpr:consent_records_list')
@@ -207,6 +433,35 @@ class TestDataRequestViews:
         response = auth_client.post(url, data)
         assert response.status_code == 200
 
+    def test_edit_with_stale_version_is_refused(self, auth_client, data_request):
+        """Test an edit based on an outdated form does not overwrite a newer write."""
+        url = reverse('gdpr:data_request_edit', args=[data_request.pk])
+        stale = data_request.version
+        data_request.status = 'in_progress'
+        data_request.save()
+        data = {'subject_name': 'X', 'subject_email': 'test@example.com', 'request_type': 'access', 'status': 'pending', 'version': stale}
+        response = auth_client.post(url, data)
+        assert 'changed by someone else' in response.content.decode()
+        data_request.refresh_from_db()
+        assert data_request.status == 'in_progress'
+
+    def test_edit_losing_race_is_refused(self, auth_client, data_request, monkeypatch):
+        """Test a write landing between the version check and the update is not overwritten."""
+        from gdpr import views
+        update = views.update_if_current
+
+        def racing(obj, **changes):
+            DataRequest.objects.filter(pk=obj.pk).update(status='in_progress', version=obj.version + 1)
+            return update(obj, **changes)
+
+        monkeypatch.setattr(views, 'update_if_current', racing)
+        url = reverse('gdpr:data_request_edit', args=[data_request.pk])
+        data = {'subject_name': 'X', 'subject_email': 'test@example.com', 'request_type': 'access', 'status': 'pending', 'version': data_request.version}
+        response = auth_client.post(url, data)
+        assert 'changed by someone else' in response.content.decode()
+        data_request.refresh_from_db()
+        assert (data_request.status, data_request.subject_name) == ('in_progress', 'Test Subject Name')
+
     def test_delete(self, auth_client, data_request):
         """Test soft delete via POST."""
         url = reverse('gdpr:data_request_delete', args=[data_request.pk])
@@ -215,6 +470,22 @@ class TestDataRequestViews:
         data_request.refresh_from_db()
         assert data_request.is_deleted is True
 
+    def test_bulk_set_status(self, auth_client, hub_id, data_request):
+        """Test a status change updates status, completed_at, search and statistics."""
+        import json
+        from gdpr.search import search
+        from gdpr.stats import hub_stats
+        data_request.completed_at = None
+        data_request.save()
+        url = reverse('gdpr:data_requests_bulk_action')
+        body = json.dumps({'action': 'set_status', 'status': 'completed', 'ids': [str(data_request.pk)]})
+        assert auth_client.post(url, body, content_type='application/json').json() == {'count': 1}
+        data_request.refresh_from_db()
+        assert data_request.status == 'completed'
+        assert data_request.completed_at is not None
+        assert search(DataRequest.objects.filter(hub_id=hub_id), 'complet').count() == 1
+        assert hub_stats(hub_id)['request_status'] == {'completed': 1}
+
     def test_bulk_delete(self, auth_client, data_request):
         """Test bulk delete."""
         url = reverse('gdpr:data_requests_bulk_action')
@@ -223,6 +494,20 @@ class TestDataRequestViews:
         data_request.refresh_from_db()
         assert data_request.is_deleted is True
 
+    @pytest.mark.parametrize('sort', ['status', 'completed_at', 'created_at'])
+    def test_scroll_visits_every_row_once(self, auth_client, hub_id, sort):
+        """Test chained cursors return each row exactly once."""
+        from django.utils import timezone
+        DataRequest.objects.bulk_create([
+            DataRequest(
+                hub_id=hub_id, subject_name=f'S{i}', subject_email=f's{i}@example.com', request_type='access',
+                status='pending' if i % 2 else 'completed', completed_at=None if i % 2 else timezone.now(),
+            )
+            for i in range(75)
+        ])
+        ids = _scroll_all(auth_client, reverse('gdpr:data_requests_scroll'), {'sort': sort, 'dir': 'desc'})
+        assert len(ids) == len(set(ids)) == 75
+
     def test_list_requires_auth(self, client):
         """Test list requires authentication."""
         url = reverse('gdpr:data_requests_list')
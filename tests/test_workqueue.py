@@ -0,0 +1,86 @@
+"""Tests for the gdpr DSAR work queue."""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from gdpr import workqueue
+from gdpr.models import ConsentRecord, DataRequest
+from gdpr.stats import hub_stats
+from gdpr.workqueue import claim, process, update_if_current, work
+
+
+@pytest.fixture
+def queued(hub_id):
+    ConsentRecord.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='ana@example.com', purpose='marketing', consented=True)
+    return [
+        DataRequest.objects.create(hub_id=hub_id, subject_name='Ana', subject_email='ana@example.com', request_type=request_type)
+        for request_type in ('erasure', 'rectification', 'access')
+    ]
+
+
+@pytest.mark.django_db
+class TestWorkQueue:
+    """Claim, lease and processing tests."""
+
+    def test_claims_oldest_handled_request_once(self, hub_id, queued):
+        """Test claims take queued types oldest first, never the same request twice."""
+        first = claim('w1')
+        second = claim('w2')
+        assert (first.pk, second.pk) == (queued[0].pk, queued[2].pk)
+        assert claim('w3') is None
+        first.refresh_from_db()
+        assert (first.status, first.claimed_by, first.attempts) == ('in_progress', 'w1', 1)
+        assert first.lease_expires_at > timezone.now()
+        assert hub_stats(hub_id)['request_status'] == {'in_progress': 2, 'pending': 1}
+
+    def test_stale_version_loses(self, queued):
+        """Test a write based on an outdated read is refused."""
+        stale = DataRequest.objects.get(pk=queued[0].pk)
+        fresh = DataRequest.objects.get(pk=queued[0].pk)
+        fresh.notes = 'edited'
+        fresh.save()
+        assert update_if_current(stale, status='in_progress') is False
+        assert DataRequest.objects.get(pk=queued[0].pk).status == 'pending'
+
+    def test_expired_lease_is_reclaimed(self, queued):
+        """Test a request whose worker stopped renewing its lease is claimed again."""
+        claimed = claim('w1', lease_seconds=60)
+        DataRequest.objects.filter(pk=claimed.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        again = claim('w2')
+        assert again.pk == claimed.pk
+        assert (again.claimed_by, again.attempts) == ('w2', 2)
+
+    def test_drain_processes_every_queued_request(self, hub_id, queued, settings, tmp_path):
+        """Test a draining worker runs erasure and archive jobs and completes them."""
+        settings.MEDIA_ROOT = str(tmp_path)
+        assert work('w1', drain=True) == 2
+        erasure, rectification, access = (DataRequest.objects.get(pk=r.pk) for r in queued)
+        assert (erasure.status, erasure.claimed_by, erasure.lease_expires_at) == ('completed', '', None)
+        assert erasure.completed_at is not None
+        assert not ConsentRecord.all_objects.filter(hub_id=hub_id).exists()
+        assert access.status == 'completed' and access.archive
+        assert rectification.status == 'pending'
+
+    def test_erasure_renews_lease(self, hub_id, queued):
+        """Test an erasure job renews its lease as its handlers make progress."""
+        claimed = claim('w1', lease_seconds=60)
+        assert claimed.request_type == 'erasure'
+        DataRequest.objects.filter(pk=claimed.pk).update(lease_expires_at=timezone.now() + timedelta(seconds=1))
+        beats = []
+        workqueue._erase(claimed, lambda: beats.append(workqueue.renew_lease(claimed)))
+        assert beats and all(beats)
+        assert DataRequest.objects.get(pk=claimed.pk).lease_expires_at > timezone.now() + timedelta(minutes=10)
+
+    def test_failures_retry_then_fail(self, queued, monkeypatch):
+        """Test a failing job goes back to pending until MAX_ATTEMPTS, then fails."""
+        def broken(data_request, heartbeat):
+            raise RuntimeError('boom')
+        monkeypatch.setitem(workqueue.QUEUE_HANDLERS, 'erasure', broken)
+        monkeypatch.setitem(workqueue.QUEUE_HANDLERS, 'access', broken)
+        for _ in range(workqueue.MAX_ATTEMPTS):
+            assert process(claim('w1')) is False
+            assert process(claim('w1')) is False
+        erasure = DataRequest.objects.get(pk=queued[0].pk)
+        assert (erasure.status, erasure.attempts, erasure.last_error) == ('failed', workqueue.MAX_ATTEMPTS, 'RuntimeError: boom')
+        assert claim('w1') is None
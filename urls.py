@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from .metrics import instrument_urlpatterns
 
 app_name = 'gdpr'
 
@@ -14,18 +15,38 @@ urlpatterns = [
 
     # ConsentRecord
     path('consent_records/', views.consent_records_list, name='consent_records_list'),
+    path('consent_records/scroll/', views.consent_records_scroll, name='consent_records_scroll'),
+    path('consent_records/suggest/', views.consent_records_suggest, name='consent_records_suggest'),
     path('consent_records/add/', views.consent_record_add, name='consent_record_add'),
     path('consent_records/<uuid:pk>/edit/', views.consent_record_edit, name='consent_record_edit'),
     path('consent_records/<uuid:pk>/delete/', views.consent_record_delete, name='consent_record_delete'),
     path('consent_records/bulk/', views.consent_records_bulk_action, name='consent_records_bulk_action'),
+    path('consent_records/ingest/', views.consent_records_ingest, name='consent_records_ingest'),
+    path('consent_records/import/', views.consent_records_import, name='consent_records_import'),
+    path('consent_records/import/rejects/<slug:token>/', views.consent_records_import_rejects, name='consent_records_import_rejects'),
 
     # DataRequest
     path('data_requests/', views.data_requests_list, name='data_requests_list'),
+    path('data_requests/scroll/', views.data_requests_scroll, name='data_requests_scroll'),
+    path('data_requests/suggest/', views.data_requests_suggest, name='data_requests_suggest'),
     path('data_requests/add/', views.data_request_add, name='data_request_add'),
     path('data_requests/<uuid:pk>/edit/', views.data_request_edit, name='data_request_edit'),
     path('data_requests/<uuid:pk>/delete/', views.data_request_delete, name='data_request_delete'),
+    path('data_requests/<uuid:pk>/extend/', views.data_request_extend, name='data_request_extend'),
+    path('data_requests/<uuid:pk>/erase/', views.data_request_erase, name='data_request_erase'),
+    path('data_requests/<uuid:pk>/erase/status/', views.data_request_erasure_status, name='data_request_erasure_status'),
+    path('data_requests/<uuid:pk>/archive/', views.data_request_archive, name='data_request_archive'),
+    path('data_requests/<uuid:pk>/archive/status/', views.data_request_archive_status, name='data_request_archive_status'),
     path('data_requests/bulk/', views.data_requests_bulk_action, name='data_requests_bulk_action'),
 
     # Settings
     path('settings/', views.settings_view, name='settings'),
+    path('settings/pending/<slug:kind>/', views.settings_pending, name='settings_pending'),
+    path('settings/profile/', views.settings_profile, name='settings_profile'),
+    path('settings/profiles/<uuid:pk>/', views.settings_profile_detail, name='settings_profile_detail'),
+
+    # Prometheus metrics
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
+
+instrument_urlpatterns(urlpatterns, exclude={'metrics'})
@@ -1,24 +1,128 @@
 """
 GDPR & Privacy Module Views
 """
+import hmac
+import io
+import json
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
 from django.shortcuts import get_object_or_404, render as django_render
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
 from apps.accounts.decorators import login_required, permission_required
 from apps.core.htmx import htmx_view
-from apps.core.services import export_to_csv, export_to_excel
 from apps.modules_runtime.navigation import with_module_nav
 
-from .models import ConsentRecord, DataRequest
+from .archiver import archive_hub, with_archived
+from .archives import ARCHIVE_REQUEST_TYPES, start_subject_archive
+from .bulk import bulk_consent_action, bulk_data_request_action
+from .deadlines import ExtensionError, deadline_summary, record_extension
+from .erasure import queue_erasure, run_erasure
+from .exports import accepts_gzip, stream_csv, stream_xlsx
+from .forms import GdprSettingsForm
+from .imports import CSVImportError, import_consent_csv, rejects_name
+from .ingest import ingest_buffer, parse_consent_event
+from .ledger import record_consent_events
+from .metrics import registry as metrics_registry
+from .models import (
+    EXTENSION_DAYS, ArchivedConsentRecord, ArchivedDataRequest, ConsentRecord, DataRequest, GdprSettings, ProfileRun,
+    normalize_email,
+)
+from .pagination import InvalidCursor, keyset_order, keyset_page
+from .profiling import PROFILABLE_ENDPOINTS, PROFILE_KEEP, arm as arm_profiling
+from .purge import purge_hub
+from .search import SUGGEST_LIMIT, search, suggest
+from .stats import hub_count, hub_stats
+from .workqueue import lease_held, update_if_current
 
 PER_PAGE_CHOICES = [12, 24, 48, 96, 0]
 
+# Rows fetched per infinite-scroll request when per_page is "All" (0).
+SCROLL_CHUNK_SIZE = 50
+
+SUGGEST_MAX_LIMIT = 50
+
+
+def _suggest_response(request, qs):
+    try:
+        limit = min(max(int(request.GET.get('limit', SUGGEST_LIMIT)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        limit = SUGGEST_LIMIT
+    return JsonResponse({'results': suggest(qs, request.GET.get('q', ''), limit)})
+
+
+def _bulk_request(request):
+    """
+    ``(action, ids, data)`` from a bulk-action POST, sent either as JSON or
+    as form fields with ``ids`` as a JSON array or comma-separated string.
+    ``ids`` is None when ``select_all`` asks for every row matching ``q``.
+    Raises ``ValueError`` on malformed input.
+    """
+    if request.content_type == 'application/json':
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('Expected an object.')
+    else:
+        data = request.POST.dict()
+        raw = data.get('ids', '').strip()
+        data['ids'] = json.loads(raw) if raw.startswith('[') else [i for i in raw.split(',') if i.strip()]
+    if data.get('select_all') in (True, '1', 'true'):
+        return data.get('action', ''), None, data
+    ids = data.get('ids') or []
+    if not isinstance(ids, list):
+        raise ValueError('ids must be a list.')
+    return data.get('action', ''), [str(uuid.UUID(str(i).strip())) for i in ids], data
+
+
+def _bulk_response(request, count, render_list, hub_id, metric):
+    """JSON ``{"count": n}`` for JSON clients; otherwise the refreshed list with an ``HX-Trigger`` carrying the count."""
+    if request.content_type == 'application/json':
+        return JsonResponse({'count': count})
+    response = render_list()
+    response['HX-Trigger'] = json.dumps({
+        'gdpr:bulk-action': {'count': count},
+        'gdpr-total': {'value': hub_count(hub_id, metric)},
+    })
+    return response
+
+
+def _from_list(request):
+    """Whether a write came from the list (row action or side panel) rather than a full-page form."""
+    return bool(request.htmx) and request.htmx.target == 'datatable-body'
+
+
+def _row_response(request, template, context, hub_id, metric):
+    """
+    Out-of-band swap of one row (updated, inserted or removed) plus the new
+    hub total as an ``HX-Trigger`` event. The list itself is left alone, so
+    its sort, search and page survive, and no list query or COUNT runs.
+    """
+    response = django_render(request, template, context)
+    response['HX-Reswap'] = 'none'
+    response['HX-Trigger'] = json.dumps({'gdpr-total': {'value': hub_count(hub_id, metric)}})
+    return response
+
+
+def _include_archived(request):
+    """Lists and exports read the archive tables only when asked with ``?archived=1``."""
+    return request.GET.get('archived') == '1'
+
+
+def _wants_gzip(request):
+    """Exports are gzip-compressed on the fly when asked for with ``?gzip=1``."""
+    return request.GET.get('gzip') == '1' and accepts_gzip(request)
+
 
 # ======================================================================
 # Dashboard
@@ -29,9 +133,16 @@ PER_PAGE_CHOICES = [12, 24, 48, 96, 0]
 @htmx_view('gdpr/pages/index.html', 'gdpr/partials/dashboard_content.html')
 def dashboard(request):
     hub_id = request.session.get('hub_id')
+    stats = hub_stats(hub_id)
     return {
-        'total_consent_records': ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False).count(),
-        'total_data_requests': DataRequest.objects.filter(hub_id=hub_id, is_deleted=False).count(),
+        'total_consent_records': stats['consent_records'].get('', 0),
+        'total_data_requests': stats['data_requests'].get('', 0),
+        'consented_count': stats['consent_status'].get('consented', 0),
+        'withdrawn_count': stats['consent_status'].get('withdrawn', 0),
+        'consents_by_purpose': sorted(stats['consent_purpose'].items(), key=lambda item: -item[1]),
+        'requests_by_type': sorted(stats['request_type'].items(), key=lambda item: -item[1]),
+        'requests_by_status': sorted(stats['request_status'].items(), key=lambda item: -item[1]),
+        'deadlines': deadline_summary(hub_id),
     }
 
 
@@ -67,6 +178,14 @@ def _render_consent_records_list(request, hub_id, per_page=10):
     ctx = _build_consent_records_context(hub_id, per_page)
     return django_render(request, 'gdpr/partials/consent_records_list.html', ctx)
 
+def _filter_consent_records(hub_id, search_query):
+    return search(ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False), search_query)
+
+def _filter_archived_consent_records(request, hub_id, search_query):
+    if not _include_archived(request):
+        return None
+    return search(ArchivedConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False), search_query)
+
 @login_required
 @with_module_nav('gdpr', 'consents')
 @htmx_view('gdpr/pages/consent_records.html', 'gdpr/partials/consent_records_content.html')
@@ -81,39 +200,67 @@ def consent_records_list(request):
     if per_page not in PER_PAGE_CHOICES:
         per_page = 12
 
-    qs = ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False)
-
-    if search_query:
-        qs = qs.filter(Q(subject_name__icontains=search_query) | Q(subject_email__icontains=search_query) | Q(purpose__icontains=search_query))
-
-    order_by = CONSENT_RECORD_SORT_FIELDS.get(sort_field, 'consented')
-    if sort_dir == 'desc':
-        order_by = f'-{order_by}'
-    qs = qs.order_by(order_by)
+    qs = _filter_consent_records(hub_id, search_query)
+    archived = _filter_archived_consent_records(request, hub_id, search_query)
+    order_field = CONSENT_RECORD_SORT_FIELDS.get(sort_field, 'consented')
+    ordering = keyset_order(order_field, sort_dir == 'desc')
 
     export_format = request.GET.get('export')
     if export_format in ('csv', 'excel'):
+        qs = qs.order_by(*ordering)
+        if archived is not None:
+            archived = archived.order_by(*ordering)
         fields = ['consented', 'subject_name', 'subject_email', 'purpose', 'consent_date', 'withdrawal_date']
         headers = ['Consented', 'Subject Name', 'Subject Email', 'Purpose', 'Consent Date', 'Withdrawal Date']
         if export_format == 'csv':
-            return export_to_csv(qs, fields=fields, headers=headers, filename='consent_records.csv')
-        return export_to_excel(qs, fields=fields, headers=headers, filename='consent_records.xlsx')
-
-    paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
-    page_obj = paginator.get_page(page_number)
-
-    if request.htmx and request.htmx.target == 'datatable-body':
-        return django_render(request, 'gdpr/partials/consent_records_list.html', {
-            'consent_records': page_obj, 'page_obj': page_obj,
-            'search_query': search_query, 'sort_field': sort_field,
-            'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
-        })
-
-    return {
-        'consent_records': page_obj, 'page_obj': page_obj,
+            return stream_csv(qs, fields, headers, 'consent_records.csv', gzip=_wants_gzip(request), archived=archived)
+        return stream_xlsx(qs, fields, headers, 'consent_records.xlsx', archived=archived)
+
+    if per_page > 0:
+        paginator = Paginator((qs if archived is None else with_archived(qs, archived)).order_by(*ordering), per_page)
+        page_obj = paginator.get_page(page_number)
+        consent_records, next_cursor = page_obj, None
+    else:
+        # "All": first chunk of an infinite scroll, no COUNT and no OFFSET.
+        page_obj = None
+        consent_records, next_cursor = keyset_page(qs, order_field, sort_dir == 'desc', size=SCROLL_CHUNK_SIZE, archived=archived)
+
+    ctx = {
+        'consent_records': consent_records, 'page_obj': page_obj, 'next_cursor': next_cursor,
         'search_query': search_query, 'sort_field': sort_field,
         'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
+        'include_archived': archived is not None,
     }
+    if request.htmx and request.htmx.target == 'datatable-body':
+        return django_render(request, 'gdpr/partials/consent_records_list.html', ctx)
+    ctx['total_count'] = hub_count(hub_id, 'consent_records')
+    return ctx
+
+@login_required
+def consent_records_scroll(request):
+    """Next infinite-scroll chunk of consent record rows, keyed on (sort field, id)."""
+    hub_id = request.session.get('hub_id')
+    search_query = request.GET.get('q', '').strip()
+    sort_field = request.GET.get('sort', 'consented')
+    sort_dir = request.GET.get('dir', 'asc')
+    qs = _filter_consent_records(hub_id, search_query)
+    archived = _filter_archived_consent_records(request, hub_id, search_query)
+    order_field = CONSENT_RECORD_SORT_FIELDS.get(sort_field, 'consented')
+    try:
+        rows, next_cursor = keyset_page(
+            qs, order_field, sort_dir == 'desc', cursor=request.GET.get('cursor'), size=SCROLL_CHUNK_SIZE, archived=archived,
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
+    return django_render(request, 'gdpr/partials/consent_records_rows.html', {
+        'consent_records': rows, 'next_cursor': next_cursor,
+    })
+
+@login_required
+def consent_records_suggest(request):
+    """Search-as-you-type: the first ``limit`` consent records matching ``q``, as JSON."""
+    hub_id = request.session.get('hub_id')
+    return _suggest_response(request, ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False))
 
 @login_required
 @htmx_view('gdpr/pages/consent_record_add.html', 'gdpr/partials/consent_record_add_content.html')
@@ -126,7 +273,12 @@ def consent_record_add(request):
         consented = request.POST.get('consented') == 'on'
         consent_date = request.POST.get('consent_date') or None
         withdrawal_date = request.POST.get('withdrawal_date') or None
-        obj = ConsentRecord(hub_id=hub_id)
+        # One record per subject and purpose: adding an existing pair updates it.
+        obj = ConsentRecord.all_objects.filter(
+            hub_id=hub_id, subject_email=normalize_email(subject_email), purpose=purpose,
+        ).first() or ConsentRecord(hub_id=hub_id)
+        obj.is_deleted = False
+        obj.deleted_at = None
         obj.subject_name = subject_name
         obj.subject_email = subject_email
         obj.purpose = purpose
@@ -151,7 +303,13 @@ def consent_record_edit(request, pk):
         obj.consented = request.POST.get('consented') == 'on'
         obj.consent_date = request.POST.get('consent_date') or None
         obj.withdrawal_date = request.POST.get('withdrawal_date') or None
+        if ConsentRecord.all_objects.filter(
+            hub_id=hub_id, subject_email=normalize_email(obj.subject_email), purpose=obj.purpose,
+        ).exclude(pk=obj.pk).exists():
+            return {'obj': obj, 'error': _('A consent record for this subject and purpose already exists.')}
         obj.save()
+        if _from_list(request):
+            return _row_response(request, 'gdpr/partials/consent_record_row_oob.html', {'item': obj}, hub_id, 'consent_records')
         return _render_consent_records_list(request, hub_id)
     return {'obj': obj}
 
@@ -163,18 +321,129 @@ def consent_record_delete(request, pk):
     obj.is_deleted = True
     obj.deleted_at = timezone.now()
     obj.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
-    return _render_consent_records_list(request, hub_id)
+    return _row_response(request, 'gdpr/partials/consent_record_row_oob.html', {'removed_id': obj.pk}, hub_id, 'consent_records')
 
 @login_required
 @require_POST
 def consent_records_bulk_action(request):
+    """Delete, withdraw or restore the selected consent records (or all matching ``q``); see ``bulk.py``."""
     hub_id = request.session.get('hub_id')
-    ids = [i.strip() for i in request.POST.get('ids', '').split(',') if i.strip()]
-    action = request.POST.get('action', '')
-    qs = ConsentRecord.objects.filter(hub_id=hub_id, is_deleted=False, id__in=ids)
-    if action == 'delete':
-        qs.update(is_deleted=True, deleted_at=timezone.now())
-    return _render_consent_records_list(request, hub_id)
+    try:
+        action, ids, data = _bulk_request(request)
+        qs = _filter_consent_records(hub_id, str(data.get('q') or '').strip() if ids is None else '')
+        count = bulk_consent_action(qs, action, ids=ids)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    return _bulk_response(request, count, lambda: _render_consent_records_list(request, hub_id), hub_id, 'consent_records')
+
+
+def _bearer_token(request):
+    scheme, _sep, credentials = request.headers.get('Authorization', '').partition(' ')
+    return credentials if scheme.lower() == 'bearer' else ''
+
+
+def _ingest_hub(request):
+    """The hub whose ``GDPR_CONSENT_INGEST_TOKENS`` token the request sends as a bearer token, or None."""
+    credentials = _bearer_token(request).encode()
+    hub_id = None
+    for hub, token in getattr(settings, 'GDPR_CONSENT_INGEST_TOKENS', {}).items():
+        # Compare every token so the time taken does not tell which one matched.
+        if token and hmac.compare_digest(credentials, token.encode()):
+            hub_id = hub
+    return hub_id
+
+
+@csrf_exempt
+@require_POST
+def consent_records_ingest(request):
+    """
+    JSON ingestion of consent events (cookie banners, storefront checkouts).
+
+    Callers are machines, not signed-in users: the hub is the one whose
+    ``GDPR_CONSENT_INGEST_TOKENS`` token is sent as a bearer token (401
+    otherwise). Accepts one event object, a list of events, or
+    ``{"events": [...]}``; see ``ingest.parse_consent_event`` for the event
+    format. Valid events are appended to the ledger before responding and
+    applied to the current state in batches (202); ``?sync=1`` applies them
+    before responding too (200). Invalid events are reported back by index.
+    """
+    hub_id = _ingest_hub(request)
+    if hub_id is None:
+        response = JsonResponse({'error': 'Unauthorized'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    try:
+        payload = json.loads(request.body or b'null')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if isinstance(payload, dict) and 'events' in payload:
+        payload = payload['events']
+    if not isinstance(payload, list):
+        payload = [payload]
+
+    events, rejected = [], []
+    for index, data in enumerate(payload):
+        try:
+            events.append(parse_consent_event(data))
+        except ValidationError as e:
+            rejected.append({'index': index, 'error': ' '.join(e.messages)})
+
+    if request.GET.get('sync') == '1':
+        record_consent_events(hub_id, events, source='api')
+        status = 200
+    else:
+        ingest_buffer.add(hub_id, events)
+        status = 202
+    return JsonResponse({'accepted': len(events), 'rejected': rejected}, status=status)
+
+
+@login_required
+@htmx_view('gdpr/pages/consent_record_import.html', 'gdpr/partials/consent_record_import_content.html')
+def consent_records_import(request):
+    """Upload a CSV of historical consent records; see ``imports.import_consent_csv``."""
+    hub_id = request.session.get('hub_id')
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            return django_render(request, 'gdpr/partials/consent_record_import_result.html', {'error': _('Choose a CSV file to import.')})
+        raw_rejects = tempfile.TemporaryFile()
+        rejects = io.TextIOWrapper(raw_rejects, encoding='utf-8', newline='')
+        try:
+            totals = import_consent_csv(
+                io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), hub_id,
+                rejects=rejects, update_existing=request.POST.get('update_existing') == 'on',
+            )
+        except (CSVImportError, UnicodeDecodeError) as e:
+            rejects.close()
+            return django_render(request, 'gdpr/partials/consent_record_import_result.html', {'error': str(e)})
+        rejects_url = None
+        rejects.flush()
+        rejects.detach()
+        with raw_rejects:
+            if totals['rejected']:
+                token = uuid.uuid4().hex
+                raw_rejects.seek(0)
+                default_storage.save(rejects_name(hub_id, token), File(raw_rejects))
+                rejects_url = reverse('gdpr:consent_records_import_rejects', args=[token])
+        return django_render(request, 'gdpr/partials/consent_record_import_result.html', dict(totals, rejects_url=rejects_url))
+    return {}
+
+
+def _download_once(name, chunk_size=64 * 1024):
+    with default_storage.open(name, 'rb') as f:
+        yield from iter(lambda: f.read(chunk_size), b'')
+    default_storage.delete(name)
+
+
+@login_required
+def consent_records_import_rejects(request, token):
+    """The rejected rows of an upload; the file is deleted once it has been downloaded in full."""
+    name = rejects_name(request.session.get('hub_id'), token)
+    if not default_storage.exists(name):
+        raise Http404
+    response = StreamingHttpResponse(_download_once(name), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="consent_records_rejects.csv"'
+    return response
 
 
 # ======================================================================
@@ -187,6 +456,7 @@ DATA_REQUEST_SORT_FIELDS = {
     'subject_name': 'subject_name',
     'subject_email': 'subject_email',
     'completed_at': 'completed_at',
+    'due_at': 'due_at',
     'notes': 'notes',
     'created_at': 'created_at',
 }
@@ -209,6 +479,14 @@ def _render_data_requests_list(request, hub_id, per_page=10):
     ctx = _build_data_requests_context(hub_id, per_page)
     return django_render(request, 'gdpr/partials/data_requests_list.html', ctx)
 
+def _filter_data_requests(hub_id, search_query):
+    return search(DataRequest.objects.filter(hub_id=hub_id, is_deleted=False), search_query)
+
+def _filter_archived_data_requests(request, hub_id, search_query):
+    if not _include_archived(request):
+        return None
+    return search(ArchivedDataRequest.objects.filter(hub_id=hub_id, is_deleted=False), search_query)
+
 @login_required
 @with_module_nav('gdpr', 'consents')
 @htmx_view('gdpr/pages/data_requests.html', 'gdpr/partials/data_requests_content.html')
@@ -223,39 +501,67 @@ def data_requests_list(request):
     if per_page not in PER_PAGE_CHOICES:
         per_page = 12
 
-    qs = DataRequest.objects.filter(hub_id=hub_id, is_deleted=False)
-
-    if search_query:
-        qs = qs.filter(Q(subject_name__icontains=search_query) | Q(subject_email__icontains=search_query) | Q(request_type__icontains=search_query) | Q(status__icontains=search_query))
-
-    order_by = DATA_REQUEST_SORT_FIELDS.get(sort_field, 'request_type')
-    if sort_dir == 'desc':
-        order_by = f'-{order_by}'
-    qs = qs.order_by(order_by)
+    qs = _filter_data_requests(hub_id, search_query)
+    archived = _filter_archived_data_requests(request, hub_id, search_query)
+    order_field = DATA_REQUEST_SORT_FIELDS.get(sort_field, 'request_type')
+    ordering = keyset_order(order_field, sort_dir == 'desc')
 
     export_format = request.GET.get('export')
     if export_format in ('csv', 'excel'):
+        qs = qs.order_by(*ordering)
+        if archived is not None:
+            archived = archived.order_by(*ordering)
         fields = ['request_type', 'status', 'subject_name', 'subject_email', 'completed_at', 'notes']
         headers = ['Request Type', 'Status', 'Subject Name', 'Subject Email', 'Completed At', 'Notes']
         if export_format == 'csv':
-            return export_to_csv(qs, fields=fields, headers=headers, filename='data_requests.csv')
-        return export_to_excel(qs, fields=fields, headers=headers, filename='data_requests.xlsx')
-
-    paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
-    page_obj = paginator.get_page(page_number)
-
-    if request.htmx and request.htmx.target == 'datatable-body':
-        return django_render(request, 'gdpr/partials/data_requests_list.html', {
-            'data_requests': page_obj, 'page_obj': page_obj,
-            'search_query': search_query, 'sort_field': sort_field,
-            'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
-        })
-
-    return {
-        'data_requests': page_obj, 'page_obj': page_obj,
+            return stream_csv(qs, fields, headers, 'data_requests.csv', gzip=_wants_gzip(request), archived=archived)
+        return stream_xlsx(qs, fields, headers, 'data_requests.xlsx', archived=archived)
+
+    if per_page > 0:
+        paginator = Paginator((qs if archived is None else with_archived(qs, archived)).order_by(*ordering), per_page)
+        page_obj = paginator.get_page(page_number)
+        data_requests, next_cursor = page_obj, None
+    else:
+        # "All": first chunk of an infinite scroll, no COUNT and no OFFSET.
+        page_obj = None
+        data_requests, next_cursor = keyset_page(qs, order_field, sort_dir == 'desc', size=SCROLL_CHUNK_SIZE, archived=archived)
+
+    ctx = {
+        'data_requests': data_requests, 'page_obj': page_obj, 'next_cursor': next_cursor,
         'search_query': search_query, 'sort_field': sort_field,
         'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
+        'include_archived': archived is not None,
     }
+    if request.htmx and request.htmx.target == 'datatable-body':
+        return django_render(request, 'gdpr/partials/data_requests_list.html', ctx)
+    ctx['total_count'] = hub_count(hub_id, 'data_requests')
+    return ctx
+
+@login_required
+def data_requests_scroll(request):
+    """Next infinite-scroll chunk of data request rows, keyed on (sort field, id)."""
+    hub_id = request.session.get('hub_id')
+    search_query = request.GET.get('q', '').strip()
+    sort_field = request.GET.get('sort', 'request_type')
+    sort_dir = request.GET.get('dir', 'asc')
+    qs = _filter_data_requests(hub_id, search_query)
+    archived = _filter_archived_data_requests(request, hub_id, search_query)
+    order_field = DATA_REQUEST_SORT_FIELDS.get(sort_field, 'request_type')
+    try:
+        rows, next_cursor = keyset_page(
+            qs, order_field, sort_dir == 'desc', cursor=request.GET.get('cursor'), size=SCROLL_CHUNK_SIZE, archived=archived,
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
+    return django_render(request, 'gdpr/partials/data_requests_rows.html', {
+        'data_requests': rows, 'next_cursor': next_cursor,
+    })
+
+@login_required
+def data_requests_suggest(request):
+    """Search-as-you-type: the first ``limit`` data requests matching ``q``, as JSON."""
+    hub_id = request.session.get('hub_id')
+    return _suggest_response(request, DataRequest.objects.filter(hub_id=hub_id, is_deleted=False))
 
 @login_required
 @htmx_view('gdpr/pages/data_request_add.html', 'gdpr/partials/data_request_add_content.html')
@@ -276,6 +582,8 @@ def data_request_add(request):
         obj.completed_at = completed_at
         obj.notes = notes
         obj.save()
+        if _from_list(request):
+            return _row_response(request, 'gdpr/partials/data_request_row_oob.html', {'item': obj, 'created': True}, hub_id, 'data_requests')
         return _render_data_requests_list(request, hub_id)
     return {}
 
@@ -285,13 +593,26 @@ def data_request_edit(request, pk):
     hub_id = request.session.get('hub_id')
     obj = get_object_or_404(DataRequest, pk=pk, hub_id=hub_id, is_deleted=False)
     if request.method == 'POST':
-        obj.subject_name = request.POST.get('subject_name', '').strip()
-        obj.subject_email = request.POST.get('subject_email', '').strip()
-        obj.request_type = request.POST.get('request_type', '').strip()
-        obj.status = request.POST.get('status', '').strip()
-        obj.completed_at = request.POST.get('completed_at') or None
-        obj.notes = request.POST.get('notes', '').strip()
-        obj.save()
+        conflict = {'obj': obj, 'error': _('This request was changed by someone else. Reload it and try again.')}
+        version = request.POST.get('version')
+        if version and version != str(obj.version):
+            # Saved by someone else (or claimed by a worker) since the form was loaded.
+            return conflict
+        written = update_if_current(
+            obj,
+            subject_name=request.POST.get('subject_name', '').strip(),
+            subject_email=request.POST.get('subject_email', '').strip(),
+            request_type=request.POST.get('request_type', '').strip(),
+            status=request.POST.get('status', '').strip(),
+            completed_at=request.POST.get('completed_at') or None,
+            notes=request.POST.get('notes', '').strip(),
+        )
+        if not written:
+            # Written by someone else between reading the row and this update.
+            obj.refresh_from_db()
+            return conflict
+        if _from_list(request):
+            return _row_response(request, 'gdpr/partials/data_request_row_oob.html', {'item': obj}, hub_id, 'data_requests')
         return _render_data_requests_list(request, hub_id)
     return {'obj': obj}
 
@@ -303,18 +624,105 @@ def data_request_delete(request, pk):
     obj.is_deleted = True
     obj.deleted_at = timezone.now()
     obj.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
-    return _render_data_requests_list(request, hub_id)
+    return _row_response(request, 'gdpr/partials/data_request_row_oob.html', {'removed_id': obj.pk}, hub_id, 'data_requests')
+
+@login_required
+@permission_required('gdpr.process_datarequest')
+@require_POST
+def data_request_erase(request, pk):
+    """
+    Preview (``dry_run``) the cross-module erasure of an erasure request, or
+    queue it for ``gdpr_worker``; see ``erasure.py``. Both are refused while
+    a worker holds the request.
+    """
+    hub_id = request.session.get('hub_id')
+    obj = get_object_or_404(DataRequest, pk=pk, hub_id=hub_id, is_deleted=False)
+    if obj.request_type != 'erasure':
+        return HttpResponseBadRequest(_('Not an erasure request.'))
+    error = None
+    if lease_held(obj):
+        error = _('This erasure is already running.')
+    elif request.POST.get('dry_run') == '1':
+        report = run_erasure(obj, dry_run=True)
+        if request.headers.get('Accept') == 'application/json':
+            return JsonResponse(report)
+        return django_render(request, 'gdpr/partials/erasure_report.html', {'obj': obj, 'report': report})
+    elif not queue_erasure(obj):
+        obj.refresh_from_db()
+        error = _('This erasure is already running.')
+    if request.headers.get('Accept') == 'application/json':
+        return JsonResponse({'status': obj.status, 'report': obj.erasure_report, 'error': error}, status=409 if error else 202)
+    response = django_render(request, 'gdpr/partials/erasure_report.html', {'obj': obj, 'report': obj.erasure_report, 'error': error})
+    if not error:
+        response['HX-Trigger'] = json.dumps({'gdpr:erasure': {'id': str(obj.pk), 'status': obj.status}})
+    return response
+
+@login_required
+@permission_required('gdpr.process_datarequest')
+def data_request_erasure_status(request, pk):
+    """Erasure progress; polled by the request panel while queued or running."""
+    hub_id = request.session.get('hub_id')
+    obj = get_object_or_404(DataRequest, pk=pk, hub_id=hub_id, is_deleted=False)
+    return django_render(request, 'gdpr/partials/erasure_report.html', {'obj': obj, 'report': obj.erasure_report})
+
+@login_required
+@permission_required('gdpr.process_datarequest')
+def data_request_archive(request, pk):
+    """POST queues a build of the subject data archive of an access/portability request; GET downloads it."""
+    hub_id = request.session.get('hub_id')
+    obj = get_object_or_404(DataRequest, pk=pk, hub_id=hub_id, is_deleted=False)
+    if obj.request_type not in ARCHIVE_REQUEST_TYPES:
+        return HttpResponseBadRequest(_('Not an access or portability request.'))
+    if request.method == 'POST':
+        error = None
+        if not start_subject_archive(obj):
+            obj.refresh_from_db()
+            error = _('This archive is already being built.')
+        return django_render(request, 'gdpr/partials/archive_status.html', {'obj': obj, 'error': error})
+    if not obj.archive:
+        raise Http404
+    return FileResponse(obj.archive.open('rb'), as_attachment=True, filename=f'data_request_{obj.pk}.zip')
+
+@login_required
+@permission_required('gdpr.process_datarequest')
+def data_request_archive_status(request, pk):
+    """Archive build progress; polled by the request panel while building."""
+    hub_id = request.session.get('hub_id')
+    obj = get_object_or_404(DataRequest, pk=pk, hub_id=hub_id, is_deleted=False)
+    return django_render(request, 'gdpr/partials/archive_status.html', {'obj': obj})
+
+@login_required
+@permission_required('gdpr.process_datarequest')
+@require_POST
+def data_request_extend(request, pk):
+    """Record the one deadline extension the regulation allows; see ``deadlines.record_extension``."""
+    hub_id = request.session.get('hub_id')
+    obj = get_object_or_404(DataRequest, pk=pk, hub_id=hub_id, is_deleted=False)
+    error = None
+    try:
+        days = int(request.POST.get('days') or EXTENSION_DAYS)
+    except ValueError:
+        days = 0
+    try:
+        if not record_extension(obj, days=days, reason=request.POST.get('reason', '').strip()):
+            obj.refresh_from_db()
+            error = _('This request was changed by someone else. Reload it and try again.')
+    except ExtensionError as e:
+        error = str(e)
+    return django_render(request, 'gdpr/partials/deadline_status.html', {'obj': obj, 'error': error})
 
 @login_required
 @require_POST
 def data_requests_bulk_action(request):
+    """Delete the selected data requests (or all matching ``q``) or move them to ``status``; see ``bulk.py``."""
     hub_id = request.session.get('hub_id')
-    ids = [i.strip() for i in request.POST.get('ids', '').split(',') if i.strip()]
-    action = request.POST.get('action', '')
-    qs = DataRequest.objects.filter(hub_id=hub_id, is_deleted=False, id__in=ids)
-    if action == 'delete':
-        qs.update(is_deleted=True, deleted_at=timezone.now())
-    return _render_data_requests_list(request, hub_id)
+    try:
+        action, ids, data = _bulk_request(request)
+        qs = _filter_data_requests(hub_id, str(data.get('q') or '').strip() if ids is None else '')
+        count = bulk_data_request_action(qs, action, ids=ids, status=str(data.get('status') or ''))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    return _bulk_response(request, count, lambda: _render_data_requests_list(request, hub_id), hub_id, 'data_requests')
 
 
 @login_required
@@ -322,5 +730,73 @@ def data_requests_bulk_action(request):
 @with_module_nav('gdpr', 'settings')
 @htmx_view('gdpr/pages/settings.html', 'gdpr/partials/settings_content.html')
 def settings_view(request):
-    return {}
+    hub_id = request.session.get('hub_id')
+    hub_settings = GdprSettings.for_hub(hub_id)
+    form = GdprSettingsForm(request.POST or None, instance=hub_settings)
+    saved = request.method == 'POST' and form.is_valid()
+    if saved:
+        form.save()
+    return {
+        'form': form,
+        'saved': saved,
+        'profilable_endpoints': PROFILABLE_ENDPOINTS,
+        'profile_runs': ProfileRun.objects.filter(hub_id=hub_id).defer('frames', 'statements')[:PROFILE_KEEP],
+    }
+
+
+# Rows due, counted on request: both scan the hub's soft-deleted and old rows.
+PENDING_COUNTS = {
+    'purge': purge_hub,
+    'archive': archive_hub,
+}
 
+
+@login_required
+@permission_required('gdpr.manage_settings')
+def settings_pending(request, kind):
+    """Rows due for purging or archiving (*kind*), loaded by a button on the settings page."""
+    if kind not in PENDING_COUNTS:
+        raise Http404
+    pending = PENDING_COUNTS[kind](request.session.get('hub_id'), dry_run=True)
+    return django_render(request, 'gdpr/partials/settings_pending.html', {'kind': kind, 'pending': pending})
+
+
+@login_required
+@permission_required('gdpr.manage_settings')
+@require_POST
+def settings_profile(request):
+    """Arm profiling of the next call of an endpoint in this session, then open it."""
+    endpoint = request.POST.get('endpoint', '')
+    try:
+        arm_profiling(request, endpoint)
+    except ValueError:
+        return HttpResponseBadRequest('Unknown endpoint')
+    query = request.POST.get('query', '').strip().lstrip('?')
+    response = HttpResponse(status=204)
+    response['HX-Redirect'] = reverse(f'gdpr:{endpoint}') + (f'?{query}' if query else '')
+    return response
+
+
+@login_required
+@permission_required('gdpr.manage_settings')
+@with_module_nav('gdpr', 'settings')
+@htmx_view('gdpr/pages/profile_run.html', 'gdpr/partials/profile_run_content.html')
+def settings_profile_detail(request, pk):
+    run = get_object_or_404(ProfileRun, pk=pk, hub_id=request.session.get('hub_id'))
+    return {'run': run}
+
+
+def _metrics_authorized(request):
+    token = getattr(settings, 'GDPR_METRICS_TOKEN', '')
+    return bool(token) and hmac.compare_digest(_bearer_token(request).encode(), token.encode())
+
+
+def metrics_view(request):
+    """
+    Instrumentation of the process answering, in the Prometheus text format,
+    for scrapers sending ``GDPR_METRICS_TOKEN`` as a bearer token. Hidden
+    when no token is configured.
+    """
+    if not _metrics_authorized(request):
+        raise Http404
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,197 @@
+"""
+DSAR work queue on ``DataRequest``.
+
+Pending requests of a type with a queue handler (erasure, access,
+portability) are claimed by workers (``gdpr_worker``) one at a time:
+
+* Claiming locks the oldest candidate with ``SELECT ... FOR UPDATE SKIP
+  LOCKED`` where the database supports it, so concurrent workers never wait
+  on each other; elsewhere (SQLite) it is a compare-and-set on ``version``,
+  trying the next candidate when another worker won.
+* A claim is a lease: the request moves to ``in_progress`` with
+  ``claimed_by`` and ``lease_expires_at``. Long jobs renew it as they make
+  progress (archive builds while writing, erasures after every batch); a
+  request whose lease ran out (a crashed worker) is claimed again.
+* A failed job goes back to ``pending`` until ``MAX_ATTEMPTS``, then to
+  ``failed``, with the error in ``last_error``.
+
+Every ``DataRequest.save()`` bumps ``version``; :func:`update_if_current`
+writes only if nobody else did since the row was read.
+"""
+import logging
+import os
+import socket
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .archives import build_subject_archive
+from .erasure import run_erasure
+from .models import DataRequest
+from .stats import apply_deltas, data_request_keys
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 15 * 60
+
+MAX_ATTEMPTS = 3
+
+# Candidates tried per claim when falling back to compare-and-set.
+CLAIM_CANDIDATES = 10
+
+POLL_INTERVAL = 5.0
+
+
+def _erase(data_request, heartbeat):
+    report = run_erasure(data_request, progress=heartbeat)
+    if report['errors']:
+        raise RuntimeError(f"{report['errors']} erasure handler(s) failed")
+
+
+def _archive(data_request, heartbeat):
+    build_subject_archive(data_request, progress=lambda report: heartbeat())
+
+
+# request_type → job(data_request, heartbeat); heartbeat() renews the lease.
+QUEUE_HANDLERS = {
+    'erasure': _erase,
+    'access': _archive,
+    'portability': _archive,
+}
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def update_if_current(data_request, **changes):
+    """
+    Apply *changes* to *data_request* and write them only if the row still
+    has the version it was read with. Statistics and ``search_text`` are kept
+    in step. Returns whether the write happened; when it did not, the
+    instance holds unsaved values and should be reloaded.
+    """
+    before = data_request_keys(data_request.__dict__)
+    now = timezone.now()
+    for name, value in changes.items():
+        setattr(data_request, name, value)
+    data_request.refresh_search_text()
+    written = DataRequest.all_objects.filter(pk=data_request.pk, version=data_request.version).update(
+        **changes, search_text=data_request.search_text, updated_at=now, version=F('version') + 1,
+    )
+    if not written:
+        return False
+    data_request.version += 1
+    data_request.updated_at = now
+    deltas = Counter(data_request_keys(data_request.__dict__))
+    deltas.subtract(before)
+    apply_deltas(data_request.hub_id, deltas)
+    return True
+
+
+def lease_held(data_request):
+    """Whether a worker holds *data_request* under a lease that has not run out."""
+    return (
+        data_request.status == 'in_progress' and data_request.lease_expires_at is not None
+        and data_request.lease_expires_at > timezone.now()
+    )
+
+
+def _candidates(now):
+    queued = DataRequest.objects.filter(request_type__in=QUEUE_HANDLERS)
+    return [
+        queued.filter(status='in_progress', lease_expires_at__lt=now).order_by('lease_expires_at'),
+        queued.filter(status='pending').order_by('created_at'),
+    ]
+
+
+def claim(worker, lease_seconds=LEASE_SECONDS):
+    """Claim the next request for *worker* (a name); returns it, or None when the queue is empty."""
+    now = timezone.now()
+
+    def take(data_request):
+        return update_if_current(
+            data_request, status='in_progress', claimed_by=worker,
+            lease_expires_at=now + timedelta(seconds=lease_seconds), attempts=data_request.attempts + 1,
+        )
+
+    for qs in _candidates(now):
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                data_request = qs.select_for_update(skip_locked=True).first()
+                if data_request is not None and take(data_request):
+                    return data_request
+        else:
+            for data_request in qs[:CLAIM_CANDIDATES]:
+                if take(data_request):
+                    return data_request
+    return None
+
+
+def renew_lease(data_request, lease_seconds=LEASE_SECONDS):
+    """Extend the lease of a claimed request; False when it is no longer held by its claimer."""
+    return bool(DataRequest.all_objects.filter(pk=data_request.pk, claimed_by=data_request.claimed_by, status='in_progress').update(
+        lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds),
+    ))
+
+
+def process(data_request, lease_seconds=LEASE_SECONDS):
+    """Run the job of a claimed request and complete, retry or fail it. Returns whether it completed."""
+    release = {'claimed_by': '', 'lease_expires_at': None}
+    if data_request.attempts > MAX_ATTEMPTS:
+        update_if_current(data_request, status='failed', last_error=data_request.last_error or 'Lease expired too often.', **release)
+        return False
+    try:
+        QUEUE_HANDLERS[data_request.request_type](data_request, lambda: renew_lease(data_request, lease_seconds))
+    except Exception as e:
+        logger.exception('Processing data request %s failed', data_request.pk)
+        current = DataRequest.all_objects.get(pk=data_request.pk)
+        status = 'failed' if current.attempts >= MAX_ATTEMPTS else 'pending'
+        update_if_current(current, status=status, last_error=f'{type(e).__name__}: {e}', **release)
+        return False
+    now = timezone.now()
+    if not update_if_current(data_request, status='completed', completed_at=data_request.completed_at or now, last_error='', **release):
+        logger.warning('Data request %s changed while it was processed; left as is', data_request.pk)
+    return True
+
+
+def work(worker, stop=None, drain=False, poll_interval=POLL_INTERVAL, lease_seconds=LEASE_SECONDS):
+    """
+    Claim and process requests until *stop* (a ``threading.Event``) is set,
+    or with ``drain`` until the queue is empty. Returns the number processed.
+    """
+    processed = 0
+    while not (stop and stop.is_set()):
+        data_request = claim(worker, lease_seconds)
+        if data_request is None:
+            if drain:
+                break
+            if stop:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        process(data_request, lease_seconds)
+        processed += 1
+    return processed
+
+
+def work_in_thread(worker, stop=None, **kwargs):
+    try:
+        return work(worker, stop, **kwargs)
+    finally:
+        connections.close_all()
+
+
+def work_in_process(index, drain, poll_interval, lease_seconds):
+    """Entry point of a worker process (fork or spawn)."""
+    import django
+    django.setup()
+    try:
+        work_in_thread(worker_name(index), drain=drain, poll_interval=poll_interval, lease_seconds=lease_seconds)
+    except KeyboardInterrupt:
+        pass